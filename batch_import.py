@@ -0,0 +1,113 @@
+import argparse
+import csv
+from concurrent.futures import ProcessPoolExecutor
+from glob import glob
+from pathlib import Path
+from time import perf_counter
+from PIL import Image
+from drawing import Drawing, QUANTIZE_PALETTE
+from files import SAVED_DRAWINGS_PATH, save_new_drawing, get_library, close_library
+from library import format_seconds
+from macro import estimate_run_seconds
+from quantize import get_color_lut
+
+IMAGE_SUFFIXES: tuple[str, ...] = (".png", ".jpg", ".jpeg", ".bmp", ".gif", ".webp")
+DITHER_NAMES: dict[str, Image.Dither] = {"floyd-steinberg": Image.Dither.FLOYDSTEINBERG,
+                                         "ordered": Image.Dither.ORDERED,
+                                         "none": Image.Dither.NONE}
+SUMMARY_FIELDS: tuple[str, ...] = ("image", "drawing", "width", "height", "dither",
+                                   "pixels", "estimated_seconds")
+
+ImportJob = tuple[str, str, int, int, str]  # image path, drawing name, width, height, dither name
+
+
+def get_image_paths(source: str) -> list[Path]:
+    # a directory is searched for images, anything else is used as a glob pattern
+    if Path(source).is_dir():
+        return sorted(path for path in Path(source).iterdir() if path.suffix.lower() in IMAGE_SUFFIXES)
+    return sorted(Path(path) for path in glob(source, recursive=True)
+                  if Path(path).suffix.lower() in IMAGE_SUFFIXES)
+
+
+def parse_size(size: str) -> tuple[int, int]:
+    width, _, height = size.lower().partition("x")
+    try:
+        return int(width), int(height)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"{size} is not a size like 64x48")
+
+
+def get_jobs(image_paths: list[Path], sizes: list[tuple[int, int]], dither_names: list[str]) -> list[ImportJob]:
+    jobs: list[ImportJob] = []
+    used_names: set[str] = set()
+
+    for image_path in image_paths:
+        for width, height in sizes:
+            for dither_name in dither_names:
+                # names are made unique here so workers never race for the same file
+                name: str = f"{image_path.stem}_{width}x{height}_{dither_name}"
+                unique_name: str = name
+                copy_number: int = 2
+                while unique_name in used_names:
+                    unique_name = f"{name}_{copy_number}"
+                    copy_number += 1
+
+                used_names.add(unique_name)
+                jobs.append((str(image_path), unique_name, width, height, dither_name))
+
+    return jobs
+
+
+def import_image(job: ImportJob, starting_charges: int = 0) -> dict[str, str | int | float]:
+    image_path, name, width, height, dither_name = job
+
+    drawing: Drawing = Drawing(width, height)
+    drawing.dither = DITHER_NAMES[dither_name]
+    drawing.set_pixels_from_image(image_path)
+
+    return {"image": image_path, "drawing": save_new_drawing(drawing, name),
+            "width": width, "height": height, "dither": dither_name,
+            "pixels": drawing.num_nonbackground_pixels(),
+            "estimated_seconds": round(estimate_run_seconds(drawing, starting_charges))}
+
+
+def import_images(jobs: list[ImportJob], starting_charges: int = 0,
+                  max_workers: int | None = None) -> list[dict[str, str | int | float]]:
+    get_color_lut(QUANTIZE_PALETTE)  # build the lookup table once so workers only load it
+    get_library()  # and create the library index before workers add to it
+    close_library()  # without handing its connection to forked workers
+
+    with ProcessPoolExecutor(max_workers) as executor:
+        return list(executor.map(import_image, jobs, [starting_charges] * len(jobs),
+                                 chunksize=max(1, len(jobs) // 64)))
+
+
+def write_summary(summary: list[dict[str, str | int | float]], summary_path: Path) -> None:
+    with summary_path.open("w", newline="") as writer:
+        summary_writer: csv.DictWriter = csv.DictWriter(writer, SUMMARY_FIELDS)
+        summary_writer.writeheader()
+        summary_writer.writerows(summary)
+
+
+if __name__ == "__main__":
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+            description="convert a folder of images into saved drawings")
+    parser.add_argument("source", help="directory of images, or a glob such as 'images/**/*.png'")
+    parser.add_argument("--sizes", nargs="+", type=parse_size, default=[(64, 64)], metavar="WIDTHxHEIGHT")
+    parser.add_argument("--dither", nargs="+", choices=DITHER_NAMES, default=["floyd-steinberg"])
+    parser.add_argument("--charges", type=int, default=0, help="starting charges for the time estimates")
+    parser.add_argument("--workers", type=int, default=None, help="defaults to one per core")
+    parser.add_argument("--summary", type=Path, default=SAVED_DRAWINGS_PATH / "batch_summary.csv")
+    arguments: argparse.Namespace = parser.parse_args()
+
+    image_paths: list[Path] = get_image_paths(arguments.source)
+    jobs: list[ImportJob] = get_jobs(image_paths, arguments.sizes, arguments.dither)
+    print(f"converting {len(image_paths)} images into {len(jobs)} drawings")
+
+    start_time: float = perf_counter()
+    summary: list[dict[str, str | int | float]] = import_images(jobs, arguments.charges, arguments.workers)
+    write_summary(summary, arguments.summary)
+
+    for row in summary:
+        print(f"{row['drawing']}: {row['pixels']} pixels, about {format_seconds(row['estimated_seconds'])} to run")
+    print(f"done in {perf_counter() - start_time:.1f} seconds, summary written to {arguments.summary}")
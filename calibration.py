@@ -0,0 +1,85 @@
+import numpy as np
+from PIL import ImageGrab
+from macro_utils import TIMING, SCREEN_WIDTH, PIXEL_WIDTH, is_key_pressed, move_pixel, sleep,\
+                        read_timing_profiles, write_timing_profiles, use_timing_profile
+
+CALIBRATION_SCALES: tuple[float, ...] = (1, .75, .5, .35, .25, .15, .1)  # of the default profile
+# only drag delays are shortened since drags are all check_drags verifies. click delays and page
+# waits keep their default values
+CALIBRATED_TIMINGS: tuple[str, ...] = ("drag_settle", "drag_grab", "drag_move", "drag_release")
+CALIBRATION_TRIALS: int = 3
+CAPTURE_SETTLE_SECONDS: float = .3
+MAP_BAND: tuple[float, float] = (.25, .7)  # vertical part of the screen compared, away from the menus
+COLOR_TOLERANCE: int = 12
+MATCHING_FRACTION: float = .9
+
+
+def capture_map() -> np.ndarray:
+    sleep(CAPTURE_SETTLE_SECONDS)
+    screen: np.ndarray = np.asarray(ImageGrab.grab().convert("RGB"), dtype=np.int16)
+
+    band_top: int = int(screen.shape[0] * MAP_BAND[0])
+    band_bottom: int = int(screen.shape[0] * MAP_BAND[1])
+    return screen[band_top:band_bottom]
+
+
+def is_shifted_copy(before: np.ndarray, after: np.ndarray, x_shift: int) -> bool:
+    # after[:, x] should show what before[:, x + x_shift] did
+    if x_shift > 0:
+        before, after = before[:, x_shift:], after[:, :-x_shift]
+    elif x_shift < 0:
+        before, after = before[:, :x_shift], after[:, -x_shift:]
+
+    matching: np.ndarray = np.all(np.abs(after - before) <= COLOR_TOLERANCE, axis=2)
+    return matching.mean() >= MATCHING_FRACTION
+
+
+def check_drags() -> bool:
+    before: np.ndarray = capture_map()
+    capture_scale: float = before.shape[1] / SCREEN_WIDTH
+
+    move_pixel("right")
+    moved: np.ndarray = capture_map()
+    move_pixel("left")
+    returned: np.ndarray = capture_map()
+
+    return is_shifted_copy(before, moved, round(PIXEL_WIDTH * capture_scale))\
+           and is_shifted_copy(before, returned, 0)
+
+
+def calibrate(profile_name: str = "calibrated") -> dict[str, float] | None:
+    use_timing_profile("default")
+    default_timing: dict[str, float] = dict(TIMING)
+    tightest_timing: dict[str, float] | None = None
+
+    for scale in CALIBRATION_SCALES:
+        TIMING.update({name: default_timing[name] * scale for name in CALIBRATED_TIMINGS})
+        print(f"trying {scale}x default drag timing")
+
+        if not all(check_drags() for _ in range(CALIBRATION_TRIALS)):
+            break
+        tightest_timing = dict(TIMING)
+
+    if tightest_timing is None:
+        use_timing_profile()
+        return None
+
+    timing_profiles: dict = read_timing_profiles()
+    timing_profiles["profiles"][profile_name] = tightest_timing
+    timing_profiles["active_profile"] = profile_name
+    write_timing_profiles(timing_profiles)
+
+    TIMING.update(tightest_timing)
+    return tightest_timing
+
+
+if __name__ == "__main__":
+    print("open wplace.live zoomed in as you would to run a drawing, then press space to calibrate.")
+    while not is_key_pressed("space"):
+        sleep(1/30)
+
+    calibrated_timing: dict[str, float] | None = calibrate()
+    if calibrated_timing is None:
+        print("drags failed even at default timing, keeping the current profile.")
+    else:
+        print(f"saved calibrated profile: {calibrated_timing}")
@@ -0,0 +1,95 @@
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from math import floor
+from macro_utils import Key, get_time, wait_for_key
+
+CHARGE_REGENERATION_SECONDS: float = 30
+CHARGE_SAFETY_BUFFER: int = 4
+STOP_CHECK_SECONDS: float = .25
+
+
+class ChargeScheduler:
+    # models paint charges regenerating one at a time up to an optional cap
+    def __init__(self, starting_charges: int, max_charges: int | None = None,
+                 regeneration_seconds: float = CHARGE_REGENERATION_SECONDS,
+                 safety_buffer: int = CHARGE_SAFETY_BUFFER):
+        self.charges: int = starting_charges
+        self.max_charges: int | None = max_charges
+        self.regeneration_seconds: float = regeneration_seconds
+        self.safety_buffer: int = safety_buffer
+
+        self.charges_used: int = 0
+        self.regeneration_start: float = get_time()  # when the charge in progress started regenerating
+
+
+    def update(self) -> None:
+        current_time: float = get_time()
+        regenerated: int = floor((current_time - self.regeneration_start) / self.regeneration_seconds)
+
+        if regenerated > 0:
+            self.charges += regenerated
+            self.regeneration_start += regenerated * self.regeneration_seconds
+
+        if self.max_charges is not None and self.charges >= self.max_charges:
+            self.charges = self.max_charges
+            self.regeneration_start = current_time  # nothing regenerates while full
+
+
+    def get_available_charges(self) -> int:
+        self.update()
+        return self.charges - self.safety_buffer
+
+
+    def use_charge(self) -> None:
+        self.update()
+        was_full: bool = self.max_charges is not None and self.charges >= self.max_charges
+
+        self.charges -= 1
+        self.charges_used += 1
+        if was_full:
+            self.regeneration_start = get_time()
+
+
+    def get_seconds_until(self, num_charges: int) -> float:
+        self.update()
+        if self.max_charges is not None:  # more than the cap never regenerates
+            num_charges = min(num_charges, self.max_charges - self.safety_buffer)
+
+        return self.get_regeneration_seconds(num_charges)
+
+
+    def get_regeneration_seconds(self, num_charges: int) -> float:
+        # until num_charges have regenerated on top of the buffer, with no cap since a run spends
+        # charges as they come in and so never sits at the cap
+        missing_charges: int = num_charges + self.safety_buffer - self.charges
+        if missing_charges <= 0:
+            return 0
+
+        return self.regeneration_start + missing_charges * self.regeneration_seconds - get_time()
+
+
+    def wait_for_charges(self, num_charges: int, kill_key: Key = "space",
+                         should_stop: Callable[[], bool] | None = None) -> bool:
+        # returns False if the kill key was pressed or should_stop became true while waiting
+        while True:
+            wait_seconds: float = self.get_seconds_until(num_charges)
+            if wait_seconds <= 0:
+                return True
+
+            if should_stop is not None:
+                if should_stop():
+                    return False
+                wait_seconds = min(wait_seconds, STOP_CHECK_SECONDS)
+            if wait_for_key(kill_key, wait_seconds):
+                return False
+
+
+    def get_projected_seconds(self, remaining_pixels: int, seconds_per_pixel: float = 0) -> float:
+        # placing pixels and regenerating charges overlap, whichever is slower sets the pace
+        self.update()
+        return max(self.get_regeneration_seconds(remaining_pixels), remaining_pixels * seconds_per_pixel)
+
+
+    def get_projected_completion(self, remaining_pixels: int, seconds_per_pixel: float = 0) -> datetime:
+        return datetime.now() + timedelta(seconds=self.get_projected_seconds(remaining_pixels,
+                                                                             seconds_per_pixel))
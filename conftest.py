@@ -0,0 +1,39 @@
+from collections.abc import Iterator
+from pathlib import Path
+import numpy as np
+import pytest
+import files
+from drawing import Drawing, BACKGROUND_INDEX
+from macro_utils import InputBackend, SimulatedInputBackend, set_input_backend
+
+
+def make_random_drawing(width: int, height: int, fill: float = .3, seed: int = 0) -> Drawing:
+    # a drawing with a fraction of its pixels set to random palette colors
+    generator: np.random.Generator = np.random.default_rng(seed)
+    pixels: np.ndarray = generator.integers(0, BACKGROUND_INDEX, size=(height, width), dtype=np.uint8)
+    pixels[generator.random((height, width)) >= fill] = BACKGROUND_INDEX
+    return Drawing(width, height, pixels)
+
+
+@pytest.fixture
+def random_drawing() -> Drawing:
+    return make_random_drawing(120, 40)
+
+
+
+@pytest.fixture
+def saved_drawings_path(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    # an empty drawings folder with its own library, so tests never touch saved_drawings
+    monkeypatch.setattr(files, "SAVED_DRAWINGS_PATH", tmp_path)
+    monkeypatch.setattr(files, "UNSAVED_DRAWINGS_PATH", tmp_path / "unsaved")
+    monkeypatch.setattr(files, "_library", None)
+    return tmp_path
+
+
+@pytest.fixture
+def simulated_backend() -> Iterator[SimulatedInputBackend]:
+    # inputs and sleeps go to a virtual clock for the length of the test
+    backend: SimulatedInputBackend = SimulatedInputBackend()
+    previous_backend: InputBackend = set_input_backend(backend)
+    yield backend
+    set_input_backend(previous_backend)
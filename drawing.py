@@ -1,79 +1,32 @@
+import zlib
+from collections.abc import Iterator
+import numpy as np
 from PIL import Image
-from macro_utils import move_mouse, click_mouse
+from palette import PALETTE, Color, PickableColor, BACKGROUND_PIXEL, get_color_as_hex
+from quantize import quantize_image
 
-Color = tuple[int, int, int]
+AVAILABLE_COLORS: tuple[Color, ...] = PALETTE.colors
 
+BACKGROUND_INDEX: int = PALETTE.background_index
 
-class PickableColor:
-    def __init__(self, name: str, color: Color, screen_position: tuple[int, int]):
-        self.name: str = name
-        self.color: Color = color
-        self.screen_position: tuple[int, int] = screen_position
+COLOR_INDICES: dict[Color, int] = PALETTE.indices_by_color
+
+QUANTIZE_PALETTE: np.ndarray = PALETTE.color_array
+
+
+def get_indices_from_colors(colors: np.ndarray) -> np.ndarray:
+    return PALETTE.get_indices_from_colors(colors)
 
-    
-    def select_color(self):
-        move_mouse(self.screen_position, .02)
-        click_mouse(.02)
-
-
-PICKABLE_COLORS: tuple[PickableColor, ...] = (
-        PickableColor("Black", (0, 0, 0), (33, 664)),
-        PickableColor("Dark Gray", (60, 60, 60), (81, 666)),
-        PickableColor("Gray", (120, 120, 120), (130, 665)),
-        PickableColor("Light Gray", (210, 210, 210), (222, 666)),
-        PickableColor("White", (255, 255, 255), (271, 665)),
-        PickableColor("Deep Red", (96, 0, 24), (322, 664)),
-        PickableColor("Red", (237, 28, 36), (410, 666)),
-        PickableColor("Orange", (255, 127, 39), (553, 669)),
-        PickableColor("Gold", (246, 170, 9), (604, 665)),
-        PickableColor("Yellow", (249, 221, 59), (650, 668)),
-        PickableColor("Light Yellow", (255, 250, 188), (698, 667)),
-        PickableColor("Dark Olive", (74, 107, 58), (887, 665)),
-        #PickableColor("Olive", (90,148,74), (932, 663)),
-        #PickableColor("Light Olive", (132, 197, 115), (982, 668)),
-        PickableColor("Dark Green", (14, 185, 104), (1028, 667)),
-        PickableColor("Green", (19, 230, 123), (1079, 665)),
-        PickableColor("Light Green", (135, 255, 94), (1123, 666)),
-        PickableColor("Dark Teal", (12, 129, 110), (1174, 664)),
-        PickableColor("Teal", (16, 174, 166), (1220, 662)),
-        PickableColor("Light Teal", (19, 225, 190), (1271, 664)),
-        #PickableColor("Dark Cyan", (15, 121, 159), (1312, 666)),
-        PickableColor("Cyan", (96, 247, 242), (1359, 666)),
-        #PickableColor("Light Cyan", (187, 250, 242), (1408, 669)),
-        PickableColor("Dark Blue", (40, 80, 158), (1454, 667)),
-        PickableColor("Blue", (64, 147, 228), (1503, 667)),
-        #PickableColor("Light Blue", (125, 199, 255), (32, 710)),
-        PickableColor("Dark Indigo", (77, 49, 184), (82, 711)),
-        PickableColor("Indigo", (107, 80, 246), (128, 706)),
-        PickableColor("Light Indigo", (153, 177, 251), (176, 711)),
-        #PickableColor("Dark Slate Blue", (74, 66, 132), (226, 713)),
-        PickableColor("Dark Purple", (120, 12, 153), (368, 710)),
-        PickableColor("Purple", (170, 56, 185), (414, 710)),
-        PickableColor("Light Purple", (224, 159, 249), (460, 708)),
-        PickableColor("Dark Pink", (203, 0, 122), (504, 707)),
-        PickableColor("Pink", (236, 31, 128), (556, 710)),
-        PickableColor("Light Pink", (243, 141, 169), (602, 712)),
-        PickableColor("Dark Brown", (104, 70, 52), (792, 710)),
-        PickableColor("Brown", (149, 104, 42), (840, 708)),
-        PickableColor("Beige", (248, 178, 119), (1125, 710)),
-        PickableColor("Dark Slate", (51 ,57, 65), (1360, 710)),
-        #PickableColor("Slate", (109, 117, 141), (1408, 710))
-)
-
-BACKGROUND_PIXEL: Color = (-1, -1, -1)
-
-AVAILABLE_COLORS: tuple[Color, ...] = tuple([color.color for color in PICKABLE_COLORS]) +\
-                                      (BACKGROUND_PIXEL,)
 
 class Drawing:
     def __init__(self, width: int, height: int,
-                 pixel_rows: list[list[Color]]=[], image_path: str | None = None):
-        if pixel_rows == []:
-            pixel_rows = []
-        
+                 pixels: np.ndarray | None = None, image_path: str | None = None):
         self.width: int = width
         self.height: int = height
-        self.pixel_rows: list[list[Color]] = pixel_rows
+
+        # one palette index (into AVAILABLE_COLORS) per pixel
+        self.pixels: np.ndarray = np.full((height, width), BACKGROUND_INDEX, dtype=np.uint8)\
+                if pixels is None else pixels
 
         self.resampling: Image.Resampling = Image.Resampling.LANCZOS
         self.dither: Image.Dither = Image.Dither.FLOYDSTEINBERG
@@ -84,107 +37,118 @@ class Drawing:
         self.selected_color: Color = AVAILABLE_COLORS[0]  # black
         self.background_color: Color = (0, 0, 100)
 
-        if self.pixel_rows != []:
-            return
-        
-        for _ in range(self.height):
-            self.pixel_rows.append([BACKGROUND_PIXEL] * self.width)
-
 
     def set_pixels_from_image(self, image_path: str) -> None:
         image = Image.open(image_path)
         image = image.convert("RGB")
         image = image.resize((self.width, self.height), self.resampling)
-        image = self.color_image(image)
-        image = image.convert("RGB")
+        self.pixels = self.color_image(image)
 
-        finished_pixels = list(image.getdata()) # type: ignore
-        finished_pixel_rows: list[list[Color]] = [finished_pixels[i * self.width:(i + 1) * self.width]
-                                             for i in range(self.height)]
-        
-        self.pixel_rows = finished_pixel_rows
 
+    def color_image(self, image: Image.Image) -> np.ndarray:
+        # palette indices of the closest colors, the background is never chosen
+        return quantize_image(np.asarray(image.convert("RGB")), QUANTIZE_PALETTE, self.dither)
+    
+    
+    def iter_row_bands(self, band_height: int = 64) -> Iterator[np.ndarray]:
+        for top in range(0, self.height, band_height):
+            yield self.pixels[top:top + band_height]
 
-    def color_image(self, image: Image.Image) -> Image.Image:
-        palette_image: Image.Image = Image.new("P", (1, 1))
 
-        palette: list[int] = []
-        for color in AVAILABLE_COLORS:
-            palette.extend(color)
-        palette = palette[:-3]  # remove background color
-        palette += [0, 0, 0] * (256 - len(palette) // 3)
+    def get_checksum(self) -> int:
+        return zlib.crc32(self.pixels.tobytes())
 
-        palette_image.putpalette(palette)
-
-        return image.quantize(palette=palette_image, dither=self.dither)
-    
-    
-    def update_pixel(self, row: int, column: int, erase: bool = False) -> None:
-        self.pixel_rows[row][column] = BACKGROUND_PIXEL if erase else self.selected_color
-    
 
     def num_nonbackground_pixels(self) -> int:
-        num_nonbackground_pixels: int = 0
+        return int(np.count_nonzero(self.pixels != BACKGROUND_INDEX))
 
-        for pixel_row in self.pixel_rows:
-            for pixel in pixel_row:
-                if pixel != BACKGROUND_PIXEL:
-                    num_nonbackground_pixels += 1
 
-        return num_nonbackground_pixels
-    
+    def get_pixel_indices(self, rows: np.ndarray, columns: np.ndarray) -> np.ndarray:
+        return self.pixels[rows, columns]
 
-    def get_same_color_neighbors(self, coords: tuple[int, int]) -> list[tuple[int, int]]:
-        neighbors: list[tuple[int, int]] = []
 
-        row: int = coords[0]
-        column: int = coords[1]
-        color: Color = self.pixel_rows[row][column]
-        for potential_neighbor in (row, column+1), (row+1, column), (row, column-1), (row-1, column):
-            is_valid_neighor = 0 <= potential_neighbor[0] < self.height\
-                    and 0 <= potential_neighbor[1] < self.width
-            
-            if is_valid_neighor and self.pixel_rows[potential_neighbor[0]][potential_neighbor[1]] == color:
-                neighbors.append(potential_neighbor)
+    def get_nonbackground_coordinates(self) -> tuple[np.ndarray, np.ndarray]:
+        return np.nonzero(self.pixels != BACKGROUND_INDEX)
 
-        return neighbors
+
+    def get_fill_mask(self, row: int, column: int) -> np.ndarray:
+        matches: np.ndarray = self.pixels == self.pixels[row, column]
+
+        # split every row into runs of matching pixels, runs are ordered by row then column
+        edges: np.ndarray = np.diff(np.pad(matches, ((0, 0), (1, 1))).astype(np.int8), axis=1)
+        run_rows, run_starts = np.nonzero(edges == 1)
+        run_ends: np.ndarray = np.nonzero(edges == -1)[1]  # exclusive
+        row_offsets: list[int] = np.searchsorted(run_rows, np.arange(self.height + 1)).tolist()
+
+        starts: list[int] = run_starts.tolist()
+        ends: list[int] = run_ends.tolist()
+        rows: list[int] = run_rows.tolist()
+
+        seed_run: int = row_offsets[row] + int(np.searchsorted(
+                run_starts[row_offsets[row]:row_offsets[row + 1]], column, side="right")) - 1
+        visited: np.ndarray = np.zeros(len(starts), dtype=bool)
+        visited[seed_run] = True
+        to_check_runs: list[int] = [seed_run]
+
+        mask: np.ndarray = np.zeros_like(matches)
+        while to_check_runs != []:
+            run: int = to_check_runs.pop()
+            run_row: int = rows[run]
+            mask[run_row, starts[run]:ends[run]] = True
+
+            for neighbor_row in run_row - 1, run_row + 1:
+                if not 0 <= neighbor_row < self.height:
+                    continue
+
+                # runs in the neighboring row that share at least one column with this run
+                first_run: int = row_offsets[neighbor_row]
+                last_run: int = row_offsets[neighbor_row + 1]
+                first_overlap: int = first_run + int(np.searchsorted(
+                        run_ends[first_run:last_run], starts[run], side="right"))
+                last_overlap: int = first_run + int(np.searchsorted(
+                        run_starts[first_run:last_run], ends[run], side="left"))
+
+                for neighbor_run in range(first_overlap, last_overlap):
+                    if not visited[neighbor_run]:
+                        visited[neighbor_run] = True
+                        to_check_runs.append(neighbor_run)
+
+        return mask
     
 
-    def paint_fill(self, row: int, column: int, color: Color) -> None:
-        to_fill: set[tuple[int, int]] = {(row, column)}
-        to_check_neighbors: list[tuple[int, int]] = [(row, column)]
+    def paint_fill(self, row: int, column: int, color: Color) -> np.ndarray:
+        color_index: int = COLOR_INDICES[color]
+        if self.pixels[row, column] == color_index:
+            return np.zeros_like(self.pixels, dtype=bool)
+
+        mask: np.ndarray = self.get_fill_mask(row, column)
+        self.pixels[mask] = color_index
+        return mask
 
-        while to_check_neighbors != []:
-            pixel_neighbors: list[tuple[int, int]] = self.get_same_color_neighbors(to_check_neighbors.pop(0))
 
-            for neighbor in pixel_neighbors:
-                if neighbor not in to_fill:
-                    to_fill.add(neighbor)
-                    to_check_neighbors.append(neighbor)
+    def get_render_palette(self) -> np.ndarray:
+        colors: list[Color] = list(AVAILABLE_COLORS)
+        colors[BACKGROUND_INDEX] = self.background_color
+        return np.array(colors, dtype=np.uint8)
 
-        for row, column in to_fill:
-            self.pixel_rows[row][column] = color
+
+    def get_color_strings(self) -> list[str]:
+        return [self.get_color_as_string(color) for color in AVAILABLE_COLORS]
 
 
     def get_color_as_string(self, color: Color) -> str:
         if color == BACKGROUND_PIXEL:
             color = self.background_color
 
-        rgb_number: int = color[0] * (2**16) + color[1] * (2**8) + color[2]
-        return f"#{rgb_number:06x}"
+        return get_color_as_hex(color)
     
 
-def get_pickable_from_color(color: Color) -> PickableColor:
-    if color == BACKGROUND_PIXEL:
-        return PickableColor("background", BACKGROUND_PIXEL, (0, 0))
-    
-    for pickable in PICKABLE_COLORS:
-        if pickable.color == color:
-            return pickable
-    
-    print(f"could not find color: {color}")
-    return PickableColor("background", BACKGROUND_PIXEL, (0, 0))
+def get_drawing_from_canvas_image(image_path: str, width: int, height: int) -> Drawing:
+    # a screenshot of existing pixel art, so pixels are snapped to the palette without blending
+    drawing: Drawing = Drawing(width, height)
+    drawing.resampling = Image.Resampling.NEAREST
+    drawing.dither = Image.Dither.NONE
+    drawing.set_pixels_from_image(image_path)
 
+    return drawing
 
-def get_string_as_color(string: str):
-    return (int(string[1:3], base=16), int(string[3:5], base=16), int(string[5:7], base=16))
\ No newline at end of file
@@ -0,0 +1,126 @@
+import numpy as np
+
+HISTORY_MEMORY_BYTES: int = 32 * 2**20
+
+
+class PixelEdit:
+    # one stroke or fill as flat cell indices with the palette indices before and after,
+    # a color array of length one stands for every cell having that color
+    def __init__(self, cell_indices: np.ndarray, old_colors: np.ndarray, new_colors: np.ndarray):
+        self.cell_indices: np.ndarray = cell_indices
+        self.old_colors: np.ndarray = old_colors
+        self.new_colors: np.ndarray = new_colors
+
+
+    @property
+    def nbytes(self) -> int:
+        return self.cell_indices.nbytes + self.old_colors.nbytes + self.new_colors.nbytes
+
+
+def compact_colors(colors: np.ndarray) -> np.ndarray:
+    if len(colors) > 1 and np.all(colors == colors[0]):
+        return colors[:1].copy()
+    return colors
+
+
+def get_cells_mask(rows: np.ndarray, columns: np.ndarray) -> tuple[np.ndarray, int, int]:
+    # mask over the bounding box of the cells, with the box's top and left
+    top: int = int(rows.min())
+    left: int = int(columns.min())
+    mask: np.ndarray = np.zeros((int(rows.max()) + 1 - top, int(columns.max()) + 1 - left), dtype=bool)
+    mask[rows - top, columns - left] = True
+    return mask, top, left
+
+
+class EditHistory:
+    # undo and redo stacks of pixel edits, the oldest edits are dropped past the memory budget
+    def __init__(self, width: int, memory_bytes: int = HISTORY_MEMORY_BYTES):
+        self.width: int = width
+        self.memory_bytes: int = memory_bytes
+        self.undo_edits: list[PixelEdit] = []
+        self.redo_edits: list[PixelEdit] = []
+        self.used_bytes: int = 0
+
+        # (cell indices, old colors, new colors) recorded since the mouse was pressed
+        self.pending_changes: list[tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+
+
+    def record(self, changed_mask: np.ndarray, old_colors: np.ndarray | int, new_colors: np.ndarray | int,
+               mask_top: int = 0, mask_left: int = 0) -> None:
+        # colors are either arrays shaped like the mask or a single palette index
+        rows, columns = np.nonzero(changed_mask)
+        if len(rows) == 0:
+            return
+
+        cell_indices: np.ndarray = ((rows + mask_top) * self.width + columns + mask_left).astype(np.int32)
+        self.pending_changes.append((cell_indices,
+                                     np.broadcast_to(old_colors, changed_mask.shape)[rows, columns].astype(np.uint8),
+                                     np.broadcast_to(new_colors, changed_mask.shape)[rows, columns].astype(np.uint8)))
+
+
+    def finish_edit(self) -> None:
+        # groups everything since the mouse was pressed into one edit
+        if self.pending_changes == []:
+            return
+
+        cell_indices, old_colors, new_colors = (np.concatenate(column) for column in zip(*self.pending_changes))
+        self.pending_changes = []
+
+        # a cell painted several times keeps its first old color and its last new color
+        unique_cells, first_changes = np.unique(cell_indices, return_index=True)
+        last_changes: np.ndarray = len(cell_indices) - 1 - np.unique(cell_indices[::-1], return_index=True)[1]
+        old_colors = old_colors[first_changes]
+        new_colors = new_colors[last_changes]
+
+        changed: np.ndarray = old_colors != new_colors
+        if not np.any(changed):
+            return
+
+        edit: PixelEdit = PixelEdit(unique_cells[changed], compact_colors(old_colors[changed]),
+                                    compact_colors(new_colors[changed]))
+        self.used_bytes -= sum(redo_edit.nbytes for redo_edit in self.redo_edits)
+        self.redo_edits = []
+
+        if edit.nbytes > self.memory_bytes:  # older edits cannot be undone past one that was not kept
+            self.clear()
+            return
+
+        self.undo_edits.append(edit)
+        self.used_bytes += edit.nbytes
+        while self.used_bytes > self.memory_bytes:
+            self.used_bytes -= self.undo_edits.pop(0).nbytes
+
+
+    def apply_edit(self, pixels: np.ndarray, cell_indices: np.ndarray,
+                   colors: np.ndarray) -> tuple[np.ndarray, int, int]:
+        rows, columns = np.divmod(cell_indices, self.width)
+        pixels[rows, columns] = colors
+        return get_cells_mask(rows, columns)
+
+
+    def undo(self, pixels: np.ndarray) -> tuple[np.ndarray, int, int] | None:
+        # returns the changed cells for repainting, as a mask with its top and left
+        self.finish_edit()
+        if self.undo_edits == []:
+            return None
+
+        edit: PixelEdit = self.undo_edits.pop()
+        self.redo_edits.append(edit)
+        return self.apply_edit(pixels, edit.cell_indices, edit.old_colors)
+
+
+    def redo(self, pixels: np.ndarray) -> tuple[np.ndarray, int, int] | None:
+        self.finish_edit()
+        if self.redo_edits == []:
+            return None
+
+        edit: PixelEdit = self.redo_edits.pop()
+        self.undo_edits.append(edit)
+        return self.apply_edit(pixels, edit.cell_indices, edit.new_colors)
+
+
+    def clear(self) -> None:
+        self.undo_edits = []
+        self.redo_edits = []
+        self.pending_changes = []
+        self.used_bytes = 0
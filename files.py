@@ -1,113 +1,383 @@
 from pathlib import Path
+from collections.abc import Iterator
+import os
+import shutil
+import tempfile
+from itertools import islice
+import json
+import struct
+import zlib
+import numpy as np
 from drawing import Drawing
-from drawing import Color
-from macro import MouseState, Macro
+from drawing import BACKGROUND_INDEX, get_indices_from_colors
+from macro import Macro, MacroSamples, MouseState, RunCheckpoint
+from tiled_drawing import TiledDrawing
+from palette import PALETTE
+from library import DrawingLibrary, LIBRARY_FILENAME, get_library_entry
 
 SAVED_DRAWINGS_PATH: Path = Path(__file__).parent / "saved_drawings"
 MACROS_PATH: Path = Path(__file__).parent / "macros"
+UNSAVED_DRAWINGS_PATH: Path = SAVED_DRAWINGS_PATH / "unsaved"  # tiled drawings being edited before their first save
+
+CHECKPOINT_SUFFIX: str = ".checkpoint.json"
+DRAWING_SUFFIX: str = ".wpd"
+TILED_DRAWING_SUFFIX: str = ".wpt"
+LEGACY_DRAWING_SUFFIX: str = ".txt"
+DRAWING_SUFFIXES: tuple[str, ...] = (DRAWING_SUFFIX, TILED_DRAWING_SUFFIX, LEGACY_DRAWING_SUFFIX)
+
+TILED_DRAWING_MIN_PIXELS: int = 1024 * 1024  # larger drawings are saved tiled
+
+# binary drawing format: magic, width, height, palette length, palette RGB bytes,
+# then a zlib stream with one palette index byte per pixel (row-major)
+DRAWING_MAGIC: bytes = b"WPD1"
+DRAWING_HEADER_FORMAT: str = "<4sIIH"
+BACKGROUND_FILE_INDEX: int = 255
+
+MACRO_SUFFIX: str = ".wpm"
+LEGACY_MACRO_SUFFIX: str = ".txt"
+
+# binary macro format: magic, poll rate, name length and name, then blocks of up to
+# MACRO_BLOCK_SAMPLES samples. each block is its sample count and compressed length, then a
+# zlib stream of x, y, buttons and timestamps as columns, delta encoded except buttons.
+MACRO_MAGIC: bytes = b"WPM1"
+MACRO_HEADER_FORMAT: str = "<4sIH"
+MACRO_BLOCK_FORMAT: str = "<II"
+MACRO_BLOCK_SAMPLES: int = 4096
+MACRO_TIME_UNIT_SECONDS: float = .001  # finer than sleeps can be timed, and far more compressible
+
+_library: DrawingLibrary | None = None  # opened on first use
+
+
+def get_library() -> DrawingLibrary:
+    global _library
+    if _library is None:
+        SAVED_DRAWINGS_PATH.mkdir(exist_ok=True)
+        library_path: Path = SAVED_DRAWINGS_PATH / LIBRARY_FILENAME
+        library_exists: bool = library_path.exists()
+
+        _library = DrawingLibrary(library_path)
+        if not library_exists:
+            rebuild_library()
+
+    return _library
+
+
+def close_library() -> None:
+    # connections cannot be shared with forked processes, which open their own on first use
+    global _library
+    if _library is not None:
+        _library.close()
+        _library = None
+
+
+def rebuild_library() -> int:
+    # re-indexes drawings whose files changed outside the app and drops deleted ones, returns the number re-indexed
+    library: DrawingLibrary = get_library()
+    indexed_times: dict[str, float] = library.get_modified_times()
+
+    drawing_names: set[str] = {drawing_file.stem for drawing_file in SAVED_DRAWINGS_PATH.iterdir()
+                               if drawing_file.suffix in DRAWING_SUFFIXES}
+    for removed_name in indexed_times.keys() - drawing_names:
+        library.remove_entry(removed_name)
+
+    num_indexed: int = 0
+    for drawing_name in drawing_names:
+        if indexed_times.get(drawing_name) != get_drawing_path(drawing_name).stat().st_mtime:
+            update_library_entry(drawing_name)
+            num_indexed += 1
+
+    return num_indexed
+
+
+def update_library_entry(drawing_name: str) -> None:
+    drawing_path: Path = get_drawing_path(drawing_name)
+    drawing: Drawing | TiledDrawing = load_drawing_from_path(drawing_path)
+
+    get_library().add_entry(get_library_entry(drawing_name, drawing_path, drawing))
+    if isinstance(drawing, TiledDrawing):
+        drawing.close()
 
 
 def get_list_drawing_names() -> list[str]:
-    drawing_names: list[str] = [drawing_file.stem for drawing_file in SAVED_DRAWINGS_PATH.iterdir()]
-    return drawing_names
+    return get_library().get_names()
 
 
-def get_valid_filename(name: str) -> str:
-    existing_names: list[str] = get_list_drawing_names()
+def get_valid_filename(name: str, suffix: str = DRAWING_SUFFIX) -> str:
+    library: DrawingLibrary = get_library()
 
     if name == "":
         name = "unnamed_drawing"
-    while name in existing_names:
+    # files not indexed yet, copied in or saved by another process, must not be overwritten either
+    while library.contains(name) or any((SAVED_DRAWINGS_PATH / f"{name}{drawing_suffix}").exists()
+                                        for drawing_suffix in DRAWING_SUFFIXES):
         name += "_again"
     
-    return f"{name}.txt"
+    return f"{name}{suffix}"
 
 
-def get_text_representation(drawing: Drawing) -> str:
-    text: str = ""
+def get_drawing_path(drawing_name: str) -> Path:
+    for suffix in DRAWING_SUFFIXES:
+        drawing_path: Path = SAVED_DRAWINGS_PATH / f"{drawing_name}{suffix}"
+        if drawing_path.exists():
+            return drawing_path
 
-    for row in drawing.pixel_rows:
-        for index, pixel in enumerate(row):
-            text += f"{pixel[0]} {pixel[1]} {pixel[2]}"
+    return SAVED_DRAWINGS_PATH / f"{drawing_name}{DRAWING_SUFFIX}"
 
-            if index != len(row) - 1:
-                text += ","
 
-        if row is not drawing.pixel_rows[-1]:
-            text += "\n"
+def write_drawing(drawing: Drawing | TiledDrawing, drawing_path: Path) -> None:
+    compressor = zlib.compressobj(level=6)
 
-    return text
+    with drawing_path.open("wb") as writer:
+        writer.write(struct.pack(DRAWING_HEADER_FORMAT, DRAWING_MAGIC,
+                                 drawing.width, drawing.height, len(PALETTE.color_array)))
+        writer.write(PALETTE.color_array.tobytes())
 
+        for row in (row for band in drawing.iter_row_bands() for row in band):
+            file_row: np.ndarray = np.where(row == BACKGROUND_INDEX, BACKGROUND_FILE_INDEX, row)
+            writer.write(compressor.compress(file_row.astype(np.uint8).tobytes()))
+        writer.write(compressor.flush())
+
+
+def read_drawing(drawing_path: Path) -> Drawing:
+    with drawing_path.open("rb") as reader:
+        header_size: int = struct.calcsize(DRAWING_HEADER_FORMAT)
+        _, width, height, palette_length = struct.unpack(DRAWING_HEADER_FORMAT,
+                                                         reader.read(header_size))
+        palette: np.ndarray = np.frombuffer(reader.read(palette_length * 3), dtype=np.uint8)
+        raw_pixels: bytes = zlib.decompress(reader.read())
+
+    # translate file palette indices into current palette indices
+    index_table: np.ndarray = np.full(256, BACKGROUND_INDEX, dtype=np.uint8)
+    index_table[:palette_length] = get_indices_from_colors(palette.reshape(palette_length, 3))
+
+    file_pixels: np.ndarray = np.frombuffer(raw_pixels, dtype=np.uint8).reshape(height, width)
+    return Drawing(width, height, index_table[file_pixels])
+
+
+def read_legacy_drawing(drawing_path: Path) -> Drawing:
+    with drawing_path.open("r", encoding="utf-8") as reader:
+        raw_data: str = reader.read()
+
+    raw_data_rows: list[str] = raw_data.split("\n")
+    height: int = len(raw_data_rows)
+    width: int = raw_data_rows[0].count(",") + 1
+
+    color_values: np.ndarray = np.array(raw_data.replace(",", " ").split(), dtype=np.int32)
+    pixels: np.ndarray = get_indices_from_colors(color_values.reshape(height, width, 3))
+
+    return Drawing(width, height, pixels)
+
+
+def is_binary_drawing(drawing_path: Path) -> bool:
+    with drawing_path.open("rb") as reader:
+        return reader.read(len(DRAWING_MAGIC)) == DRAWING_MAGIC
+
+
+def save_new_drawing(drawing: Drawing, name: str) -> str:
+    # returns the name the drawing was saved under
+    if drawing.width * drawing.height >= TILED_DRAWING_MIN_PIXELS:
+        tiled_drawing: TiledDrawing = save_new_tiled_drawing(drawing, name)
+        tiled_drawing.close()
+        return tiled_drawing.path.stem
 
-def save_new_drawing(drawing: Drawing, name: str) -> None:
     filename: str = get_valid_filename(name)
     new_drawing_path: Path = SAVED_DRAWINGS_PATH / filename
 
-    with new_drawing_path.open("w", encoding="utf-8") as writer:
-        writer.write(get_text_representation(drawing))
+    write_drawing(drawing, new_drawing_path)
+    get_library().add_entry(get_library_entry(new_drawing_path.stem, new_drawing_path, drawing))
+    return new_drawing_path.stem
+
+
+def save_new_tiled_drawing(drawing: Drawing, name: str) -> TiledDrawing:
+    filename: str = get_valid_filename(name, TILED_DRAWING_SUFFIX)
+    tiled_drawing: TiledDrawing = TiledDrawing.from_drawing(SAVED_DRAWINGS_PATH / filename, drawing)
+
+    get_library().add_entry(get_library_entry(tiled_drawing.path.stem, tiled_drawing.path, drawing))
+    return tiled_drawing
+
+
+def get_unsaved_drawing_path() -> Path:
+    UNSAVED_DRAWINGS_PATH.mkdir(parents=True, exist_ok=True)
+    file_descriptor, unsaved_path = tempfile.mkstemp(suffix=TILED_DRAWING_SUFFIX, dir=UNSAVED_DRAWINGS_PATH)
+    os.close(file_descriptor)
+    return Path(unsaved_path)
+
+
+def create_unsaved_tiled_drawing(drawing: Drawing) -> TiledDrawing:
+    # tiled drawings are edited on disk, so a new one is kept out of the library until it is saved
+    return TiledDrawing.from_drawing(get_unsaved_drawing_path(), drawing)
+
+
+def open_tiled_working_copy(drawing_name: str) -> TiledDrawing:
+    # saved tiled drawings are edited through a copy, so only saving changes the library
+    unsaved_path: Path = get_unsaved_drawing_path()
+    shutil.copyfile(get_drawing_path(drawing_name), unsaved_path)
+    return TiledDrawing(unsaved_path)
+
+
+def is_unsaved_drawing(drawing_path: Path) -> bool:
+    return drawing_path.parent == UNSAVED_DRAWINGS_PATH
+
+
+def save_unsaved_tiled_drawing(unsaved_path: Path, name: str) -> str:
+    # the tiled drawing must be closed first, returns the name it was saved under
+    new_drawing_path: Path = SAVED_DRAWINGS_PATH / get_valid_filename(name, TILED_DRAWING_SUFFIX)
+    unsaved_path.replace(new_drawing_path)
+
+    update_library_entry(new_drawing_path.stem)
+    return new_drawing_path.stem
+
+
+def delete_unsaved_drawings() -> None:
+    # left behind when the app was closed while editing
+    if UNSAVED_DRAWINGS_PATH.exists():
+        for unsaved_path in UNSAVED_DRAWINGS_PATH.iterdir():
+            unsaved_path.unlink(missing_ok=True)
 
 
 def delete_drawing(drawing_name: str) -> None:
-    deletion_path: Path = SAVED_DRAWINGS_PATH / f"{drawing_name}.txt"
+    deletion_path: Path = get_drawing_path(drawing_name)
     deletion_path.unlink()
+    delete_run_checkpoint(drawing_name)
+    get_library().remove_entry(drawing_name)
 
 
-def load_drawing_from_name(drawing_name: str) -> Drawing:
-    drawing_path: Path = SAVED_DRAWINGS_PATH / f"{drawing_name}.txt"
+def load_drawing_from_name(drawing_name: str) -> Drawing | TiledDrawing:
+    return load_drawing_from_path(get_drawing_path(drawing_name))
 
-    with drawing_path.open("r", encoding="utf-8") as reader:
-        raw_data: str = reader.read()
 
-    
-    pixel_rows: list[list[Color]] = []
+def load_drawing_from_path(drawing_path: Path) -> Drawing | TiledDrawing:
+    if drawing_path.suffix == TILED_DRAWING_SUFFIX:
+        return TiledDrawing(drawing_path)
+    if is_binary_drawing(drawing_path):
+        return read_drawing(drawing_path)
+    return read_legacy_drawing(drawing_path)
 
-    raw_data_rows: list[str] = raw_data.split("\n")
-    for raw_data_row in raw_data_rows:
-        row_data: list[Color] = []
 
-        for raw_color_data in raw_data_row.split(","):
-            color_data: list[str] = raw_color_data.split(" ")
-            color: Color = tuple(map(int, color_data)) # type: ignore
-            row_data.append(color)
+def get_run_checkpoint_path(drawing_name: str) -> Path:
+    return SAVED_DRAWINGS_PATH / f"{drawing_name}{CHECKPOINT_SUFFIX}"
 
-        pixel_rows.append(row_data)
 
-    return Drawing(len(pixel_rows[0]), len(pixel_rows), pixel_rows)
+def write_run_checkpoint(drawing_name: str, checkpoint: RunCheckpoint) -> None:
+    # written to a temporary file first so a crash mid-write never leaves a broken checkpoint
+    checkpoint_path: Path = get_run_checkpoint_path(drawing_name)
+    temporary_path: Path = checkpoint_path.with_suffix(".tmp")
 
+    with temporary_path.open("w", encoding="utf-8") as writer:
+        json.dump(vars(checkpoint), writer)
+    temporary_path.replace(checkpoint_path)
 
-def write_macro(macro: Macro) -> None:
-    new_macro_path: Path = MACROS_PATH / f"{macro.name}.txt"
 
-    with new_macro_path.open("w", encoding="utf-8") as writer:
-        writer.write(str(macro.poll_rate_hertz))
+def read_run_checkpoint(drawing_name: str) -> RunCheckpoint | None:
+    checkpoint_path: Path = get_run_checkpoint_path(drawing_name)
+    if not checkpoint_path.exists():
+        return None
 
-        for mouse_state in macro.mouse_states:
-            mouse_x: int = mouse_state.positon[0]
-            mouse_y: int = mouse_state.positon[1]
-            is_clicked: int = int(mouse_state.clicked)
-            writer.write(f"\n{mouse_x},{mouse_y},{is_clicked}")
+    with checkpoint_path.open(encoding="utf-8") as reader:
+        return RunCheckpoint(**json.load(reader))
 
 
-def read_macro(name: str) -> Macro:
-    macro_path: Path = MACROS_PATH / f"{name}.txt"
+def delete_run_checkpoint(drawing_name: str) -> None:
+    get_run_checkpoint_path(drawing_name).unlink(missing_ok=True)
+
+
+def get_macro_path(name: str) -> Path:
+    binary_path: Path = MACROS_PATH / f"{name}{MACRO_SUFFIX}"
+    legacy_path: Path = MACROS_PATH / f"{name}{LEGACY_MACRO_SUFFIX}"
+    return legacy_path if legacy_path.exists() and not binary_path.exists() else binary_path
+
 
+def write_macro(macro: Macro, path: Path | None = None) -> None:
+    new_macro_path: Path = MACROS_PATH / f"{macro.name}{MACRO_SUFFIX}" if path is None else path
+    encoded_name: bytes = macro.name.encode("utf-8")
+    samples: MacroSamples = macro.samples
+
+    with new_macro_path.open("wb") as writer:
+        writer.write(struct.pack(MACRO_HEADER_FORMAT, MACRO_MAGIC, macro.poll_rate_hertz, len(encoded_name)))
+        writer.write(encoded_name)
+
+        for block_start in range(0, len(samples), MACRO_BLOCK_SAMPLES):
+            block = slice(block_start, block_start + MACRO_BLOCK_SAMPLES)
+            time_units: np.ndarray = np.round(np.frombuffer(samples.times, dtype=np.float64)[block]
+                                              / MACRO_TIME_UNIT_SECONDS)
+
+            # each block is delta encoded from zero so it can be decoded on its own
+            columns: bytes = b"".join((
+                    np.diff(np.frombuffer(samples.x, dtype=np.int32)[block], prepend=0).astype("<i4").tobytes(),
+                    np.diff(np.frombuffer(samples.y, dtype=np.int32)[block], prepend=0).astype("<i4").tobytes(),
+                    np.frombuffer(samples.buttons, dtype=np.uint8)[block].tobytes(),
+                    np.diff(time_units.astype(np.int64), prepend=0).astype("<i8").tobytes()))
+            compressed_block: bytes = zlib.compress(columns, 6)
+
+            num_samples: int = min(MACRO_BLOCK_SAMPLES, len(samples) - block_start)
+            writer.write(struct.pack(MACRO_BLOCK_FORMAT, num_samples, len(compressed_block)))
+            writer.write(compressed_block)
+
+
+def read_macro_header(name: str) -> Macro:
+    # the macro without its samples, which iter_macro_samples streams
+    macro_path: Path = get_macro_path(name)
+
+    with macro_path.open("rb") as reader:
+        if macro_path.suffix == LEGACY_MACRO_SUFFIX:
+            return Macro(name, poll_rate_hertz=int(reader.readline()))
+
+        _, poll_rate_hertz, name_length = struct.unpack(MACRO_HEADER_FORMAT,
+                                                        reader.read(struct.calcsize(MACRO_HEADER_FORMAT)))
+        return Macro(reader.read(name_length).decode("utf-8"), poll_rate_hertz=poll_rate_hertz)
+
+
+def iter_macro_blocks(name: str) -> Iterator[tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]:
+    # (x, y, buttons, times) arrays, one block of samples at a time
+    macro_path: Path = get_macro_path(name)
+
+    if macro_path.suffix == LEGACY_MACRO_SUFFIX:
+        yield from iter_legacy_macro_blocks(macro_path)
+        return
+
+    with macro_path.open("rb") as reader:
+        _, _, name_length = struct.unpack(MACRO_HEADER_FORMAT, reader.read(struct.calcsize(MACRO_HEADER_FORMAT)))
+        reader.seek(name_length, 1)
+
+        block_header_size: int = struct.calcsize(MACRO_BLOCK_FORMAT)
+        while block_header := reader.read(block_header_size):
+            num_samples, compressed_length = struct.unpack(MACRO_BLOCK_FORMAT, block_header)
+            columns: bytes = zlib.decompress(reader.read(compressed_length))
+
+            x: np.ndarray = np.cumsum(np.frombuffer(columns, "<i4", num_samples, 0))
+            y: np.ndarray = np.cumsum(np.frombuffer(columns, "<i4", num_samples, 4 * num_samples))
+            buttons: np.ndarray = np.frombuffer(columns, np.uint8, num_samples, 8 * num_samples)
+            time_units: np.ndarray = np.cumsum(np.frombuffer(columns, "<i8", num_samples, 9 * num_samples))
+            yield x, y, buttons, time_units * MACRO_TIME_UNIT_SECONDS
+
+
+def iter_legacy_macro_blocks(macro_path: Path) -> Iterator[tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]:
+    # text macros have no timestamps, samples were taken once per poll
     with macro_path.open(encoding="utf-8") as reader:
-        macro_lines: list[str] = reader.readlines()
+        poll_rate_hertz: int = int(reader.readline())
+        sample_index: int = 0
+
+        while block_lines := list(islice(reader, MACRO_BLOCK_SAMPLES)):
+            block: np.ndarray = np.array([line.split(",") for line in block_lines], dtype=np.int32).reshape(-1, 3)
+            times: np.ndarray = (sample_index + np.arange(len(block))) / poll_rate_hertz
+            yield block[:, 0], block[:, 1], block[:, 2].astype(np.uint8), times
+            sample_index += len(block)
 
-    poll_rate_hertz: int = int(macro_lines[0])
 
-    mouse_states: list[MouseState] = []
-    for line in macro_lines[1:]:
-        mouse_data: list[str] = line.split(",")
-        mouse_x: int = int(mouse_data[0])
-        mouse_y: int = int(mouse_data[1])
-        clicked: bool = bool(int(mouse_data[2]))
+def iter_macro_samples(name: str) -> Iterator[MouseState]:
+    for x, y, buttons, times in iter_macro_blocks(name):
+        for mouse_x, mouse_y, mouse_buttons, time in zip(x.tolist(), y.tolist(), buttons.tolist(), times.tolist()):
+            yield MouseState((mouse_x, mouse_y), bool(mouse_buttons & 1), time)
 
-        mouse_states.append(MouseState((mouse_x, mouse_y), clicked))
 
-    return Macro(name, mouse_states, poll_rate_hertz)
+def read_macro(name: str) -> Macro:
+    macro: Macro = read_macro_header(name)
+    macro.name = name
+
+    for x, y, buttons, times in iter_macro_blocks(name):
+        macro.samples.extend(x, y, buttons, times)
+    return macro
 
 
 def delete_macro(name: str) -> None:
-    macro_path: Path = MACROS_PATH / f"{name}.txt"
-    macro_path.unlink()
\ No newline at end of file
+    get_macro_path(name).unlink()
\ No newline at end of file
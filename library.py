@@ -0,0 +1,107 @@
+import json
+import sqlite3
+from pathlib import Path
+import numpy as np
+from drawing import Drawing
+from palette import PALETTE, get_color_as_hex
+from tiled_drawing import TiledDrawing
+from macro import estimate_run_seconds
+
+LIBRARY_FILENAME: str = "library.sqlite3"
+LOCK_TIMEOUT_SECONDS: float = 30  # batch imports save from several processes at once
+
+
+class LibraryEntry:
+    def __init__(self, name: str, suffix: str, width: int, height: int, pixels: int,
+                 color_counts: dict[str, int], estimated_seconds: float, modified_time: float):
+        self.name: str = name
+        self.suffix: str = suffix
+        self.width: int = width
+        self.height: int = height
+        self.pixels: int = pixels  # non-background
+        self.color_counts: dict[str, int] = color_counts  # by hex string, background excluded
+        self.estimated_seconds: float = estimated_seconds
+        self.modified_time: float = modified_time
+
+
+def get_color_counts(drawing: Drawing | TiledDrawing) -> dict[str, int]:
+    counts: np.ndarray = np.zeros(len(PALETTE), dtype=np.int64)
+    for band in drawing.iter_row_bands():
+        counts += np.bincount(band.reshape(-1), minlength=len(PALETTE))
+
+    return {get_color_as_hex(PALETTE.colors[index]): count
+            for index, count in enumerate(counts[:PALETTE.background_index].tolist()) if count > 0}
+
+
+def get_library_entry(name: str, drawing_path: Path, drawing: Drawing | TiledDrawing) -> LibraryEntry:
+    color_counts: dict[str, int] = get_color_counts(drawing)
+    return LibraryEntry(name, drawing_path.suffix, drawing.width, drawing.height, sum(color_counts.values()),
+                        color_counts, estimate_run_seconds(drawing), drawing_path.stat().st_mtime)
+
+
+def get_entry_from_row(row: tuple) -> LibraryEntry:
+    name, suffix, width, height, pixels, color_counts, estimated_seconds, modified_time = row
+    return LibraryEntry(name, suffix, width, height, pixels, json.loads(color_counts),
+                        estimated_seconds, modified_time)
+
+
+def format_seconds(seconds: float) -> str:
+    hours, seconds = divmod(int(seconds), 3600)
+    return f"{hours}:{seconds // 60:02}:{seconds % 60:02}"
+
+
+class DrawingLibrary:
+    # index of the saved drawings folder so listing and naming never have to read drawing files
+    def __init__(self, library_path: Path):
+        self.library_path: Path = library_path
+        self.connection: sqlite3.Connection = sqlite3.connect(library_path, timeout=LOCK_TIMEOUT_SECONDS,
+                                                              check_same_thread=False)
+        self.connection.execute("""CREATE TABLE IF NOT EXISTS drawings (
+                                   name TEXT PRIMARY KEY, suffix TEXT, width INTEGER, height INTEGER,
+                                   pixels INTEGER, color_counts TEXT, estimated_seconds REAL,
+                                   modified_time REAL)""")
+        self.connection.commit()
+
+
+    def add_entry(self, entry: LibraryEntry) -> None:
+        with self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO drawings VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                    (entry.name, entry.suffix, entry.width, entry.height, entry.pixels,
+                                     json.dumps(entry.color_counts), entry.estimated_seconds,
+                                     entry.modified_time))
+
+
+    def remove_entry(self, name: str) -> None:
+        with self.connection:
+            self.connection.execute("DELETE FROM drawings WHERE name = ?", (name,))
+
+
+    def get_entry(self, name: str) -> LibraryEntry | None:
+        row: tuple | None = self.connection.execute("SELECT * FROM drawings WHERE name = ?",
+                                                    (name,)).fetchone()
+        return None if row is None else get_entry_from_row(row)
+
+
+    def get_entries(self, offset: int = 0, limit: int = -1) -> list[LibraryEntry]:
+        return [get_entry_from_row(row) for row in self.connection.execute(
+                "SELECT * FROM drawings ORDER BY name LIMIT ? OFFSET ?", (limit, offset))]
+
+
+    def count(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM drawings").fetchone()[0]
+
+
+    def contains(self, name: str) -> bool:
+        return self.connection.execute("SELECT 1 FROM drawings WHERE name = ?", (name,)).fetchone() is not None
+
+
+    def get_names(self) -> list[str]:
+        return [name for name, in self.connection.execute("SELECT name FROM drawings ORDER BY name")]
+
+
+    def get_modified_times(self) -> dict[str, float]:
+        return dict(self.connection.execute("SELECT name, modified_time FROM drawings"))
+
+
+    def close(self) -> None:
+        self.connection.close()
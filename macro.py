@@ -1,26 +1,170 @@
-from time import sleep
 from macro_utils import *
 from typing import Literal
-from drawing import BACKGROUND_PIXEL, Drawing, Color, PickableColor, get_pickable_from_color
-from datetime import datetime, timedelta
-from math import floor
+from drawing import BACKGROUND_PIXEL, Drawing, PickableColor
+from palette import PALETTE
+from tiled_drawing import TiledDrawing
+from charges import ChargeScheduler
+from planner import MovementPlan, Position, plan_drawing, plan_run, plan_color_passes,\
+                    count_serpentine_drags, get_moves, get_drags
+import queue
+import threading
+from array import array
+from collections.abc import Callable, Iterable, Iterator
+import zlib
+import numpy as np
+from datetime import datetime
 
 PAINT_BUTTON_LOCATION: tuple[int, int] = (740, 783)
+PIXELS_PER_SUBMIT: int = 10
+RUN_START_SECONDS: float = .1
+MIN_CLICK_HOLD_SECONDS: float = .01
+SIMPLIFY_TOLERANCE_PIXELS: float = 1.5
+OPTIMIZED_MACRO_SUFFIX: str = "_optimized"
 
 
 class MouseState:
-    def __init__(self, position: tuple[int, int] | None = None, clicked: bool | None = None):
+    def __init__(self, position: tuple[int, int] | None = None, clicked: bool | None = None, time: float = 0):
         position = get_mouse_position() if position is None else position
-        self.positon: tuple[int, int] = position
+        self.position: tuple[int, int] = position
 
         clicked = is_key_pressed("leftclick") if clicked is None else clicked
         self.clicked: bool = clicked
+        self.time: float = time  # seconds since the start of the macro
+
+
+class MacroSamples:
+    # recorded mouse states as typed arrays, 17 bytes a sample instead of a python object each
+    def __init__(self):
+        self.x: array = array("i")
+        self.y: array = array("i")
+        self.buttons: array = array("B")  # bit 0 is the left button
+        self.times: array = array("d")
+
+
+    def append(self, position: tuple[int, int], clicked: bool, time: float) -> None:
+        self.x.append(position[0])
+        self.y.append(position[1])
+        self.buttons.append(int(clicked))
+        self.times.append(time)
+
+
+    def extend(self, x: np.ndarray, y: np.ndarray, buttons: np.ndarray, times: np.ndarray) -> None:
+        self.x.frombytes(x.astype(np.int32).tobytes())
+        self.y.frombytes(y.astype(np.int32).tobytes())
+        self.buttons.frombytes(buttons.astype(np.uint8).tobytes())
+        self.times.frombytes(times.astype(np.float64).tobytes())
+
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+
+    def __iter__(self) -> Iterator[MouseState]:
+        for x, y, buttons, time in zip(self.x, self.y, self.buttons, self.times):
+            yield MouseState((x, y), bool(buttons & 1), time)
+
+
+    def get_arrays(self) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        return (np.frombuffer(self.x, dtype=np.int32), np.frombuffer(self.y, dtype=np.int32),
+                np.frombuffer(self.buttons, dtype=np.uint8), np.frombuffer(self.times, dtype=np.float64))
+
+
+    def count_input_events(self) -> int:
+        # moves and button edges that playback sends, repeated states are held instead
+        x, y, buttons, _ = self.get_arrays()
+        if len(x) == 0:
+            return 0
+        moves: int = 1 + int(np.count_nonzero((np.diff(x) != 0) | (np.diff(y) != 0)))
+        edges: int = int(np.count_nonzero(np.diff(buttons & 1, prepend=0)))
+        return moves + edges
+
+
+    def get_timing_report(self, poll_rate_hertz: float) -> str:
+        if len(self) < 2:
+            return f"{len(self)} samples"
+
+        intervals: np.ndarray = np.diff(np.frombuffer(self.times, dtype=np.float64))
+        jitter: np.ndarray = np.abs(intervals - 1 / poll_rate_hertz) * 1000
+        return f"{len(self)} samples over {self.times[-1]:.2f} seconds, "\
+               f"{(len(self) - 1) / self.times[-1]:.1f} Hz of {poll_rate_hertz} Hz requested, "\
+               f"jitter {jitter.mean():.2f} ms mean and {jitter.max():.2f} ms max"
+
+
+class RunCheckpoint:
+    def __init__(self, completed_pixels: int, charges_used: int, drawing_checksum: int,
+                 timestamp: str | None = None, batch_start: int = 0, batch_size: int = 0,
+                 batch_origin: tuple[int, int] | list[int] = (0, 0)):
+        self.completed_pixels: int = completed_pixels  # plan pixels already placed and submitted
+        self.charges_used: int = charges_used
+        self.drawing_checksum: int = drawing_checksum
+        self.timestamp: str = datetime.now().isoformat(timespec="seconds") if timestamp is None else timestamp
+
+        # the color pass batch in progress, by its plan pixels and where its passes were planned from.
+        # a batch size of 0 means none was, completed pixels are then a prefix of the plan
+        self.batch_start: int = batch_start
+        self.batch_size: int = batch_size
+        self.batch_origin: tuple[int, int] = (batch_origin[0], batch_origin[1])
+
+
+RunPhase = Literal["planning", "waiting for charges", "placing", "submitting", "paused", "finished", "stopped"]
+
+
+class RunProgress:
+    def __init__(self, phase: RunPhase, pixels_done: int, total_pixels: int, charges_used: int,
+                 available_charges: int, completion: datetime | None = None):
+        self.phase: RunPhase = phase
+        self.pixels_done: int = pixels_done
+        self.total_pixels: int = total_pixels
+        self.charges_used: int = charges_used
+        self.available_charges: int = available_charges
+        self.completion: datetime | None = completion
+
+
+class RunControl:
+    # shared with the thread running a drawing, which only looks at it between pixels
+    def __init__(self, track_progress: bool = True):
+        self.progress: queue.Queue[RunProgress] | None = queue.Queue() if track_progress else None
+        self.running: threading.Event = threading.Event()
+        self.running.set()
+        self.stopped: threading.Event = threading.Event()
+
+
+    def pause(self) -> None:
+        self.running.clear()
+
+
+    def resume(self) -> None:
+        self.running.set()
+
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.running.set()  # wakes a paused run so it can stop
+
+
+    def is_paused(self) -> bool:
+        return not self.running.is_set()
+
+
+    def should_stop(self) -> bool:
+        return self.stopped.is_set() or is_key_pressed("space")
+
+
+    def wait_while_paused(self) -> bool:
+        # returns False if the run was stopped while paused
+        self.running.wait()
+        return not self.stopped.is_set()
+
+
+    def report(self, progress: RunProgress) -> None:
+        if self.progress is not None:
+            self.progress.put(progress)
 
 
 class Macro:
-    def __init__(self, name: str, mouse_states: list[MouseState] | None = None, poll_rate_hertz: int = 30):
+    def __init__(self, name: str, samples: MacroSamples | None = None, poll_rate_hertz: int = 30):
         self.name: str = name
-        self.mouse_states: list[MouseState] = [] if mouse_states is None else mouse_states
+        self.samples: MacroSamples = MacroSamples() if samples is None else samples
         self.poll_rate_hertz: int = poll_rate_hertz
 
 
@@ -32,41 +176,118 @@ class Macro:
             sleep(1/30)
 
         self.poll_rate_hertz = poll_rate_hertz
-        self.mouse_states = []
+        self.samples = MacroSamples()
+
+        # samples are due on a fixed grid of deadlines so time spent reading the mouse does not add up
+        period: float = 1 / poll_rate_hertz
+        start_time: float = get_time()
+        deadline: float = start_time
 
         while not is_key_pressed(stop_button):
-            self.mouse_states.append(MouseState())
-            sleep(1/poll_rate_hertz)
+            sample_time: float = get_time()
+            self.samples.append(get_mouse_position(), is_key_pressed("leftclick"), sample_time - start_time)
+
+            deadline += period
+            if deadline < sample_time:  # fell more than a period behind, skip the missed samples
+                deadline += (sample_time - deadline) // period * period + period
+            sleep(max(0, deadline - get_time()))
 
         write_macro(self)
 
     
-    def playback(self, kill_button: Literal["space", "leftclick", "rightclick"] = "space") -> None:
+    def playback(self, kill_button: Literal["space", "leftclick", "rightclick"] = "space",
+                 samples: Iterable[MouseState] | None = None, speed: float = 1) -> None:
+        # samples can be streamed, for example from files.iter_macro_samples, instead of held in memory.
+        # each sample is due at its recorded time divided by speed, counted from one start time so
+        # the cost of sending inputs never adds up, and repeated states are held instead of resent
         while is_key_pressed(kill_button):  # do not immediatly stop
             sleep(1/30)
-        
-        clicking_current: bool = False
-        clicking_last: bool = False
-        for mouse_state in self.mouse_states:
-            if is_key_pressed(kill_button):
-                return
-            
-            move_mouse(mouse_state.positon)
 
-            clicking_current = mouse_state.clicked
-            if clicking_current and not clicking_last:
+        start_time: float = get_time()
+        position: tuple[int, int] | None = None
+        clicking: bool = False
+        press_time: float = start_time
+        last_time: float = 0
+
+        for mouse_state in self.samples if samples is None else samples:
+            last_time = mouse_state.time
+            if mouse_state.position == position and mouse_state.clicked == clicking:
+                continue
+
+            if wait_for_key(kill_button, max(0, start_time + mouse_state.time / speed - get_time())):
+                break
+
+            if mouse_state.position != position:
+                move_mouse(mouse_state.position)
+                position = mouse_state.position
+
+            if mouse_state.clicked and not clicking:
                 click_mouse()
-            if clicking_last and not clicking_current:
+                press_time = get_time()
+            if clicking and not mouse_state.clicked:
+                # at high speeds a short click is stretched so the game still registers it
+                sleep(max(0, press_time + MIN_CLICK_HOLD_SECONDS - get_time()))
                 release_mouse()
-            clicking_last = clicking_current
+            clicking = mouse_state.clicked
+        else:
+            # the last state is held for one sample period, as long as it was recorded for
+            wait_for_key(kill_button, max(0, start_time + (last_time + 1/self.poll_rate_hertz) / speed - get_time()))
+
+        if clicking:
+            release_mouse()
+
+
+def get_simplified_indices(x: np.ndarray, y: np.ndarray, times: np.ndarray, tolerance: float) -> np.ndarray:
+    # ramer-douglas-peucker measuring each sample against where the simplified path is at that sample's
+    # time, so pauses and speed changes are kept and every kept point is reached on schedule
+    keep: np.ndarray = np.zeros(len(x), dtype=bool)
+    if len(x) == 0:
+        return keep
+    keep[[0, -1]] = True
+
+    segments: list[tuple[int, int]] = [(0, len(x) - 1)]
+    while segments:
+        first, last = segments.pop()
+        if last - first < 2:
+            continue
+
+        duration: float = times[last] - times[first]
+        ratios: np.ndarray = (times[first + 1:last] - times[first]) / duration if duration > 0 \
+                             else np.zeros(last - first - 1)
+        distances: np.ndarray = np.hypot(x[first + 1:last] - (x[first] + ratios * (x[last] - x[first])),
+                                         y[first + 1:last] - (y[first] + ratios * (y[last] - y[first])))
+
+        farthest: int = int(distances.argmax())
+        if distances[farthest] > tolerance:
+            keep[first + 1 + farthest] = True
+            segments.append((first, first + 1 + farthest))
+            segments.append((first + 1 + farthest, last))
+
+    return keep
+
+
+def simplify_macro(macro: Macro, tolerance: float = SIMPLIFY_TOLERANCE_PIXELS) -> Macro:
+    # each stroke between button edges is simplified on its own, with the samples on both sides of
+    # every edge kept as recorded so presses and releases happen exactly where and when they did
+    x, y, buttons, times = macro.samples.get_arrays()
+    edges: np.ndarray = np.flatnonzero(np.diff(buttons & 1)) + 1
+    keep: np.ndarray = np.zeros(len(x), dtype=bool)
+
+    for stroke_start, stroke_end in zip(np.concatenate(([0], edges)).tolist(),
+                                        np.concatenate((edges, [len(x)])).tolist()):
+        stroke = slice(stroke_start, stroke_end)
+        keep[stroke] = get_simplified_indices(x[stroke].astype(np.float64), y[stroke].astype(np.float64),
+                                              times[stroke], tolerance)
+
+    samples: MacroSamples = MacroSamples()
+    samples.extend(x[keep], y[keep], buttons[keep], times[keep])
+    return Macro(f"{macro.name}{OPTIMIZED_MACRO_SUFFIX}", samples, macro.poll_rate_hertz)
 
-            sleep(1/self.poll_rate_hertz)
-            
 
 def edit_macros() -> None:
-    from files import read_macro, delete_macro  # local import to avoid circular import
+    from files import read_macro_header, iter_macro_samples, read_macro, write_macro, delete_macro  # local import to avoid circular import
     COMMANDS_STRING = "commands:\nrecord <macro name> <poll rate>\n\
-play <macro name>\ndelete <macro name>\nexit"
+play <macro name> [speed]\noptimize <macro name> [tolerance]\ndelete <macro name>\nexit"
     print(COMMANDS_STRING)
     
     while True:
@@ -80,13 +301,32 @@ play <macro name>\ndelete <macro name>\nexit"
             name: str = input_tokens[1]
             poll_rate: int = int(input_tokens[2])
             print("macro recording. press space to stop")
-            Macro(name).record(poll_rate_hertz=poll_rate)
+            macro: Macro = Macro(name)
+            macro.record(poll_rate_hertz=poll_rate)
+            print(f"recorded {macro.samples.get_timing_report(poll_rate)}")
 
         elif command == "play":
             name: str = input_tokens[1]
-            print("macro playing. press space to stop")
+            speed: float = float(input_tokens[2]) if len(input_tokens) > 2 else 1
+            if speed <= 0:
+                print("speed must be above 0")
+                continue
+            print(f"macro playing at {speed}x. press space to stop")
+            macro: Macro = read_macro_header(name)
+            macro.playback(samples=iter_macro_samples(name), speed=speed)
+
+        elif command == "optimize":
+            name: str = input_tokens[1]
+            tolerance: float = float(input_tokens[2]) if len(input_tokens) > 2 else SIMPLIFY_TOLERANCE_PIXELS
             macro: Macro = read_macro(name)
-            macro.playback()
+            optimized: Macro = simplify_macro(macro, tolerance)
+            write_macro(optimized)
+
+            events: int = macro.samples.count_input_events()
+            optimized_events: int = optimized.samples.count_input_events()
+            print(f"{len(macro.samples)} samples to {len(optimized.samples)}, "
+                  f"{events} input events to {optimized_events} "
+                  f"({1 - optimized_events / max(1, events):.0%} fewer), saved as {optimized.name}")
 
         elif command == "delete":
             name: str = input_tokens[1]
@@ -97,135 +337,253 @@ play <macro name>\ndelete <macro name>\nexit"
             print(f"unrecognized command.\n{COMMANDS_STRING}")
 
 
+def page_wait(seconds: float) -> float:
+    return seconds * TIMING["page_wait_scale"]
+
+
+PageClick = tuple[tuple[int, int], float, float]  # position, then page waits before and after the click
+
+RELOAD_LOGIN_CLICKS: tuple[PageClick, ...] = (
+    ((93, 58), .4, 3),  # reload
+    ((1470, 150), 0, 7),  # log in
+    ((762, 413), 0, 2),  # with google
+    ((841, 364), 0, 3))  # account
+
+CLOSE_PIXEL_INFO_POSITION: tuple[int, int] = (990, 691)
+SUBMIT_CLICKS: tuple[PageClick, ...] = (
+    (PAINT_BUTTON_LOCATION, 1, 4),  # click captcha if there was captcha, submit pixels if not
+    (PAINT_BUTTON_LOCATION, 0, 2),  # submit pixels if there was captcha, nothing if not
+    *RELOAD_LOGIN_CLICKS,
+    (PAINT_BUTTON_LOCATION, 1, 3),
+    (PAINT_BUTTON_LOCATION, 0, 2),  # open paint mode if logged out, nothing if not
+    (CLOSE_PIXEL_INFO_POSITION, 0, 1),  # nothing if logged out, unselect random pixel if not
+    (PAINT_BUTTON_LOCATION, 0, 4),  # nothing if logged out, open paint mode if not
+    (PAINT_BUTTON_LOCATION, 0, 1))  # in case captcha again
+FINAL_SUBMIT_CLICKS: tuple[PageClick, ...] = ((PAINT_BUTTON_LOCATION, .04, 0),)
+
+
+def click_page(clicks: tuple[PageClick, ...]) -> None:
+    for position, wait_before, wait_after in clicks:
+        click_location(position, page_wait(wait_before), page_wait(wait_after))
+
+
 def attempt_reload_login() -> None:
-    RELOAD_BUTTON_POSITION = (93, 58)
-    LOGIN_BUTTON_POSITION = (1470, 150)
-    WITH_GOOGLE_BUTTON_POSITION = (762, 413)
-    ACCOUNT_BUTTON_POSITION = (841, 364)
-
-    click_location(RELOAD_BUTTON_POSITION, .4, 3)
-    click_location(LOGIN_BUTTON_POSITION, 0, 7)
-    click_location(WITH_GOOGLE_BUTTON_POSITION, 0, 2)
-    click_location(ACCOUNT_BUTTON_POSITION, 0, 3)
-    
+    click_page(RELOAD_LOGIN_CLICKS)
 
 
 def submit_pixels(end: bool = False) -> None:
-    CLOSE_PIXEL_INFO_POSITION = (990, 691)
+    click_page(FINAL_SUBMIT_CLICKS if end else SUBMIT_CLICKS)
 
-    if end:
-        click_location(PAINT_BUTTON_LOCATION, .04)
-        return
-    
-    click_location(PAINT_BUTTON_LOCATION, 1, 4)  # click captcha if there was captcha, submit pixels if not
-    click_location(PAINT_BUTTON_LOCATION, 0, 2)  # submit pixels if there was captcha, nothing if not
 
-    attempt_reload_login()
-    click_location(PAINT_BUTTON_LOCATION, 1, 3)
-    click_location(PAINT_BUTTON_LOCATION, 0, 2)  # open paint mode if logged out, nothing if not
-    click_location(CLOSE_PIXEL_INFO_POSITION, 0, 1)  # nothing if logged out, unselect random pixel if not
-    click_location(PAINT_BUTTON_LOCATION, 0, 4)  # nothing if logged out, open paint mode if not
-    click_location(PAINT_BUTTON_LOCATION, 0, 1)  # in case captcha again
+def is_submit_due(charges_used: int) -> bool:
+    return charges_used > 0 and charges_used % PIXELS_PER_SUBMIT == 0
 
 
-def place_pixel(color: PickableColor, charges_used: int) -> bool:
+def place_pixel(color: PickableColor, charges_used: int, select_color: bool = True) -> bool:
     DRAWN_PIXEL_POSITION: tuple[int, int] = (260, 480)
 
     if color.color == BACKGROUND_PIXEL:
         return False
 
-    click_location(color.screen_position, 0, .02)
-    click_location(DRAWN_PIXEL_POSITION, 0, .02)
+    if select_color:
+        color.select_color()
+    click_location(DRAWN_PIXEL_POSITION, 0, TIMING["pixel_click"])
 
-    ready_to_submit: bool = charges_used > 0 and charges_used % 10 == 0
-    if ready_to_submit:
+    if is_submit_due(charges_used):
         submit_pixels()
     return True
 
 
-def has_charge(starting_time: datetime, starting_charges: int, charges_used: int) -> bool:
-    CHARGE_ADD_PERIOD: timedelta = timedelta(seconds=30)
+def move_to(position: list[int], target: Position) -> None:
+    for direction, num_pixels in get_moves((position[0], position[1]), target):
+        for drag_pixels in get_drags(direction, num_pixels):
+            move_pixel(direction, drag_pixels)
 
-    current_time: datetime = datetime.now()
-    time_elapsed: timedelta = current_time - starting_time
-    charges_added: int = floor(time_elapsed / CHARGE_ADD_PERIOD)
+    position[0] = target[0]
+    position[1] = target[1]
 
-    current_charges: int = starting_charges - charges_used + charges_added
-    return current_charges > 4  # safety buffer
 
+def get_run_checksum(drawing: Drawing | TiledDrawing, baseline: Drawing | TiledDrawing | None = None) -> int:
+    if baseline is None:
+        return drawing.get_checksum()
+    return zlib.crc32(baseline.get_checksum().to_bytes(4, "little"), drawing.get_checksum())
 
-def next_two_rows_empty(position: list[int], drawing: Drawing) -> bool:
-    current_row: int = position[0]
-    next_two_rows: list[list[Color]] = drawing.pixel_rows[current_row:current_row+2]
-    
-    for row in next_two_rows:
-        for color in row:
-            if color != BACKGROUND_PIXEL:
-                return False
-            
-    return True
 
+def execute_drawing_macro(drawing: Drawing | TiledDrawing, starting_charges: int,
+                          color_passes: bool = False, max_charges: int | None = None,
+                          drawing_name: str | None = None, resume_from: RunCheckpoint | None = None,
+                          baseline: Drawing | TiledDrawing | None = None,
+                          control: RunControl | None = None) -> None:
+    from files import write_run_checkpoint, delete_run_checkpoint  # local import to avoid circular import
+    # waits for charges are only cut into slices to check for a stop when there is a control to stop them
+    should_stop: Callable[[], bool] | None = None if control is None else control.should_stop
+    control = RunControl(track_progress=False) if control is None else control
+    sleep(RUN_START_SECONDS)
 
-def update_position(position: list[int], drawing: Drawing) -> None:
-    row: int = position[0]
-    column: int = position[1]
+    current_position: list[int] = [0, 0]
+    plan: MovementPlan = plan_run(drawing, baseline)
+    print(f"planned {plan.num_drags()} drags in {plan.order}-major order "
+          f"({count_serpentine_drags(drawing)} with the full serpentine walk)")
+    if baseline is not None:
+        print(f"{len(plan)} of {drawing.num_nonbackground_pixels()} pixels differ from the baseline")
+
+    charges: ChargeScheduler = ChargeScheduler(starting_charges, max_charges)
+    completion: datetime = charges.get_projected_completion(len(plan))
+    print(f"projected completion: {completion:%H:%M}")
+
+    previous_charges_used: int = 0 if resume_from is None else resume_from.charges_used
+    selected_color: int | None = None  # palette index
+    next_target: int = 0 if resume_from is None else resume_from.completed_pixels
+
+    # a color pass batch stopped partway is planned again the same way, skipping the pixels already placed
+    resume_batch: RunCheckpoint | None = None
+    if resume_from is not None and resume_from.batch_size > 0:
+        resume_batch = resume_from
+        next_target = resume_from.batch_start
+    placing_seconds: float = 0
+    drawing_checksum: int = get_run_checksum(drawing, baseline) if drawing_name is not None else 0
+
+    def report(phase: RunPhase, pixels_done: int) -> None:
+        control.report(RunProgress(phase, pixels_done, len(plan), previous_charges_used + charges.charges_used,
+                                   charges.charges, completion))
+
+    # color passes wait for a full submit's worth of charges so each batch has colors to group
+    minimum_batch_size: int = PIXELS_PER_SUBMIT if color_passes else 1
+
+    while next_target < len(plan):
+        if control.is_paused():
+            report("paused", next_target)
+        if not control.wait_while_paused():
+            report("stopped", next_target)
+            return
 
-    even_row: bool = row % 2 == 0
-    row_end_left: bool = column == 0
-    row_end_right: bool = column == drawing.width - 1
+        remaining_pixels: int = len(plan) - next_target
+        batch_minimum: int = min(minimum_batch_size, remaining_pixels)
+        if resume_batch is not None:
+            batch_minimum = resume_batch.batch_start + resume_batch.batch_size - resume_batch.completed_pixels
+        if charges.get_seconds_until(batch_minimum) > 0:
+            report("waiting for charges", next_target)
+        if not charges.wait_for_charges(batch_minimum, should_stop=should_stop):
+            report("stopped", next_target)
+            return
 
-    
-    if column == 0 and next_two_rows_empty(position, drawing):
-        row += 2  # skip empty rows, move down twice
-        move_pixel("down")
-        move_pixel("down")
+        batch_start_time: float = get_time()
+
+        # in color pass mode, the pixels the current charges can pay for are placed one color at a time
+        batch_size: int = 1
+        batch_skip: int = 0  # pixels of a resumed batch placed before the run was stopped
+        batch: MovementPlan = MovementPlan(plan.rows[next_target:next_target + 1],
+                                           plan.columns[next_target:next_target + 1], plan.order)
+        if color_passes or resume_batch is not None:
+            batch_size = charges.get_available_charges()
+            batch_origin: tuple[int, int] = (current_position[0], current_position[1])
+            if resume_batch is not None:
+                batch_size, batch_origin = resume_batch.batch_size, resume_batch.batch_origin
+                batch_skip = resume_batch.completed_pixels - resume_batch.batch_start
+                resume_batch = None
+
+            batch_rows: np.ndarray = plan.rows[next_target:next_target + batch_size]
+            batch_columns: np.ndarray = plan.columns[next_target:next_target + batch_size]
+            batch = plan_color_passes(batch_rows, batch_columns,
+                                      drawing.get_pixel_indices(batch_rows, batch_columns), batch_origin)
+            batch_size = len(batch)
+
+        batch_color_indices: list[int] = drawing.get_pixel_indices(batch.rows, batch.columns).tolist()
+        report("placing", next_target + batch_skip)
+        for batch_index, target in enumerate(batch):
+            if batch_index < batch_skip:
+                continue
+            if control.is_paused():  # color pass batches can be hundreds of pixels, so pause between pixels
+                report("paused", next_target + batch_index)
+                paused_time: float = get_time()
+                if control.wait_while_paused():
+                    batch_start_time += get_time() - paused_time  # time paused is not time placing
+                    report("placing", next_target + batch_index)
+            if control.should_stop():
+                report("stopped", next_target + batch_index)
+                return
 
-    elif (even_row and row_end_right) or ((not even_row) and row_end_left):
-        row += 1  # end of row, move down
-        move_pixel("down")
+            move_to(current_position, target)
+
+            color_index: int = batch_color_indices[batch_index]
+            color_pickable: PickableColor = PALETTE.pickables[color_index]
+            charges_used: int = charges.charges_used
+            if is_submit_due(charges_used):
+                report("submitting", next_target + batch_index)
+            if place_pixel(color_pickable, charges_used, select_color=color_index != selected_color):
+                # submitting can reload the page
+                selected_color = None if is_submit_due(charges_used) else color_index
+                charges.use_charge()
+
+            pixels_done: int = next_target + batch_index + 1
+            if is_submit_due(charges_used) and drawing_name is not None:
+                # color passes reorder pixels within a batch, so the batch is kept to be planned again
+                write_run_checkpoint(drawing_name, RunCheckpoint(
+                        pixels_done, previous_charges_used + charges.charges_used, drawing_checksum,
+                        batch_start=next_target, batch_size=batch_size if batch.order == "color" else 0,
+                        batch_origin=batch.start))
+
+            if is_submit_due(charges_used):
+                remaining_pixels = len(plan) - pixels_done
+                seconds_per_pixel: float = (placing_seconds + get_time() - batch_start_time)\
+                                           / charges.charges_used
+                completion = charges.get_projected_completion(remaining_pixels, seconds_per_pixel)
+                print(f"{charges.charges_used} pixels placed, projected completion: {completion:%H:%M}")
+                report("placing", pixels_done)
+
+        placing_seconds += get_time() - batch_start_time
+        next_target += batch_size
+
+    report("submitting", len(plan))
+    submit_pixels(end=True)
 
-    elif even_row:
-        column += 1  # even row, move right
-        move_pixel("right")
+    if drawing_name is not None:
+        delete_run_checkpoint(drawing_name)
+    report("finished", len(plan))
 
-    else:
-        column -= 1  # odd row, move left
-        move_pixel("left")
 
-    position[0] = row
-    position[1] = column
+def dry_run_drawing_macro(drawing: Drawing | TiledDrawing, starting_charges: int,
+                          color_passes: bool = False, max_charges: int | None = None,
+                          baseline: Drawing | TiledDrawing | None = None) -> SimulatedInputBackend:
+    simulated_backend: SimulatedInputBackend = SimulatedInputBackend()
+    previous_backend: InputBackend = set_input_backend(simulated_backend)
 
+    try:
+        execute_drawing_macro(drawing, starting_charges, color_passes, max_charges, baseline=baseline)
+    finally:
+        set_input_backend(previous_backend)
 
-def execute_drawing_macro(drawing: Drawing, starting_charges: int) -> None:
-    sleep(.1)
+    return simulated_backend
 
-    current_position: list[int] = [0, 0]
 
-    starting_time: datetime = datetime.now()
-    charges_used: int = 0
+def get_submit_seconds(end: bool = False) -> float:
+    # from the timings alone, estimates can be made while a run is using the input backend
+    return sum(page_wait(wait_before) + get_click_seconds() + page_wait(wait_after)
+               for _, wait_before, wait_after in (FINAL_SUBMIT_CLICKS if end else SUBMIT_CLICKS))
 
-    while current_position[0] < drawing.height:
-        current_row = current_position[0]
-        current_column = current_position[1]
 
-        if is_key_pressed("space"):
-            return
-        
-        if not has_charge(starting_time, starting_charges, charges_used):
-            sleep(1)
-            if is_key_pressed("space"):
-                return
-            
-            continue
+def estimate_run_seconds(drawing: Drawing | TiledDrawing, starting_charges: int = 0) -> float:
+    # same timings as a dry run without simulating every input, swatches are picked on every color change
+    plan: MovementPlan = plan_drawing(drawing)
+    if len(plan) == 0:
+        return 0
 
-        color: Color = drawing.pixel_rows[current_row][current_column]
-        color_pickable: PickableColor = get_pickable_from_color(color)
-        if place_pixel(color_pickable, charges_used):
-            charges_used += 1
+    # a submit follows every PIXELS_PER_SUBMIT pixels but the last, and the swatch is picked again after one
+    color_indices: np.ndarray = drawing.get_pixel_indices(plan.rows, plan.columns)
+    submit_due: np.ndarray = np.arange(len(plan)) % PIXELS_PER_SUBMIT == 0
+    submit_due[0] = False
+    num_submits: int = int(np.count_nonzero(submit_due))
+    num_color_selections: int = int(np.count_nonzero((np.diff(color_indices) != 0) | submit_due[:-1])) + 1
 
-        update_position(current_position, drawing)
+    drag_seconds: float = TIMING["drag_settle"] + TIMING["drag_grab"] + TIMING["drag_move"]\
+                          + TIMING["drag_release"]
+    input_seconds: float = RUN_START_SECONDS + plan.num_drags() * drag_seconds\
+                           + len(plan) * (get_click_seconds() + TIMING["pixel_click"])\
+                           + num_color_selections * (get_click_seconds() + TIMING["select_color"])\
+                           + num_submits * get_submit_seconds() + get_submit_seconds(end=True)
 
-    submit_pixels(end=True)
+    charges: ChargeScheduler = ChargeScheduler(starting_charges)
+    return charges.get_projected_seconds(len(plan), input_seconds / len(plan))
 
 
 def test_pixel_movement() -> None: 
@@ -1,72 +1,442 @@
 import ctypes
-from time import sleep
+from abc import ABC, abstractmethod
+import json
+import time
+from pathlib import Path
 from typing import Literal
 
 SCREEN_WIDTH = 1530
 SCREEN_HEIGHT = 860
 PIXEL_WIDTH = 525
 
+KEY_POLL_SECONDS: float = .02
+
+TIMING_PROFILES_PATH: Path = Path(__file__).parent / "timing_profiles.json"
+
 
 class POINT(ctypes.Structure):
     _fields_ = [("x", ctypes.c_long),
                 ("y", ctypes.c_long)]
 
 
-def get_mouse_position() -> tuple[int, int]:
-    point = POINT()
-    ctypes.windll.user32.GetCursorPos(ctypes.byref(point))
-    return (point.x, point.y)
+class MOUSEINPUT(ctypes.Structure):
+    _fields_ = [("dx", ctypes.c_long),
+                ("dy", ctypes.c_long),
+                ("mouseData", ctypes.c_ulong),
+                ("dwFlags", ctypes.c_ulong),
+                ("time", ctypes.c_ulong),
+                ("dwExtraInfo", ctypes.c_size_t)]
+
+
+class INPUT(ctypes.Structure):
+    _fields_ = [("type", ctypes.c_ulong),
+                ("mi", MOUSEINPUT)]
+
+
+Key = Literal["space", "leftclick", "rightclick", "up", "down", "left", "right"]
+
+
+class InputEvent:
+    def __init__(self, time: float, kind: Literal["move", "press", "release", "sleep"],
+                 position: tuple[int, int], duration: float = 0):
+        self.time: float = time
+        self.kind: Literal["move", "press", "release", "sleep"] = kind
+        self.position: tuple[int, int] = position
+        self.duration: float = duration
+
+
+class GestureStep:
+    def __init__(self, kind: Literal["move", "press", "release", "wait"],
+                 position: tuple[int, int] = (0, 0), seconds: float = 0):
+        self.kind: Literal["move", "press", "release", "wait"] = kind
+        self.position: tuple[int, int] = position
+        self.seconds: float = seconds
+
+
+class Gesture:
+    # a sequence of inputs and waits. inputs between waits are submitted together in one batch
+    def __init__(self):
+        self.steps: list[GestureStep] = []
+
+
+    def move(self, position: tuple[int, int], wait_seconds: float = 0) -> "Gesture":
+        self.steps.append(GestureStep("move", position))
+        return self.wait(wait_seconds)
+
+
+    def press(self, wait_seconds: float = 0) -> "Gesture":
+        self.steps.append(GestureStep("press"))
+        return self.wait(wait_seconds)
+
+
+    def release(self, wait_seconds: float = 0) -> "Gesture":
+        self.steps.append(GestureStep("release"))
+        return self.wait(wait_seconds)
+
+
+    def wait(self, seconds: float) -> "Gesture":
+        if seconds > 0:
+            self.steps.append(GestureStep("wait", seconds=seconds))
+        return self
+
+
+    def get_batches(self) -> list[tuple[list[GestureStep], float]]:
+        batches: list[tuple[list[GestureStep], float]] = []
+        batch: list[GestureStep] = []
+
+        for step in self.steps:
+            if step.kind != "wait":
+                batch.append(step)
+                continue
+
+            batches.append((batch, step.seconds))
+            batch = []
+
+        if batch != []:
+            batches.append((batch, 0))
+        return batches
+
+
+class InputBackend(ABC):
+    @abstractmethod
+    def get_mouse_position(self) -> tuple[int, int]:
+        ...
+
+
+    @abstractmethod
+    def is_key_pressed(self, key: Key) -> bool:
+        ...
+
+
+    @abstractmethod
+    def move_mouse(self, position: tuple[int, int]) -> None:
+        ...
+
 
+    @abstractmethod
+    def press_mouse(self) -> None:
+        ...
 
-def is_key_pressed(key: Literal["space", "leftclick", "rightclick",
-                                "up", "down", "left", "right"]) -> bool:
-    
+
+    @abstractmethod
+    def release_mouse(self) -> None:
+        ...
+
+
+    def send_inputs(self, steps: list[GestureStep]) -> None:
+        for step in steps:
+            if step.kind == "move":
+                self.move_mouse(step.position)
+            elif step.kind == "press":
+                self.press_mouse()
+            elif step.kind == "release":
+                self.release_mouse()
+
+
+    @abstractmethod
+    def sleep(self, seconds: float) -> None:
+        ...
+
+
+    def wait_for_key(self, key: Key, seconds: float) -> bool:
+        # sleeps for the given time unless the key is pressed first, returns whether it was
+        deadline: float = self.get_time() + seconds
+
+        while not self.is_key_pressed(key):
+            remaining_seconds: float = deadline - self.get_time()
+            if remaining_seconds <= 0:
+                return False
+            self.sleep(min(remaining_seconds, KEY_POLL_SECONDS))
+
+        return True
+
+
+    @abstractmethod
+    def get_time(self) -> float:
+        ...
+
+
+class WindowsInputBackend(InputBackend):
     VK_MAPPING: dict[str, int] = {"space": 0x20, "leftclick": 0x01, "rightclick": 0x02,
                                   "up": 0x57, "down": 0x53, "left": 0x41, "right": 0x44}
-    key_vk: int = VK_MAPPING[key]
-    MAGIC_VOODOO_CONSTANT: int = 0x8000
 
-    return bool(ctypes.windll.user32.GetAsyncKeyState(key_vk) & MAGIC_VOODOO_CONSTANT)
+
+    def get_mouse_position(self) -> tuple[int, int]:
+        point = POINT()
+        ctypes.windll.user32.GetCursorPos(ctypes.byref(point))
+        return (point.x, point.y)
+
+
+    def is_key_pressed(self, key: Key) -> bool:
+        key_vk: int = self.VK_MAPPING[key]
+        MAGIC_VOODOO_CONSTANT: int = 0x8000
+
+        return bool(ctypes.windll.user32.GetAsyncKeyState(key_vk) & MAGIC_VOODOO_CONSTANT)
+
+
+    def move_mouse(self, position: tuple[int, int]) -> None:
+        ctypes.windll.user32.SetCursorPos(position[0], position[1])
+
+
+    def press_mouse(self) -> None:
+        CLICK_EVENT: int = 0x0002
+        ctypes.windll.user32.mouse_event(CLICK_EVENT, 0, 0, 0, 0)
+
+
+    def release_mouse(self) -> None:
+        RELEASE_EVENT: int = 0x0004
+        ctypes.windll.user32.mouse_event(RELEASE_EVENT, 0, 0, 0, 0)
+
+
+    def send_inputs(self, steps: list[GestureStep]) -> None:
+        INPUT_MOUSE: int = 0
+        EVENT_FLAGS: dict[str, int] = {"move": 0x0001 | 0x8000,  # absolute move
+                                       "press": 0x0002, "release": 0x0004}
+
+        # absolute coordinates are normalized to 0-65535 across the primary screen
+        screen_width: int = ctypes.windll.user32.GetSystemMetrics(0)
+        screen_height: int = ctypes.windll.user32.GetSystemMetrics(1)
+
+        inputs = (INPUT * len(steps))()
+        for input_structure, step in zip(inputs, steps):
+            input_structure.type = INPUT_MOUSE
+            input_structure.mi.dwFlags = EVENT_FLAGS[step.kind]
+            if step.kind == "move":
+                input_structure.mi.dx = round(step.position[0] * 65535 / (screen_width - 1))
+                input_structure.mi.dy = round(step.position[1] * 65535 / (screen_height - 1))
+
+        ctypes.windll.user32.SendInput(len(steps), inputs, ctypes.sizeof(INPUT))
+
+
+    def sleep(self, seconds: float) -> None:
+        time.sleep(seconds)
+
+
+    def get_time(self) -> float:
+        return time.perf_counter()
+
+
+class SimulatedInputBackend(InputBackend):
+    # records every input on a virtual clock instead of touching the real mouse
+    def __init__(self, move_cost_seconds: float = 0, click_cost_seconds: float = 0):
+        self.clock: float = 0
+        self.position: tuple[int, int] = (0, 0)
+        self.mouse_pressed: bool = False
+        self.pressed_keys: set[Key] = set()
+        self.timeline: list[InputEvent] = []
+
+        self.move_cost_seconds: float = move_cost_seconds
+        self.click_cost_seconds: float = click_cost_seconds
+
+        self.num_clicks: int = 0
+        self.num_drags: int = 0
+        self.num_batches: int = 0
+        self.press_position: tuple[int, int] = (0, 0)
+
+
+    def get_mouse_position(self) -> tuple[int, int]:
+        return self.position
+
+
+    def is_key_pressed(self, key: Key) -> bool:
+        if key == "leftclick":
+            return self.mouse_pressed
+        return key in self.pressed_keys
+
+
+    def move_mouse(self, position: tuple[int, int]) -> None:
+        self.position = position
+        self.timeline.append(InputEvent(self.clock, "move", position))
+        self.clock += self.move_cost_seconds
+
+
+    def press_mouse(self) -> None:
+        self.mouse_pressed = True
+        self.press_position = self.position
+        self.timeline.append(InputEvent(self.clock, "press", self.position))
+        self.clock += self.click_cost_seconds
+
+
+    def release_mouse(self) -> None:
+        self.mouse_pressed = False
+        self.timeline.append(InputEvent(self.clock, "release", self.position))
+        self.clock += self.click_cost_seconds
+
+        if self.position == self.press_position:
+            self.num_clicks += 1
+        else:
+            self.num_drags += 1
+
+
+    def send_inputs(self, steps: list[GestureStep]) -> None:
+        self.num_batches += 1
+        super().send_inputs(steps)
+
+
+    def sleep(self, seconds: float) -> None:
+        if seconds <= 0:
+            return
+        self.timeline.append(InputEvent(self.clock, "sleep", self.position, seconds))
+        self.clock += seconds
+
+
+    def get_time(self) -> float:
+        return self.clock
+
+
+    def wait_for_key(self, key: Key, seconds: float) -> bool:
+        if self.is_key_pressed(key):
+            return True
+
+        self.sleep(seconds)
+        return False
+
+
+    def get_summary(self) -> str:
+        return f"{self.clock:.1f} seconds, {self.num_drags} drags, {self.num_clicks} clicks, "\
+               f"{len(self.timeline)} input events in {self.num_batches} batches"
+
+
+input_backend: InputBackend = WindowsInputBackend()
+
+
+def set_input_backend(backend: InputBackend) -> InputBackend:
+    global input_backend
+    previous_backend: InputBackend = input_backend
+    input_backend = backend
+    return previous_backend
+
+
+def sleep(seconds: float) -> None:
+    input_backend.sleep(seconds)
+
+
+def get_time() -> float:
+    return input_backend.get_time()
+
+
+def get_mouse_position() -> tuple[int, int]:
+    return input_backend.get_mouse_position()
+
+
+def is_key_pressed(key: Key) -> bool:
+    return input_backend.is_key_pressed(key)
+
+
+def wait_for_key(key: Key, seconds: float) -> bool:
+    return input_backend.wait_for_key(key, seconds)
 
 
 def move_mouse(position: tuple[int, int],
                pre_delay_seconds: float = 0, post_delay_seconds: float = 0) -> None:
     sleep(pre_delay_seconds)
-    ctypes.windll.user32.SetCursorPos(position[0], position[1])
+    input_backend.move_mouse(position)
     sleep(post_delay_seconds)
 
 
 def click_mouse(pre_delay_seconds: float = 0, post_delay_seconds: float = 0) -> None:
     sleep(pre_delay_seconds)
-    CLICK_EVENT: int = 0x0002
-    ctypes.windll.user32.mouse_event(CLICK_EVENT, 0, 0, 0, 0)
+    input_backend.press_mouse()
     sleep(post_delay_seconds)
 
 
 def release_mouse(pre_delay_seconds: float = 0, post_delay_seconds: float = 0) -> None:
     sleep(pre_delay_seconds)
-    RELEASE_EVENT: int = 0x0004
-    ctypes.windll.user32.mouse_event(RELEASE_EVENT, 0, 0, 0, 0)
+    input_backend.release_mouse()
     sleep(post_delay_seconds)
 
 
+def perform_gesture(gesture: Gesture) -> None:
+    for batch, wait_seconds in gesture.get_batches():
+        if batch != []:
+            input_backend.send_inputs(batch)
+        sleep(wait_seconds)
+
+
+# named delays in seconds, overwritten by the active profile in timing_profiles.json
+TIMING: dict[str, float] = {
+    "click_settle": 0,  # moving and pressing are submitted together
+    "click_hold": .02,
+    "drag_settle": .02,
+    "drag_grab": .08,
+    "drag_move": .08,
+    "drag_release": .06,
+    "pixel_click": .02,
+    "select_color": .02,
+    "page_wait_scale": 1
+}
+
+
+def read_timing_profiles() -> dict:
+    if not TIMING_PROFILES_PATH.exists():
+        return {"active_profile": "default", "profiles": {"default": dict(TIMING)}}
+
+    with TIMING_PROFILES_PATH.open(encoding="utf-8") as reader:
+        return json.load(reader)
+
+
+def write_timing_profiles(timing_profiles: dict) -> None:
+    with TIMING_PROFILES_PATH.open("w", encoding="utf-8") as writer:
+        json.dump(timing_profiles, writer, indent=4)
+
+
+def get_timing_profile_names() -> list[str]:
+    return list(read_timing_profiles()["profiles"])
+
+
+def use_timing_profile(name: str | None = None, save: bool = False) -> None:
+    timing_profiles: dict = read_timing_profiles()
+    name = timing_profiles["active_profile"] if name is None else name
+
+    TIMING.update(timing_profiles["profiles"][name])
+
+    if save:
+        timing_profiles["active_profile"] = name
+        write_timing_profiles(timing_profiles)
+
+
+def get_click_gesture(position: tuple[int, int]) -> Gesture:
+    return Gesture().move(position, TIMING["click_settle"])\
+                    .press(TIMING["click_hold"])\
+                    .release()
+
+
+def get_click_seconds() -> float:
+    return TIMING["click_settle"] + TIMING["click_hold"]
+
+
+def get_drag_gesture(start: tuple[int, int], end: tuple[int, int]) -> Gesture:
+    return Gesture().wait(TIMING["drag_settle"])\
+                    .move(start)\
+                    .press(TIMING["drag_grab"])\
+                    .move(end, TIMING["drag_move"])\
+                    .release(TIMING["drag_release"])
+
+
 def click_location(position: tuple[int, int],
                pre_delay_seconds: float = 0, post_delay_seconds: float = 0) -> None:
     sleep(pre_delay_seconds)
-    move_mouse(position)
-    sleep(.02)
-    click_mouse()
-    sleep(.02)
-    release_mouse()
+    perform_gesture(get_click_gesture(position))
     sleep(post_delay_seconds)
 
 
-def move_pixel(direction: Literal["right", "left", "down"]) -> None:
+# how many drawing pixels a single drag can move the map in each direction. there is no up drag,
+# it would end on the palette and paint button along the bottom of the screen
+MAX_DRAG_PIXELS: dict[str, int] = {
+    "right": (SCREEN_WIDTH - 1) // PIXEL_WIDTH,
+    "left": (SCREEN_WIDTH - 1) // PIXEL_WIDTH,
+    "down": (SCREEN_HEIGHT - 1) // PIXEL_WIDTH
+}
+
+
+def move_pixel(direction: Literal["right", "left", "down"], num_pixels: int = 1) -> None:
+    drag_length: int = PIXEL_WIDTH * min(num_pixels, MAX_DRAG_PIXELS[direction])
+
     DIRECTION_POSITION_MAPPING: dict[str, tuple[int, int, int, int]] = {
-        "right": (PIXEL_WIDTH, 500, 0, 500),
-        "left": (SCREEN_WIDTH - PIXEL_WIDTH + 1, 500, SCREEN_WIDTH, 500),
-        #"up": (500, SCREEN_HEIGHT - PIXEL_WIDTH, 500, SCREEN_HEIGHT),
-        "down": (500,  PIXEL_WIDTH, 500, 0)
+        "right": (drag_length, 500, 0, 500),
+        "left": (SCREEN_WIDTH - drag_length + 1, 500, SCREEN_WIDTH, 500),
+        #"up": (500, SCREEN_HEIGHT - drag_length, 500, SCREEN_HEIGHT),
+        "down": (500,  drag_length, 500, 0)
     } # (starting x, starting y, ending x, ending y)
 
     starting_x: int = DIRECTION_POSITION_MAPPING[direction][0]
@@ -74,7 +444,7 @@ def move_pixel(direction: Literal["right", "left", "down"]) -> None:
     ending_x: int = DIRECTION_POSITION_MAPPING[direction][2]
     ending_y: int = DIRECTION_POSITION_MAPPING[direction][3]
 
-    move_mouse((starting_x, starting_y), .02, .08) 
-    click_mouse(0, .08)
-    move_mouse((ending_x, ending_y), 0, .08)
-    release_mouse(0, .06)
\ No newline at end of file
+    perform_gesture(get_drag_gesture((starting_x, starting_y), (ending_x, ending_y)))
+
+
+use_timing_profile()
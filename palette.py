@@ -0,0 +1,87 @@
+import json
+from pathlib import Path
+import numpy as np
+from macro_utils import click_location, TIMING
+
+PALETTE_PATH: Path = Path(__file__).parent / "palette.json"
+
+Color = tuple[int, int, int]
+
+BACKGROUND_PIXEL: Color = (-1, -1, -1)
+
+
+class PickableColor:
+    def __init__(self, name: str, color: Color, screen_position: tuple[int, int], enabled: bool = True):
+        self.name: str = name
+        self.color: Color = color
+        self.screen_position: tuple[int, int] = screen_position
+        self.enabled: bool = enabled
+
+
+    def select_color(self) -> None:
+        click_location(self.screen_position, 0, TIMING["select_color"])
+
+
+def pack_colors(colors: np.ndarray) -> np.ndarray:
+    colors = colors.astype(np.int32)
+    return colors[..., 0] * (2**16) + colors[..., 1] * (2**8) + colors[..., 2]
+
+
+def get_color_as_hex(color: Color) -> str:
+    return f"#{color[0]:02x}{color[1]:02x}{color[2]:02x}"
+
+
+def get_hex_as_color(hex_string: str) -> Color:
+    return (int(hex_string[1:3], base=16), int(hex_string[3:5], base=16), int(hex_string[5:7], base=16))
+
+
+class Palette:
+    # the enabled colors in picker order, with background always last
+    def __init__(self, pickables: list[PickableColor]):
+        self.background: PickableColor = PickableColor("background", BACKGROUND_PIXEL, (0, 0))
+        self.pickables: tuple[PickableColor, ...] = tuple(pickables) + (self.background,)
+        self.colors: tuple[Color, ...] = tuple(pickable.color for pickable in self.pickables)
+        self.background_index: int = len(self.pickables) - 1
+
+        self.indices_by_color: dict[Color, int] = {color: index for index, color in enumerate(self.colors)}
+        self.indices_by_hex: dict[str, int] = {get_color_as_hex(color): index
+                                               for index, color in enumerate(self.colors[:-1])}
+
+        # colors without background as an array, for quantizing and file headers
+        self.color_array: np.ndarray = np.array(self.colors[:-1], dtype=np.uint8).reshape(-1, 3)
+
+        packed: np.ndarray = pack_colors(np.array(self.colors))
+        self.packed_order: np.ndarray = np.argsort(packed)
+        self.sorted_packed: np.ndarray = packed[self.packed_order]
+
+
+    def __len__(self) -> int:
+        return len(self.pickables)
+
+
+    def get_index_from_hex(self, hex_string: str) -> int:
+        return self.indices_by_hex.get(hex_string.lower(), self.background_index)
+
+
+    # maps an array of RGB triples (last axis) to palette indices, unknown colors become background
+    def get_indices_from_colors(self, colors: np.ndarray) -> np.ndarray:
+        packed: np.ndarray = pack_colors(colors)
+
+        positions: np.ndarray = np.searchsorted(self.sorted_packed, packed).clip(0, len(self.sorted_packed) - 1)
+        indices: np.ndarray = self.packed_order[positions]
+        found: np.ndarray = self.sorted_packed[positions] == packed
+
+        return np.where(found, indices, self.background_index).astype(np.uint8)
+
+
+def read_palette(palette_path: Path = PALETTE_PATH) -> Palette:
+    with palette_path.open(encoding="utf-8") as reader:
+        palette_config: dict = json.load(reader)
+
+    pickables: list[PickableColor] = [PickableColor(entry["name"], get_hex_as_color(entry["color"]),
+                                                    tuple(entry["position"]), entry.get("enabled", True))
+                                      for entry in palette_config["colors"]]
+    return Palette([pickable for pickable in pickables if pickable.enabled])
+
+
+PALETTE: Palette = read_palette()
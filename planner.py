@@ -0,0 +1,210 @@
+from collections.abc import Iterator
+from typing import Literal
+import numpy as np
+from drawing import Drawing, BACKGROUND_INDEX
+from tiled_drawing import TiledDrawing
+from macro_utils import MAX_DRAG_PIXELS
+
+Direction = Literal["right", "left", "down"]  # the map is never dragged up, see MAX_DRAG_PIXELS
+Position = tuple[int, int]  # (row, column) of the drawing pixel under the cursor
+
+
+def get_axis_drags(distances: np.ndarray, pixels_per_drag: int) -> np.ndarray:
+    return -(-np.abs(distances) // pixels_per_drag)
+
+
+def get_moves(start: Position, end: Position) -> list[tuple[Direction, int]]:
+    moves: list[tuple[Direction, int]] = []
+
+    row_distance: int = end[0] - start[0]
+    column_distance: int = end[1] - start[1]
+
+    if column_distance != 0:
+        moves.append(("right" if column_distance > 0 else "left", abs(column_distance)))
+    if row_distance < 0:
+        raise ValueError(f"cannot move up from row {start[0]} to row {end[0]}")
+    if row_distance != 0:
+        moves.append(("down", row_distance))
+
+    return moves
+
+
+def get_drags(direction: Direction, num_pixels: int) -> Iterator[int]:
+    # splits a move into the pixel counts of each drag
+    while num_pixels > 0:
+        drag_pixels: int = min(num_pixels, MAX_DRAG_PIXELS[direction])
+        yield drag_pixels
+        num_pixels -= drag_pixels
+
+
+class MovementPlan:
+    def __init__(self, rows: np.ndarray, columns: np.ndarray,
+                 order: Literal["row", "color"], start: Position = (0, 0)):
+        self.rows: np.ndarray = rows
+        self.columns: np.ndarray = columns
+        self.order: Literal["row", "color"] = order
+        self.start: Position = start
+
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+
+    def __iter__(self) -> Iterator[Position]:
+        return zip(self.rows.tolist(), self.columns.tolist())
+
+
+    def end(self) -> Position:
+        if len(self) == 0:
+            return self.start
+        return (int(self.rows[-1]), int(self.columns[-1]))
+
+
+    def num_drags(self) -> int:
+        rows: np.ndarray = np.concatenate(([self.start[0]], self.rows))
+        columns: np.ndarray = np.concatenate(([self.start[1]], self.columns))
+
+        vertical_drags: np.ndarray = get_axis_drags(np.diff(rows), MAX_DRAG_PIXELS["down"])
+        horizontal_drags: np.ndarray = get_axis_drags(np.diff(columns), MAX_DRAG_PIXELS["right"])
+
+        return int(vertical_drags.sum() + horizontal_drags.sum())
+
+
+def order_serpentine(lines: np.ndarray, positions: np.ndarray,
+                     start_position: int, pixels_per_drag: int) -> np.ndarray:
+    # lines and positions are sorted by line then position. every line is walked from the
+    # end closest to where the previous line finished, skipping straight over empty space.
+    order: list[np.ndarray] = []
+    current_position: int = start_position
+
+    line_starts: np.ndarray = np.flatnonzero(np.diff(lines, prepend=-1))
+    for line_indices in np.split(np.arange(len(lines)), line_starts[1:]):
+        if len(line_indices) == 0:
+            continue
+
+        first_position: int = int(positions[line_indices[0]])
+        last_position: int = int(positions[line_indices[-1]])
+        forward_cost: int = -(-abs(current_position - first_position) // pixels_per_drag)
+        backward_cost: int = -(-abs(current_position - last_position) // pixels_per_drag)
+
+        if forward_cost <= backward_cost:
+            order.append(line_indices)
+            current_position = last_position
+        else:
+            order.append(line_indices[::-1])
+            current_position = first_position
+
+    return np.concatenate(order) if order != [] else np.array([], dtype=np.int64)
+
+
+def plan_row_major(rows: np.ndarray, columns: np.ndarray, start: Position = (0, 0)) -> MovementPlan:
+    order: np.ndarray = order_serpentine(rows, columns, start[1], MAX_DRAG_PIXELS["right"])
+    return MovementPlan(rows[order], columns[order], "row", start)
+
+
+def plan_pixels(rows: np.ndarray, columns: np.ndarray, start: Position = (0, 0)) -> MovementPlan:
+    # rows and columns must be in row-major order, as returned by np.nonzero.
+    # only row-major plans are made since they never need to move up
+    return plan_row_major(rows, columns, start)
+
+
+def plan_color_passes(rows: np.ndarray, columns: np.ndarray, color_indices: np.ndarray,
+                      start: Position = (0, 0)) -> MovementPlan:
+    # rows are finished in order since the map cannot move up. each row gets one pass per color,
+    # starting with the color the previous row ended on, so each swatch is selected once per row
+    row_major: np.ndarray = np.lexsort((columns, rows))
+    rows, columns, color_indices = rows[row_major], columns[row_major], color_indices[row_major]
+
+    order: list[np.ndarray] = []
+    current_column: int = start[1]
+    current_color: int | None = None
+
+    row_starts: np.ndarray = np.flatnonzero(np.diff(rows, prepend=-1))
+    for row_indices in np.split(np.arange(len(rows)), row_starts[1:]):
+        if len(row_indices) == 0:
+            continue
+
+        row_colors: np.ndarray = color_indices[row_indices]
+        _, first_appearances = np.unique(row_colors, return_index=True)
+        pass_colors: list[int] = row_colors[np.sort(first_appearances)].tolist()
+        if current_color in pass_colors:
+            pass_colors.remove(current_color)
+            pass_colors.insert(0, current_color)
+
+        for color_index in pass_colors:
+            pass_indices: np.ndarray = row_indices[row_colors == color_index]
+            pass_order: np.ndarray = order_serpentine(rows[pass_indices], columns[pass_indices],
+                                                      current_column, MAX_DRAG_PIXELS["right"])
+            order.append(pass_indices[pass_order])
+            current_column = int(columns[order[-1][-1]])
+            current_color = color_index
+
+    if order == []:
+        return MovementPlan(rows, columns, "color", start)
+    order_indices: np.ndarray = np.concatenate(order)
+    return MovementPlan(rows[order_indices], columns[order_indices], "color", start)
+
+
+def plan_drawing(drawing: Drawing | TiledDrawing, start: Position = (0, 0)) -> MovementPlan:
+    rows, columns = drawing.get_nonbackground_coordinates()
+    return plan_pixels(rows, columns, start)
+
+
+def get_delta_coordinates(drawing: Drawing | TiledDrawing,
+                          baseline: Drawing | TiledDrawing) -> tuple[np.ndarray, np.ndarray]:
+    # pixels the drawing colors differently from the baseline. background pixels cannot be erased
+    if (drawing.width, drawing.height) != (baseline.width, baseline.height):
+        raise ValueError(f"baseline is {baseline.width}x{baseline.height}, "
+                         f"drawing is {drawing.width}x{drawing.height}")
+
+    band_rows: list[np.ndarray] = []
+    band_columns: list[np.ndarray] = []
+    band_top: int = 0
+
+    for band, baseline_band in zip(drawing.iter_row_bands(), baseline.iter_row_bands()):
+        rows, columns = np.nonzero((band != baseline_band) & (band != BACKGROUND_INDEX))
+        band_rows.append(rows + band_top)
+        band_columns.append(columns)
+        band_top += len(band)
+
+    return np.concatenate(band_rows), np.concatenate(band_columns)
+
+
+def plan_run(drawing: Drawing | TiledDrawing, baseline: Drawing | TiledDrawing | None = None,
+             start: Position = (0, 0)) -> MovementPlan:
+    if baseline is None:
+        return plan_drawing(drawing, start)
+
+    rows, columns = get_delta_coordinates(drawing, baseline)
+    return plan_pixels(rows, columns, start)
+
+
+def get_nonempty_rows(drawing: Drawing | TiledDrawing) -> np.ndarray:
+    return np.concatenate([np.any(band != BACKGROUND_INDEX, axis=1) for band in drawing.iter_row_bands()])
+
+
+def count_serpentine_drags(drawing: Drawing | TiledDrawing) -> int:
+    # drags made by the original walk: every pixel of every row, skipping two empty rows at a time.
+    # which rows are empty is found in one pass, tiled drawings would otherwise read a band per row
+    nonempty_rows: np.ndarray = get_nonempty_rows(drawing)
+    row: int = 0
+    column: int = 0
+    num_drags: int = 0
+
+    while row < drawing.height:
+        if column == 0 and not nonempty_rows[row:row + 2].any():
+            row += 2
+            num_drags += 2
+            continue
+
+        even_row: bool = row % 2 == 0
+        row_end: int = drawing.width - 1 if even_row else 0
+        if column == row_end:
+            row += 1
+            num_drags += 1
+            continue
+
+        num_drags += abs(row_end - column)
+        column = row_end
+
+    return num_drags
@@ -0,0 +1,134 @@
+from pathlib import Path
+import zlib
+import numpy as np
+from PIL import Image
+
+COLOR_LUTS_PATH: Path = Path(__file__).parent / "color_luts"
+LUT_BITS: int = 6  # 64 bins per channel
+LUT_SHIFT: int = 8 - LUT_BITS
+
+ORDERED_DITHER_SPREAD: float = 48  # RGB levels the bayer thresholds span
+
+BAYER_MATRIX: np.ndarray = np.array([
+        [0, 32, 8, 40, 2, 34, 10, 42],
+        [48, 16, 56, 24, 50, 18, 58, 26],
+        [12, 44, 4, 36, 14, 46, 6, 38],
+        [60, 28, 52, 20, 62, 30, 54, 22],
+        [3, 35, 11, 43, 1, 33, 9, 41],
+        [51, 19, 59, 27, 49, 17, 57, 25],
+        [15, 47, 7, 39, 13, 45, 5, 37],
+        [63, 31, 55, 23, 61, 29, 53, 21]])
+
+_loaded_luts: dict[bytes, np.ndarray] = {}
+
+
+def srgb_to_oklab(colors: np.ndarray) -> np.ndarray:
+    # colors are 0-255 sRGB along the last axis
+    srgb: np.ndarray = colors.astype(np.float32) / 255
+    linear: np.ndarray = np.where(srgb <= .04045, srgb / 12.92, ((srgb + .055) / 1.055) ** 2.4)
+
+    lms: np.ndarray = linear @ np.array([[.4122214708, .2119034982, .0883024619],
+                                         [.5363325363, .6806995451, .2817188376],
+                                         [.0514459929, .1073969566, .6299787005]], dtype=np.float32)
+    return np.cbrt(lms) @ np.array([[.2104542553, 1.9779984951, .0259040371],
+                                    [.7936177850, -2.4285922050, .7827717662],
+                                    [-.0040720468, .4505937099, -.8086757660]], dtype=np.float32)
+
+
+def get_nearest_colors(colors: np.ndarray, palette: np.ndarray) -> np.ndarray:
+    # palette index closest to each color in OKLab, |c - p|^2 without the constant |c|^2 term
+    oklab_colors: np.ndarray = srgb_to_oklab(colors).reshape(-1, 3)
+    oklab_palette: np.ndarray = srgb_to_oklab(palette)
+
+    distances: np.ndarray = (oklab_palette ** 2).sum(axis=1) - 2 * oklab_colors @ oklab_palette.T
+    return distances.argmin(axis=1).astype(np.uint8).reshape(colors.shape[:-1])
+
+
+def build_color_lut(palette: np.ndarray) -> np.ndarray:
+    # nearest palette index for the center of every RGB bin, flattened as r, g, b
+    bin_centers: np.ndarray = np.arange(2 ** LUT_BITS) * 2 ** LUT_SHIFT + (2 ** LUT_SHIFT - 1) / 2
+    grid: np.ndarray = np.stack(np.meshgrid(bin_centers, bin_centers, bin_centers, indexing="ij"), axis=-1)
+
+    return get_nearest_colors(grid, palette).reshape(-1)
+
+
+def get_color_lut(palette: np.ndarray) -> np.ndarray:
+    palette_bytes: bytes = palette.astype(np.uint8).tobytes()
+    if palette_bytes in _loaded_luts:
+        return _loaded_luts[palette_bytes]
+
+    lut_path: Path = COLOR_LUTS_PATH / f"oklab-{LUT_BITS}-{zlib.crc32(palette_bytes):08x}.npy"
+    lut: np.ndarray | None = None
+    if lut_path.exists():
+        try:
+            lut = np.load(lut_path)
+        except (OSError, ValueError):
+            lut = None
+        if lut is not None and (lut.shape != (2 ** (3 * LUT_BITS),) or lut.max() >= len(palette)):
+            lut = None
+
+    if lut is None:
+        lut = build_color_lut(palette)
+        COLOR_LUTS_PATH.mkdir(exist_ok=True)
+        np.save(lut_path, lut)
+
+    _loaded_luts[palette_bytes] = lut
+    return lut
+
+
+def lookup_colors(lut: np.ndarray, colors: np.ndarray) -> np.ndarray:
+    bins: np.ndarray = np.clip(colors, 0, 255).astype(np.int32) >> LUT_SHIFT
+    return lut[(bins[..., 0] << (2 * LUT_BITS)) | (bins[..., 1] << LUT_BITS) | bins[..., 2]]
+
+
+def dither_ordered(image: np.ndarray, lut: np.ndarray) -> np.ndarray:
+    height, width = image.shape[:2]
+    thresholds: np.ndarray = np.tile((BAYER_MATRIX + .5) / 64 - .5,
+                                     (-(-height // 8), -(-width // 8)))[:height, :width]
+
+    return lookup_colors(lut, image + thresholds[..., np.newaxis] * ORDERED_DITHER_SPREAD)
+
+
+def dither_floyd_steinberg(image: np.ndarray, lut: np.ndarray, palette: np.ndarray) -> np.ndarray:
+    # a pixel only depends on pixels left of it and on the row above, up to one column right.
+    # pixels where column + 2 * row is equal form a wave of independent pixels done all at once,
+    # and errors only reach the next three waves so only those are kept.
+    height, width = image.shape[:2]
+    indices: np.ndarray = np.empty((height, width), dtype=np.uint8)
+    palette_colors: np.ndarray = palette.astype(np.float32)
+    wave_errors: np.ndarray = np.zeros((4, height + 1, 3), dtype=np.float32)
+
+    for wave in range(width + 2 * (height - 1)):
+        top: int = max(0, (wave - width + 2) // 2)
+        bottom: int = min(height - 1, wave // 2) + 1
+        rows: np.ndarray = np.arange(top, bottom)
+        columns: np.ndarray = wave - 2 * rows
+
+        errors: np.ndarray = wave_errors[wave % 4]
+        colors: np.ndarray = np.clip(image[rows, columns] + errors[top:bottom], 0, 255)
+        errors[:] = 0
+
+        wave_indices: np.ndarray = lookup_colors(lut, colors)
+        indices[rows, columns] = wave_indices
+        error: np.ndarray = colors - palette_colors[wave_indices]
+
+        wave_errors[(wave + 1) % 4, top:bottom] += error * (7 / 16)
+        wave_errors[(wave + 1) % 4, top + 1:bottom + 1] += error * (3 / 16)
+        wave_errors[(wave + 2) % 4, top + 1:bottom + 1] += error * (5 / 16)
+        wave_errors[(wave + 3) % 4, top + 1:bottom + 1] += error * (1 / 16)
+
+    return indices
+
+
+def quantize_image(image: np.ndarray, palette: np.ndarray,
+                   dither: Image.Dither = Image.Dither.FLOYDSTEINBERG) -> np.ndarray:
+    # maps an RGB image to indices into palette, matching colors by OKLab distance
+    lut: np.ndarray = get_color_lut(palette)
+
+    if dither == Image.Dither.NONE:
+        return lookup_colors(lut, image)
+    if dither == Image.Dither.ORDERED:
+        return dither_ordered(image, lut)
+    if dither == Image.Dither.FLOYDSTEINBERG:
+        return dither_floyd_steinberg(image, lut, palette)
+    raise ValueError(f"unsupported dither {dither}")
@@ -0,0 +1,50 @@
+from pathlib import Path
+import numpy as np
+import pytest
+from PIL import Image
+import batch_import
+import files
+from batch_import import ImportJob, get_image_paths, get_jobs, import_images
+
+
+class SerialExecutor:
+    # runs jobs in this process, checking no library connection would be inherited by forked workers
+    def __init__(self, max_workers: int | None = None):
+        assert files._library is None
+
+
+    def __enter__(self) -> "SerialExecutor":
+        return self
+
+
+    def __exit__(self, *exception) -> None:
+        pass
+
+
+    def map(self, function, *iterables, chunksize: int = 1):
+        return map(function, *iterables)
+
+
+@pytest.fixture
+def image_folder(tmp_path: Path) -> Path:
+    image_folder: Path = tmp_path / "images"
+    image_folder.mkdir()
+    for seed in range(3):
+        pixels: np.ndarray = np.random.default_rng(seed).integers(0, 256, size=(30, 40, 3), dtype=np.uint8)
+        Image.fromarray(pixels).save(image_folder / f"image{seed}.png")
+    return image_folder
+
+
+def test_jobs_get_unique_names(image_folder: Path):
+    jobs: list[ImportJob] = get_jobs(get_image_paths(str(image_folder)), [(16, 12), (16, 12)], ["none"])
+    assert [job[1] for job in jobs if job[0].endswith("image0.png")] == ["image0_16x12_none", "image0_16x12_none_2"]
+
+
+def test_workers_do_not_share_the_library_connection(saved_drawings_path: Path, image_folder: Path,
+                                                      monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(batch_import, "ProcessPoolExecutor", SerialExecutor)
+    jobs: list[ImportJob] = get_jobs(get_image_paths(str(image_folder)), [(16, 12)], ["none", "ordered"])
+    summary: list[dict[str, str | int | float]] = import_images(jobs)
+
+    assert [row["drawing"] for row in summary] == [job[1] for job in jobs]
+    assert sorted(files.get_list_drawing_names()) == sorted(job[1] for job in jobs)
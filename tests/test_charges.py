@@ -0,0 +1,49 @@
+import pytest
+from conftest import make_random_drawing
+from charges import CHARGE_REGENERATION_SECONDS, CHARGE_SAFETY_BUFFER, ChargeScheduler
+from drawing import Drawing
+from macro import dry_run_drawing_macro
+from macro_utils import SimulatedInputBackend, sleep
+
+
+def test_charges_regenerate_over_time(simulated_backend: SimulatedInputBackend):
+    charges: ChargeScheduler = ChargeScheduler(10)
+    sleep(CHARGE_REGENERATION_SECONDS * 3 + 1)
+
+    assert charges.get_available_charges() == 13 - CHARGE_SAFETY_BUFFER
+
+
+def test_charges_stop_at_the_cap(simulated_backend: SimulatedInputBackend):
+    charges: ChargeScheduler = ChargeScheduler(0, max_charges=10)
+    sleep(CHARGE_REGENERATION_SECONDS * 100)
+
+    assert charges.get_available_charges() == 10 - CHARGE_SAFETY_BUFFER
+
+
+def test_waits_are_capped(simulated_backend: SimulatedInputBackend):
+    charges: ChargeScheduler = ChargeScheduler(0, max_charges=10)
+    assert charges.get_seconds_until(100) == pytest.approx(10 * CHARGE_REGENERATION_SECONDS)
+
+
+def test_projection_counts_every_missing_charge(simulated_backend: SimulatedInputBackend):
+    charges: ChargeScheduler = ChargeScheduler(0, max_charges=10)
+    assert charges.get_projected_seconds(100) ==\
+           pytest.approx((100 + CHARGE_SAFETY_BUFFER) * CHARGE_REGENERATION_SECONDS)
+
+
+def test_regeneration_restarts_when_a_full_cap_is_used(simulated_backend: SimulatedInputBackend):
+    charges: ChargeScheduler = ChargeScheduler(10, max_charges=10)
+    sleep(CHARGE_REGENERATION_SECONDS - 1)
+    charges.use_charge()
+    sleep(CHARGE_REGENERATION_SECONDS - 1)
+
+    assert charges.get_available_charges() == 9 - CHARGE_SAFETY_BUFFER
+
+
+def test_dry_run_with_a_cap_places_every_pixel():
+    drawing: Drawing = make_random_drawing(40, 10, seed=2)
+    uncapped: SimulatedInputBackend = dry_run_drawing_macro(drawing, 20)
+    capped: SimulatedInputBackend = dry_run_drawing_macro(drawing, 20, max_charges=20)
+
+    assert capped.num_clicks == uncapped.num_clicks
+    assert capped.get_time() >= uncapped.get_time()
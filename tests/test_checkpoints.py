@@ -0,0 +1,56 @@
+from collections import Counter
+from collections.abc import Callable
+from pathlib import Path
+import pytest
+import macro
+from conftest import make_random_drawing
+from drawing import Drawing
+from files import read_run_checkpoint, write_run_checkpoint
+from macro import Position, RunCheckpoint, RunControl, execute_drawing_macro
+from macro_utils import SimulatedInputBackend
+from planner import plan_drawing
+
+
+def record_targets(monkeypatch: pytest.MonkeyPatch, stop_after: int | None = None,
+                   control: RunControl | None = None) -> list[Position]:
+    # every pixel the runner moves to, stopping the run once stop_after pixels were placed
+    targets: list[Position] = []
+    move_to: Callable[[list[int], Position], None] = macro.move_to
+
+    def recording_move_to(position: list[int], target: Position) -> None:
+        move_to(position, target)
+        targets.append(target)
+        if stop_after is not None and len(targets) == stop_after:
+            control.stop()
+
+    monkeypatch.setattr(macro, "move_to", recording_move_to)
+    return targets
+
+
+def test_checkpoint_round_trip(saved_drawings_path: Path):
+    write_run_checkpoint("drawing", RunCheckpoint(131, 140, 7, batch_start=100, batch_size=296,
+                                                  batch_origin=(3, 4)))
+    checkpoint: RunCheckpoint = read_run_checkpoint("drawing")
+
+    assert (checkpoint.completed_pixels, checkpoint.charges_used, checkpoint.drawing_checksum) == (131, 140, 7)
+    assert (checkpoint.batch_start, checkpoint.batch_size, checkpoint.batch_origin) == (100, 296, (3, 4))
+
+
+@pytest.mark.parametrize("color_passes", [False, True])
+def test_resumed_run_places_every_pixel_once(saved_drawings_path: Path, simulated_backend: SimulatedInputBackend,
+                                             monkeypatch: pytest.MonkeyPatch, color_passes: bool):
+    drawing: Drawing = make_random_drawing(60, 20, seed=3)
+    control: RunControl = RunControl(track_progress=False)
+    first_targets: list[Position] = record_targets(monkeypatch, 131, control)
+    execute_drawing_macro(drawing, 300, color_passes, drawing_name="drawing", control=control)
+
+    checkpoint: RunCheckpoint = read_run_checkpoint("drawing")
+    assert checkpoint.completed_pixels == 131  # the 131st pixel was placed with a submit
+    assert (checkpoint.batch_size > 0) == color_passes
+
+    resumed_targets: list[Position] = record_targets(monkeypatch)
+    execute_drawing_macro(drawing, 300, color_passes, drawing_name="drawing", resume_from=checkpoint)
+
+    placed: Counter[Position] = Counter(first_targets[:checkpoint.completed_pixels] + resumed_targets)
+    assert placed == Counter(plan_drawing(drawing))
+    assert read_run_checkpoint("drawing") is None
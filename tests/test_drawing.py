@@ -0,0 +1,39 @@
+from collections import deque
+import numpy as np
+import pytest
+from drawing import Drawing
+
+
+def get_bfs_fill_mask(pixels: np.ndarray, row: int, column: int) -> np.ndarray:
+    # the plain 4-connected search the run-based fill replaced
+    height, width = pixels.shape
+    mask: np.ndarray = np.zeros(pixels.shape, dtype=bool)
+    mask[row, column] = True
+    to_check: deque[tuple[int, int]] = deque([(row, column)])
+
+    while to_check:
+        current_row, current_column = to_check.popleft()
+        for next_row, next_column in ((current_row - 1, current_column), (current_row + 1, current_column),
+                                      (current_row, current_column - 1), (current_row, current_column + 1)):
+            if 0 <= next_row < height and 0 <= next_column < width and not mask[next_row, next_column]\
+                    and pixels[next_row, next_column] == pixels[row, column]:
+                mask[next_row, next_column] = True
+                to_check.append((next_row, next_column))
+
+    return mask
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_fill_mask_matches_bfs(seed: int):
+    generator: np.random.Generator = np.random.default_rng(seed)
+    height, width = generator.integers(1, 20, size=2)
+    pixels: np.ndarray = generator.integers(0, 3, size=(height, width), dtype=np.uint8)
+    drawing: Drawing = Drawing(int(width), int(height), pixels)
+
+    for row, column in generator.integers(0, (height, width), size=(5, 2)).tolist():
+        assert np.array_equal(drawing.get_fill_mask(row, column), get_bfs_fill_mask(pixels, row, column))
+
+
+def test_fill_mask_of_single_color_drawing():
+    drawing: Drawing = Drawing(6, 4)
+    assert drawing.get_fill_mask(2, 3).all()
@@ -0,0 +1,58 @@
+import pytest
+import macro_utils
+from conftest import make_random_drawing
+from drawing import Drawing
+from macro import dry_run_drawing_macro, estimate_run_seconds
+from macro_utils import SimulatedInputBackend
+from planner import plan_drawing, plan_run
+
+
+def test_estimate_matches_dry_run_with_ample_charges(random_drawing: Drawing):
+    num_pixels: int = random_drawing.num_nonbackground_pixels()
+    backend: SimulatedInputBackend = dry_run_drawing_macro(random_drawing, num_pixels)
+
+    assert estimate_run_seconds(random_drawing, num_pixels) == pytest.approx(backend.get_time())
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_estimate_matches_dry_run_of_sparse_drawings(seed: int):
+    drawing: Drawing = make_random_drawing(200, 50, fill=.02, seed=seed)
+    num_pixels: int = drawing.num_nonbackground_pixels()
+    backend: SimulatedInputBackend = dry_run_drawing_macro(drawing, num_pixels)
+
+    assert estimate_run_seconds(drawing, num_pixels) == pytest.approx(backend.get_time())
+
+
+def test_estimate_close_to_dry_run_waiting_for_charges():
+    drawing: Drawing = make_random_drawing(40, 10, seed=1)
+    backend: SimulatedInputBackend = dry_run_drawing_macro(drawing, 0)
+
+    assert estimate_run_seconds(drawing, 0) == pytest.approx(backend.get_time(), rel=.01)
+
+
+def test_dry_run_makes_planned_drags(random_drawing: Drawing):
+    backend: SimulatedInputBackend = dry_run_drawing_macro(random_drawing,
+                                                           random_drawing.num_nonbackground_pixels())
+    assert backend.num_drags == plan_drawing(random_drawing).num_drags()
+
+
+def test_empty_drawing_takes_no_time():
+    assert estimate_run_seconds(Drawing(10, 10)) == 0
+
+
+def test_dry_run_and_estimate_keep_input_backend(random_drawing: Drawing):
+    backend: macro_utils.InputBackend = macro_utils.input_backend
+    dry_run_drawing_macro(random_drawing, random_drawing.num_nonbackground_pixels())
+    estimate_run_seconds(random_drawing)
+
+    assert macro_utils.input_backend is backend
+
+
+def test_dry_run_against_baseline_places_only_changes(random_drawing: Drawing):
+    drawing: Drawing = Drawing(random_drawing.width, random_drawing.height, random_drawing.pixels.copy())
+    drawing.pixels[5:8] = 0
+    num_changes: int = len(plan_run(drawing, random_drawing))
+    backend: SimulatedInputBackend = dry_run_drawing_macro(drawing, num_changes, baseline=random_drawing)
+
+    assert backend.num_drags == plan_run(drawing, random_drawing).num_drags()
+    assert backend.num_clicks < dry_run_drawing_macro(drawing, num_changes).num_clicks
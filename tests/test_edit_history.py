@@ -0,0 +1,124 @@
+import numpy as np
+from edit_history import EditHistory
+
+
+def paint(history: EditHistory, pixels: np.ndarray, mask: np.ndarray, color: int) -> None:
+    # what the editor does for one brush stamp: record, then change the pixels
+    history.record(mask & (pixels != color), pixels, color)
+    pixels[mask] = color
+
+
+def get_random_mask(generator: np.random.Generator, shape: tuple[int, int]) -> np.ndarray:
+    return generator.random(shape) < .3
+
+
+def test_undo_and_redo_restore_exact_pixels():
+    generator: np.random.Generator = np.random.default_rng(0)
+    pixels: np.ndarray = generator.integers(0, 5, size=(20, 30), dtype=np.uint8)
+    history: EditHistory = EditHistory(30)
+    states: list[np.ndarray] = [pixels.copy()]
+
+    for color in range(6):
+        paint(history, pixels, get_random_mask(generator, pixels.shape), color)
+        history.finish_edit()
+        states.append(pixels.copy())
+
+    for state in reversed(states[:-1]):
+        assert history.undo(pixels) is not None
+        assert np.array_equal(pixels, state)
+    assert history.undo(pixels) is None
+
+    for state in states[1:]:
+        assert history.redo(pixels) is not None
+        assert np.array_equal(pixels, state)
+    assert history.redo(pixels) is None
+
+
+def test_stroke_painting_a_cell_several_times_is_one_edit():
+    pixels: np.ndarray = np.zeros((4, 4), dtype=np.uint8)
+    history: EditHistory = EditHistory(4)
+    mask: np.ndarray = np.zeros((4, 4), dtype=bool)
+    mask[1, 1:3] = True
+
+    for color in (1, 2, 3):
+        paint(history, pixels, mask, color)
+    history.finish_edit()
+
+    assert len(history.undo_edits) == 1
+    edit = history.undo_edits[0]
+    assert edit.cell_indices.tolist() == [5, 6]
+    assert edit.old_colors.tolist() == [0] and edit.new_colors.tolist() == [3]
+
+    history.undo(pixels)
+    assert not pixels.any()
+
+
+def test_stroke_ending_where_it_started_is_not_kept():
+    pixels: np.ndarray = np.zeros((4, 4), dtype=np.uint8)
+    history: EditHistory = EditHistory(4)
+    mask: np.ndarray = np.zeros((4, 4), dtype=bool)
+    mask[:2, :2] = True
+
+    paint(history, pixels, mask, 1)
+    paint(history, pixels, mask, 0)
+    history.finish_edit()
+
+    assert history.undo_edits == []
+
+
+def test_regions_are_recorded_at_their_offset():
+    pixels: np.ndarray = np.zeros((10, 10), dtype=np.uint8)
+    history: EditHistory = EditHistory(10)
+
+    region: np.ndarray = pixels[4:6, 7:9]
+    history.record(np.ones((2, 2), dtype=bool), region.copy(), 2, 4, 7)
+    region[:] = 2
+    history.finish_edit()
+
+    mask, top, left = history.undo(pixels)
+    assert not pixels.any()
+    assert (mask.shape, top, left) == ((2, 2), 4, 7)
+
+
+def test_new_edit_clears_redo():
+    pixels: np.ndarray = np.zeros((5, 5), dtype=np.uint8)
+    history: EditHistory = EditHistory(5)
+
+    paint(history, pixels, np.eye(5, dtype=bool), 1)
+    history.finish_edit()
+    history.undo(pixels)
+    paint(history, pixels, ~np.eye(5, dtype=bool), 2)
+    history.finish_edit()
+
+    assert history.redo(pixels) is None
+    assert history.redo_edits == []
+    assert history.used_bytes == history.undo_edits[0].nbytes
+
+
+def test_oldest_edits_are_dropped_past_the_memory_budget():
+    generator: np.random.Generator = np.random.default_rng(1)
+    pixels: np.ndarray = np.zeros((50, 50), dtype=np.uint8)
+    history: EditHistory = EditHistory(50, memory_bytes=4000)
+
+    for color in range(1, 11):
+        paint(history, pixels, get_random_mask(generator, pixels.shape), color)
+        history.finish_edit()
+
+        assert history.used_bytes == sum(edit.nbytes for edit in history.undo_edits)
+        assert history.used_bytes <= history.memory_bytes
+
+    assert 0 < len(history.undo_edits) < 10
+    assert history.undo_edits[-1].new_colors.tolist() == [10]
+
+
+def test_edit_larger_than_the_budget_clears_the_history():
+    pixels: np.ndarray = np.zeros((50, 50), dtype=np.uint8)
+    history: EditHistory = EditHistory(50, memory_bytes=1000)
+
+    paint(history, pixels, np.eye(50, dtype=bool), 1)
+    history.finish_edit()
+    paint(history, pixels, np.ones((50, 50), dtype=bool), 2)
+    history.finish_edit()
+
+    assert (history.undo_edits, history.used_bytes) == ([], 0)
+    assert history.undo(pixels) is None
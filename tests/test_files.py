@@ -0,0 +1,71 @@
+from pathlib import Path
+import numpy as np
+from drawing import Drawing, AVAILABLE_COLORS, BACKGROUND_INDEX
+import files
+from files import (DRAWING_SUFFIX, LEGACY_DRAWING_SUFFIX, delete_drawing, get_valid_filename,
+                   get_list_drawing_names, load_drawing_from_name, read_drawing, read_legacy_drawing,
+                   rebuild_library, save_new_drawing, write_drawing)
+
+
+def get_legacy_text(drawing: Drawing) -> str:
+    # the old text format, "r g b" pixels separated by commas and rows by newlines
+    return "\n".join(",".join(" ".join(str(value) for value in AVAILABLE_COLORS[index]) for index in row)
+                     for row in drawing.pixels.tolist())
+
+
+def test_drawing_round_trip(tmp_path: Path, random_drawing: Drawing):
+    drawing_path: Path = tmp_path / f"drawing{DRAWING_SUFFIX}"
+    write_drawing(random_drawing, drawing_path)
+    drawing: Drawing = read_drawing(drawing_path)
+
+    assert (drawing.width, drawing.height) == (random_drawing.width, random_drawing.height)
+    assert np.array_equal(drawing.pixels, random_drawing.pixels)
+
+
+def test_empty_drawing_round_trip(tmp_path: Path):
+    drawing_path: Path = tmp_path / f"drawing{DRAWING_SUFFIX}"
+    write_drawing(Drawing(7, 3), drawing_path)
+
+    assert np.all(read_drawing(drawing_path).pixels == BACKGROUND_INDEX)
+
+
+def test_legacy_drawing_is_read(tmp_path: Path, random_drawing: Drawing):
+    drawing_path: Path = tmp_path / f"drawing{LEGACY_DRAWING_SUFFIX}"
+    drawing_path.write_text(get_legacy_text(random_drawing), encoding="utf-8")
+    drawing: Drawing = read_legacy_drawing(drawing_path)
+
+    assert (drawing.width, drawing.height) == (random_drawing.width, random_drawing.height)
+    assert np.array_equal(drawing.pixels, random_drawing.pixels)
+
+
+def test_saved_drawing_loads_by_name(saved_drawings_path: Path, random_drawing: Drawing):
+    drawing_name: str = save_new_drawing(random_drawing, "saved")
+    drawing: Drawing = load_drawing_from_name(drawing_name)
+
+    assert (saved_drawings_path / f"{drawing_name}{DRAWING_SUFFIX}").exists()
+    assert np.array_equal(drawing.pixels, random_drawing.pixels)
+    assert files.get_library().get_entry(drawing_name).pixels == random_drawing.num_nonbackground_pixels()
+
+
+def test_saved_names_avoid_unindexed_files(saved_drawings_path: Path, random_drawing: Drawing):
+    files.get_library()
+    (saved_drawings_path / f"copied{LEGACY_DRAWING_SUFFIX}").write_text(get_legacy_text(random_drawing),
+                                                                     encoding="utf-8")
+
+    assert get_valid_filename("copied") == f"copied_again{DRAWING_SUFFIX}"
+    assert save_new_drawing(random_drawing, "copied") == "copied_again"
+
+
+def test_rebuild_indexes_added_and_removed_files(saved_drawings_path: Path, random_drawing: Drawing):
+    save_new_drawing(random_drawing, "kept")
+    save_new_drawing(random_drawing, "deleted")
+    (saved_drawings_path / f"deleted{DRAWING_SUFFIX}").unlink()
+    write_drawing(random_drawing, saved_drawings_path / f"copied{DRAWING_SUFFIX}")
+
+    assert rebuild_library() == 1
+    assert sorted(get_list_drawing_names()) == ["copied", "kept"]
+
+
+def test_deleted_drawing_leaves_the_library(saved_drawings_path: Path, random_drawing: Drawing):
+    delete_drawing(save_new_drawing(random_drawing, "deleted"))
+    assert get_list_drawing_names() == []
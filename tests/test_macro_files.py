@@ -0,0 +1,84 @@
+from pathlib import Path
+import numpy as np
+import pytest
+import files
+from files import (LEGACY_MACRO_SUFFIX, MACRO_BLOCK_SAMPLES, MACRO_SUFFIX, MACRO_TIME_UNIT_SECONDS,
+                   get_macro_path, iter_macro_samples, read_macro, read_macro_header, write_macro)
+from macro import Macro, MacroSamples, MouseState
+
+NUM_SAMPLES: int = MACRO_BLOCK_SAMPLES * 2 + 123  # a partial block after two full ones
+
+
+@pytest.fixture
+def macros_path(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setattr(files, "MACROS_PATH", tmp_path)
+    return tmp_path
+
+
+def make_macro(name: str, num_samples: int, seed: int = 0) -> Macro:
+    generator: np.random.Generator = np.random.default_rng(seed)
+    samples: MacroSamples = MacroSamples()
+    samples.extend(np.cumsum(generator.integers(-40, 40, num_samples)),  # negative on a left monitor
+                   np.cumsum(generator.integers(-40, 40, num_samples)),
+                   generator.integers(0, 2, num_samples),
+                   np.cumsum(generator.uniform(.02, .05, num_samples)))
+    return Macro(name, samples, poll_rate_hertz=40)
+
+
+def get_sample_tuples(states: list[MouseState]) -> list[tuple[tuple[int, int], bool]]:
+    return [(state.position, state.clicked) for state in states]
+
+
+def test_macro_round_trip(macros_path: Path):
+    macro: Macro = make_macro("drag ⟶ test", NUM_SAMPLES)
+    write_macro(macro)
+    read: Macro = read_macro("drag ⟶ test")
+
+    assert (read.name, read.poll_rate_hertz, len(read.samples)) == ("drag ⟶ test", 40, NUM_SAMPLES)
+    for column in ("x", "y", "buttons"):
+        assert getattr(read.samples, column) == getattr(macro.samples, column)
+    assert np.allclose(read.samples.times, macro.samples.times, rtol=0, atol=MACRO_TIME_UNIT_SECONDS / 2)
+
+
+def test_macro_samples_stream(macros_path: Path):
+    macro: Macro = make_macro("streamed", NUM_SAMPLES)
+    write_macro(macro)
+    streamed: list[MouseState] = list(iter_macro_samples("streamed"))
+
+    assert get_sample_tuples(streamed) == get_sample_tuples(list(macro.samples))
+    assert [state.time for state in streamed] == pytest.approx(list(macro.samples.times),
+                                                               abs=MACRO_TIME_UNIT_SECONDS / 2)
+
+
+def test_macro_header_is_read_without_samples(macros_path: Path):
+    write_macro(make_macro("header", NUM_SAMPLES))
+    header: Macro = read_macro_header("header")
+
+    assert (header.name, header.poll_rate_hertz, len(header.samples)) == ("header", 40, 0)
+
+
+def test_empty_macro_round_trip(macros_path: Path):
+    write_macro(Macro("empty"))
+
+    assert len(read_macro("empty").samples) == 0
+    assert list(iter_macro_samples("empty")) == []
+
+
+def test_legacy_macro_streams(macros_path: Path):
+    lines: list[str] = [f"{index},{-index},{index % 2}" for index in range(NUM_SAMPLES)]
+    (macros_path / f"legacy{LEGACY_MACRO_SUFFIX}").write_text("30\n" + "\n".join(lines), encoding="utf-8")
+    streamed: list[MouseState] = list(iter_macro_samples("legacy"))
+
+    assert read_macro_header("legacy").poll_rate_hertz == 30
+    assert get_sample_tuples(streamed) == [((index, -index), bool(index % 2)) for index in range(NUM_SAMPLES)]
+    assert [state.time for state in streamed] == pytest.approx([index / 30 for index in range(NUM_SAMPLES)])
+    assert len(read_macro("legacy").samples) == NUM_SAMPLES
+
+
+def test_binary_macro_is_preferred_over_legacy(macros_path: Path):
+    (macros_path / f"both{LEGACY_MACRO_SUFFIX}").write_text("30\n0,0,0", encoding="utf-8")
+    assert get_macro_path("both").suffix == LEGACY_MACRO_SUFFIX
+
+    write_macro(make_macro("both", 10))
+    assert get_macro_path("both").suffix == MACRO_SUFFIX
+    assert len(read_macro("both").samples) == 10
@@ -0,0 +1,77 @@
+import pytest
+import macro_utils
+from macro_utils import (TIMING, Gesture, GestureStep, InputBackend, SimulatedInputBackend, get_click_gesture,
+                         get_drag_gesture, perform_gesture)
+
+TEST_TIMING: dict[str, float] = {"click_settle": .01, "click_hold": .02, "drag_settle": .03, "drag_grab": .04,
+                                 "drag_move": .05, "drag_release": .06}
+
+
+@pytest.fixture(autouse=True)
+def fixed_timing(monkeypatch: pytest.MonkeyPatch) -> None:
+    for name, seconds in TEST_TIMING.items():
+        monkeypatch.setitem(TIMING, name, seconds)
+
+
+def get_step_kinds(steps: list[GestureStep]) -> list[str]:
+    return [step.kind for step in steps]
+
+
+def test_click_gesture_batches():
+    batches: list[tuple[list[GestureStep], float]] = get_click_gesture((10, 20)).get_batches()
+
+    assert [(get_step_kinds(steps), seconds) for steps, seconds in batches] ==\
+           [(["move"], .01), (["press"], .02), (["release"], 0)]
+    assert batches[0][0][0].position == (10, 20)
+
+
+def test_drag_gesture_batches():
+    batches: list[tuple[list[GestureStep], float]] = get_drag_gesture((1, 2), (3, 4)).get_batches()
+
+    assert [(get_step_kinds(steps), seconds) for steps, seconds in batches] ==\
+           [([], .03), (["move", "press"], .04), (["move"], .05), (["release"], .06)]
+    assert [step.position for step in batches[1][0][:1] + batches[2][0]] == [(1, 2), (3, 4)]
+
+
+def test_inputs_without_waits_share_a_batch():
+    gesture: Gesture = Gesture().move((1, 1)).press().move((2, 2)).release()
+    assert [get_step_kinds(steps) for steps, _ in gesture.get_batches()] == [["move", "press", "move", "release"]]
+
+
+def test_click_timeline(simulated_backend: SimulatedInputBackend):
+    perform_gesture(get_click_gesture((10, 20)))
+
+    assert [(event.kind, event.time, event.position) for event in simulated_backend.timeline] ==\
+           [("move", 0, (10, 20)), ("sleep", 0, (10, 20)), ("press", .01, (10, 20)),
+            ("sleep", .01, (10, 20)), ("release", pytest.approx(.03), (10, 20))]
+    assert simulated_backend.num_batches == 3
+    assert (simulated_backend.num_clicks, simulated_backend.num_drags) == (1, 0)
+    assert simulated_backend.get_time() == pytest.approx(.03)
+
+
+def test_drag_timeline(simulated_backend: SimulatedInputBackend):
+    perform_gesture(get_drag_gesture((1, 2), (3, 4)))
+
+    assert [(event.kind, event.position) for event in simulated_backend.timeline] ==\
+           [("sleep", (0, 0)), ("move", (1, 2)), ("press", (1, 2)), ("sleep", (1, 2)),
+            ("move", (3, 4)), ("sleep", (3, 4)), ("release", (3, 4)), ("sleep", (3, 4))]
+    assert [event.duration for event in simulated_backend.timeline if event.kind == "sleep"] ==\
+           [.03, .04, .05, .06]
+    assert simulated_backend.num_batches == 3
+    assert (simulated_backend.num_clicks, simulated_backend.num_drags) == (0, 1)
+    assert simulated_backend.get_time() == pytest.approx(.18)
+
+
+def test_gestures_use_the_active_backend(simulated_backend: SimulatedInputBackend):
+    assert macro_utils.input_backend is simulated_backend
+    macro_utils.click_location((5, 5))
+    assert simulated_backend.num_clicks == 1
+
+
+def test_backend_missing_a_method_cannot_be_created():
+    class PartialBackend(InputBackend):
+        def get_mouse_position(self) -> tuple[int, int]:
+            return (0, 0)
+
+    with pytest.raises(TypeError):
+        PartialBackend()
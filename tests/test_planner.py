@@ -0,0 +1,114 @@
+import numpy as np
+import pytest
+from conftest import make_random_drawing
+from drawing import Drawing, BACKGROUND_INDEX
+from macro_utils import MAX_DRAG_PIXELS
+from planner import (MovementPlan, get_drags, get_moves, plan_color_passes, plan_drawing, plan_run,
+                     count_serpentine_drags)
+
+
+def get_plan_cells(plan: MovementPlan) -> list[tuple[int, int]]:
+    return sorted(zip(plan.rows.tolist(), plan.columns.tolist()))
+
+
+def get_nonbackground_cells(drawing: Drawing) -> list[tuple[int, int]]:
+    rows, columns = np.nonzero(drawing.pixels != BACKGROUND_INDEX)
+    return sorted(zip(rows.tolist(), columns.tolist()))
+
+
+def count_plan_drags(plan: MovementPlan) -> int:
+    # drags made by walking the plan move by move, each one checked against the drag limits
+    num_drags: int = 0
+    position: tuple[int, int] = plan.start
+
+    for next_position in plan:
+        for direction, num_pixels in get_moves(position, next_position):
+            for drag_pixels in get_drags(direction, num_pixels):
+                assert 0 < drag_pixels <= MAX_DRAG_PIXELS[direction]
+                num_drags += 1
+        position = next_position
+
+    return num_drags
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_plan_places_every_pixel_once(seed: int):
+    drawing: Drawing = make_random_drawing(150, 60, seed=seed)
+    plan: MovementPlan = plan_drawing(drawing)
+
+    assert len(plan) == drawing.num_nonbackground_pixels()
+    assert get_plan_cells(plan) == get_nonbackground_cells(drawing)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_plan_never_moves_up(seed: int):
+    plan: MovementPlan = plan_drawing(make_random_drawing(150, 60, seed=seed))
+    assert np.all(np.diff(plan.rows) >= 0)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_plan_drags_match_moves(seed: int):
+    plan: MovementPlan = plan_drawing(make_random_drawing(150, 60, fill=.05, seed=seed))
+    assert plan.num_drags() == count_plan_drags(plan)
+
+
+def test_plan_beats_original_walk(random_drawing: Drawing):
+    assert plan_drawing(random_drawing).num_drags() <= count_serpentine_drags(random_drawing)
+
+
+def test_long_moves_are_split_into_drags():
+    drawing: Drawing = Drawing(MAX_DRAG_PIXELS["right"] * 3 + 1, MAX_DRAG_PIXELS["down"] * 2 + 1)
+    drawing.pixels[-1, -1] = 0
+    plan: MovementPlan = plan_drawing(drawing)
+
+    assert plan.num_drags() == 5
+    assert count_plan_drags(plan) == 5
+
+
+def test_get_moves_rejects_moving_up():
+    with pytest.raises(ValueError):
+        get_moves((5, 0), (4, 0))
+
+
+def test_empty_drawing_has_empty_plan():
+    plan: MovementPlan = plan_drawing(Drawing(10, 10))
+    assert len(plan) == 0
+    assert plan.num_drags() == 0
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_color_passes_place_every_pixel_once(seed: int):
+    drawing: Drawing = make_random_drawing(150, 60, seed=seed)
+    rows, columns = drawing.get_nonbackground_coordinates()
+    plan: MovementPlan = plan_color_passes(rows, columns, drawing.get_pixel_indices(rows, columns))
+
+    assert get_plan_cells(plan) == get_nonbackground_cells(drawing)
+    assert np.all(np.diff(plan.rows) >= 0)
+    assert plan.num_drags() == count_plan_drags(plan)
+
+
+def test_color_passes_pick_each_color_once_per_row(random_drawing: Drawing):
+    rows, columns = random_drawing.get_nonbackground_coordinates()
+    plan: MovementPlan = plan_color_passes(rows, columns, random_drawing.get_pixel_indices(rows, columns))
+    colors: np.ndarray = random_drawing.get_pixel_indices(plan.rows, plan.columns)
+
+    for row in np.unique(plan.rows):
+        row_colors: np.ndarray = colors[plan.rows == row]
+        num_changes: int = int(np.count_nonzero(np.diff(row_colors)))
+        assert num_changes + 1 <= len(np.unique(row_colors))
+
+
+def test_delta_plan_places_only_changed_pixels(random_drawing: Drawing):
+    drawing: Drawing = Drawing(random_drawing.width, random_drawing.height, random_drawing.pixels.copy())
+    drawing.pixels[:10] = 0
+    drawing.pixels[20:25] = BACKGROUND_INDEX
+    plan: MovementPlan = plan_run(drawing, random_drawing)
+
+    changed: np.ndarray = (drawing.pixels != random_drawing.pixels) & (drawing.pixels != BACKGROUND_INDEX)
+    rows, columns = np.nonzero(changed)
+    assert get_plan_cells(plan) == sorted(zip(rows.tolist(), columns.tolist()))
+
+
+def test_delta_plan_rejects_other_sizes(random_drawing: Drawing):
+    with pytest.raises(ValueError):
+        plan_run(random_drawing, Drawing(random_drawing.width + 1, random_drawing.height))
@@ -0,0 +1,93 @@
+from pathlib import Path
+import numpy as np
+import pytest
+from drawing import Drawing
+from files import (DRAWING_SUFFIX, TILED_DRAWING_SUFFIX, get_list_drawing_names, open_tiled_working_copy,
+                   read_drawing, save_new_tiled_drawing, save_unsaved_tiled_drawing, write_drawing)
+from palette import PALETTE
+from tiled_drawing import TILE_SIDELENGTH, TiledDrawing
+
+
+def read_all(tiled_drawing: TiledDrawing) -> np.ndarray:
+    return tiled_drawing.read_region(0, 0, tiled_drawing.height, tiled_drawing.width)
+
+
+def test_tiled_drawing_round_trip(tmp_path: Path, random_drawing: Drawing):
+    drawing_path: Path = tmp_path / f"drawing{TILED_DRAWING_SUFFIX}"
+    TiledDrawing.from_drawing(drawing_path, random_drawing).close()
+    tiled_drawing: TiledDrawing = TiledDrawing(drawing_path)
+
+    assert (tiled_drawing.width, tiled_drawing.height) == (random_drawing.width, random_drawing.height)
+    assert np.array_equal(read_all(tiled_drawing), random_drawing.pixels)
+    tiled_drawing.close()
+
+
+def test_tiled_drawing_keeps_written_regions(tmp_path: Path, random_drawing: Drawing):
+    drawing_path: Path = tmp_path / f"drawing{TILED_DRAWING_SUFFIX}"
+    tiled_drawing: TiledDrawing = TiledDrawing.from_drawing(drawing_path, random_drawing)
+
+    # a region across tile edges
+    region: np.ndarray = np.zeros((10, 20), dtype=np.uint8)
+    top, left = 30, TILE_SIDELENGTH - 5
+    tiled_drawing.write_region(top, left, region)
+    tiled_drawing.close()
+
+    expected: np.ndarray = random_drawing.pixels.copy()
+    expected[top:top + 10, left:left + 20] = region
+    tiled_drawing = TiledDrawing(drawing_path)
+    assert np.array_equal(read_all(tiled_drawing), expected)
+    tiled_drawing.close()
+
+
+def test_tiled_pixel_indices_match_drawing(tmp_path: Path, random_drawing: Drawing):
+    tiled_drawing: TiledDrawing = TiledDrawing.from_drawing(tmp_path / f"drawing{TILED_DRAWING_SUFFIX}",
+                                                            random_drawing)
+    rows, columns = random_drawing.get_nonbackground_coordinates()
+    order: np.ndarray = np.random.default_rng(0).permutation(len(rows))
+
+    assert np.array_equal(tiled_drawing.get_pixel_indices(rows[order], columns[order]),
+                          random_drawing.pixels[rows[order], columns[order]])
+    tiled_drawing.close()
+
+
+def test_tiled_drawing_writes_as_binary(tmp_path: Path, random_drawing: Drawing):
+    tiled_drawing: TiledDrawing = TiledDrawing.from_drawing(tmp_path / f"drawing{TILED_DRAWING_SUFFIX}",
+                                                            random_drawing)
+    drawing_path: Path = tmp_path / f"drawing{DRAWING_SUFFIX}"
+    write_drawing(tiled_drawing, drawing_path)
+    tiled_drawing.close()
+
+    assert np.array_equal(read_drawing(drawing_path).pixels, random_drawing.pixels)
+
+
+def test_colors_missing_from_file_palette_are_kept(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    # a file created before color 3 was enabled in the palette
+    drawing_path: Path = tmp_path / f"drawing{TILED_DRAWING_SUFFIX}"
+    monkeypatch.setattr(PALETTE, "color_array", np.delete(PALETTE.color_array, 3, axis=0))
+    tiled_drawing: TiledDrawing = TiledDrawing.create(drawing_path, 100, 70)
+    monkeypatch.undo()
+
+    region: np.ndarray = np.array([[3, 0], [3, 5]], dtype=np.uint8)
+    tiled_drawing.write_region(65, 62, region)
+    tiled_drawing.close()
+
+    tiled_drawing = TiledDrawing(drawing_path)
+    assert np.array_equal(tiled_drawing.read_region(65, 62, 2, 2), region)
+    tiled_drawing.close()
+
+
+def test_saved_tiled_drawing_is_edited_through_a_copy(saved_drawings_path: Path, random_drawing: Drawing):
+    save_new_tiled_drawing(random_drawing, "tiled").close()
+    saved_path: Path = saved_drawings_path / f"tiled{TILED_DRAWING_SUFFIX}"
+
+    working_copy: TiledDrawing = open_tiled_working_copy("tiled")
+    working_copy.write_region(0, 0, np.zeros((5, 5), dtype=np.uint8))
+    working_copy.close()
+
+    saved_drawing: TiledDrawing = TiledDrawing(saved_path)
+    assert np.array_equal(read_all(saved_drawing), random_drawing.pixels)
+    saved_drawing.close()
+
+    assert save_unsaved_tiled_drawing(working_copy.path, "tiled") == "tiled_again"
+    assert not working_copy.path.exists()
+    assert sorted(get_list_drawing_names()) == ["tiled", "tiled_again"]
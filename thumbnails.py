@@ -0,0 +1,101 @@
+import glob
+import queue
+import threading
+from pathlib import Path
+import numpy as np
+from PIL import Image
+from drawing import Drawing, Color
+from tiled_drawing import TiledDrawing
+from palette import PALETTE
+from files import SAVED_DRAWINGS_PATH, load_drawing_from_name
+
+THUMBNAILS_PATH: Path = SAVED_DRAWINGS_PATH / "thumbnails"
+THUMBNAIL_SIDELENGTH: int = 48
+THUMBNAIL_BACKGROUND: Color = (0, 0, 100)  # same dark blue as the editor
+
+
+def get_thumbnail_path(drawing_name: str, modified_time: float) -> Path:
+    # keyed by modification time so edited drawings get a new thumbnail
+    return THUMBNAILS_PATH / f"{drawing_name}.{round(modified_time * 1e9)}.png"
+
+
+def delete_thumbnails(drawing_name: str, keep: Path | None = None) -> None:
+    # drawing names can contain glob characters like [ and *
+    for thumbnail_path in THUMBNAILS_PATH.glob(f"{glob.escape(drawing_name)}.*.png"):
+        if thumbnail_path.name.rsplit(".", 2)[0] == drawing_name and thumbnail_path != keep:
+            thumbnail_path.unlink(missing_ok=True)
+
+
+def render_thumbnail(drawing: Drawing | TiledDrawing) -> Image.Image:
+    # nearest neighbour sampling one band at a time, so tiled drawings are never fully loaded
+    step: int = max(1, -(-max(drawing.width, drawing.height) // THUMBNAIL_SIDELENGTH))
+    sampled_rows: list[np.ndarray] = []
+    band_top: int = 0
+
+    for band in drawing.iter_row_bands():
+        first_row: int = -band_top % step
+        sampled_rows.append(band[first_row::step, ::step])
+        band_top += len(band)
+
+    render_palette: np.ndarray = np.vstack((PALETTE.color_array, [THUMBNAIL_BACKGROUND])).astype(np.uint8)
+    return Image.fromarray(render_palette[np.concatenate(sampled_rows)])
+
+
+def make_thumbnail(drawing_name: str, modified_time: float) -> Path:
+    thumbnail_path: Path = get_thumbnail_path(drawing_name, modified_time)
+    if thumbnail_path.exists():
+        return thumbnail_path
+
+    drawing: Drawing | TiledDrawing = load_drawing_from_name(drawing_name)
+    thumbnail: Image.Image = render_thumbnail(drawing)
+    if isinstance(drawing, TiledDrawing):
+        drawing.close()
+
+    THUMBNAILS_PATH.mkdir(parents=True, exist_ok=True)
+    temporary_path: Path = thumbnail_path.with_suffix(".tmp")
+    thumbnail.save(temporary_path, format="PNG")
+    temporary_path.replace(thumbnail_path)
+
+    delete_thumbnails(drawing_name, keep=thumbnail_path)
+    return thumbnail_path
+
+
+class ThumbnailWorker:
+    # renders thumbnails on a background thread, finished ones are collected with get_finished
+    def __init__(self):
+        self.requests: queue.Queue[tuple[str, float]] = queue.Queue()
+        self.finished: queue.Queue[tuple[str, Path]] = queue.Queue()
+
+        self.thread: threading.Thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+
+    def request(self, drawing_name: str, modified_time: float) -> None:
+        self.requests.put((drawing_name, modified_time))
+
+
+    def clear_requests(self) -> None:
+        # requests for rows that are no longer shown are dropped
+        while True:
+            try:
+                self.requests.get_nowait()
+            except queue.Empty:
+                return
+
+
+    def run(self) -> None:
+        while True:
+            drawing_name, modified_time = self.requests.get()
+            try:
+                self.finished.put((drawing_name, make_thumbnail(drawing_name, modified_time)))
+            except (OSError, ValueError) as error:
+                print(f"could not make thumbnail for {drawing_name}: {error}")
+
+
+    def get_finished(self) -> list[tuple[str, Path]]:
+        finished: list[tuple[str, Path]] = []
+        while True:
+            try:
+                finished.append(self.finished.get_nowait())
+            except queue.Empty:
+                return finished
@@ -0,0 +1,260 @@
+import mmap
+import struct
+import zlib
+from collections import OrderedDict
+from collections.abc import Iterator
+from pathlib import Path
+import numpy as np
+from drawing import Drawing, AVAILABLE_COLORS, BACKGROUND_INDEX, get_indices_from_colors
+from palette import PALETTE
+
+TILE_SIDELENGTH: int = 64
+TILE_SIZE: int = TILE_SIDELENGTH * TILE_SIDELENGTH
+MAX_CACHED_TILES: int = 512  # 2 MB of tiles
+
+# tiled drawing format: a header page holding magic, width, height, tile sidelength, palette
+# length and palette RGB bytes, then uncompressed tiles in row-major tile order. each tile is
+# one 4096 byte page of palette index bytes so it can be paged in and flushed on its own.
+TILED_DRAWING_MAGIC: bytes = b"WPT1"
+TILED_HEADER_FORMAT: str = "<4sIIHH"
+TILED_HEADER_SIZE: int = 4096
+BACKGROUND_FILE_INDEX: int = 255
+
+TileKey = tuple[int, int]
+
+
+class TiledDrawing:
+    def __init__(self, path: Path, max_cached_tiles: int = MAX_CACHED_TILES):
+        self.path: Path = path
+        self.max_cached_tiles: int = max_cached_tiles
+
+        self.file = path.open("r+b")
+        self.memory_map: mmap.mmap = mmap.mmap(self.file.fileno(), 0)
+
+        magic, width, height, tile_sidelength, palette_length = struct.unpack_from(
+                TILED_HEADER_FORMAT, self.memory_map)
+        if magic != TILED_DRAWING_MAGIC or tile_sidelength != TILE_SIDELENGTH:
+            raise ValueError(f"{path} is not a tiled drawing")
+
+        self.width: int = width
+        self.height: int = height
+        self.tiles_x: int = -(-width // TILE_SIDELENGTH)
+        self.tiles_y: int = -(-height // TILE_SIDELENGTH)
+
+        self.palette_length: int = palette_length
+        palette: np.ndarray = np.frombuffer(self.memory_map, dtype=np.uint8, count=palette_length * 3,
+                                            offset=struct.calcsize(TILED_HEADER_FORMAT))
+        palette_indices: np.ndarray = get_indices_from_colors(palette.reshape(palette_length, 3))
+
+        # translation tables between file palette indices and current palette indices
+        self.to_drawing_indices: np.ndarray = np.full(256, BACKGROUND_INDEX, dtype=np.uint8)
+        self.to_drawing_indices[:palette_length] = palette_indices
+        self.to_file_indices: np.ndarray = np.full(len(AVAILABLE_COLORS), BACKGROUND_FILE_INDEX,
+                                                   dtype=np.uint8)
+        for file_index, drawing_index in enumerate(palette_indices.tolist()):
+            if drawing_index != BACKGROUND_INDEX:
+                self.to_file_indices[drawing_index] = file_index
+
+        self.cached_tiles: OrderedDict[TileKey, np.ndarray] = OrderedDict()
+        self.dirty_tiles: set[TileKey] = set()
+
+
+    @classmethod
+    def create(cls, path: Path, width: int, height: int) -> "TiledDrawing":
+        header: bytes = struct.pack(TILED_HEADER_FORMAT, TILED_DRAWING_MAGIC,
+                                    width, height, TILE_SIDELENGTH, len(PALETTE.color_array))
+        header += PALETTE.color_array.tobytes()
+
+        tiles_per_row: int = -(-width // TILE_SIDELENGTH)
+        tile_row: bytes = bytes([BACKGROUND_FILE_INDEX]) * (TILE_SIZE * tiles_per_row)
+
+        with path.open("wb") as writer:
+            writer.write(header.ljust(TILED_HEADER_SIZE, b"\0"))
+            for _ in range(-(-height // TILE_SIDELENGTH)):
+                writer.write(tile_row)
+
+        return cls(path)
+
+
+    @classmethod
+    def from_drawing(cls, path: Path, drawing: Drawing) -> "TiledDrawing":
+        tiled_drawing: TiledDrawing = cls.create(path, drawing.width, drawing.height)
+
+        for top in range(0, drawing.height, TILE_SIDELENGTH):
+            tiled_drawing.write_region(top, 0, drawing.pixels[top:top + TILE_SIDELENGTH])
+            tiled_drawing.flush()
+
+        return tiled_drawing
+
+
+    def tile_offset(self, tile_key: TileKey) -> int:
+        return TILED_HEADER_SIZE + (tile_key[0] * self.tiles_x + tile_key[1]) * TILE_SIZE
+
+
+    def read_tile(self, tile_key: TileKey) -> np.ndarray:
+        if tile_key in self.cached_tiles:
+            return self.cached_tiles[tile_key]
+
+        file_tile: np.ndarray = np.frombuffer(self.memory_map, dtype=np.uint8, count=TILE_SIZE,
+                                              offset=self.tile_offset(tile_key))
+        return self.to_drawing_indices[file_tile].reshape(TILE_SIDELENGTH, TILE_SIDELENGTH)
+
+
+    def get_tile(self, tile_key: TileKey) -> np.ndarray:
+        if tile_key in self.cached_tiles:
+            self.cached_tiles.move_to_end(tile_key)
+            return self.cached_tiles[tile_key]
+
+        tile: np.ndarray = self.read_tile(tile_key)
+        self.cached_tiles[tile_key] = tile
+
+        if len(self.cached_tiles) > self.max_cached_tiles:
+            evicted_key, evicted_tile = self.cached_tiles.popitem(last=False)
+            if evicted_key in self.dirty_tiles:
+                self.write_tile(evicted_key, evicted_tile)
+
+        return tile
+
+
+    def add_file_colors(self, drawing_indices: np.ndarray) -> None:
+        # colors enabled after the file was created are appended to the palette in the header page
+        new_length: int = self.palette_length + len(drawing_indices)
+        if new_length > BACKGROUND_FILE_INDEX \
+                or struct.calcsize(TILED_HEADER_FORMAT) + new_length * 3 > TILED_HEADER_SIZE:
+            raise ValueError(f"{self.path} has no room for {len(drawing_indices)} more palette colors")
+
+        palette_offset: int = struct.calcsize(TILED_HEADER_FORMAT) + self.palette_length * 3
+        self.memory_map[palette_offset:palette_offset + len(drawing_indices) * 3] =\
+                np.array([AVAILABLE_COLORS[index] for index in drawing_indices.tolist()], dtype=np.uint8).tobytes()
+        struct.pack_into(TILED_HEADER_FORMAT, self.memory_map, 0, TILED_DRAWING_MAGIC,
+                         self.width, self.height, TILE_SIDELENGTH, new_length)
+        self.memory_map.flush(0, TILED_HEADER_SIZE)
+
+        file_indices: np.ndarray = np.arange(self.palette_length, new_length, dtype=np.uint8)
+        self.to_drawing_indices[file_indices] = drawing_indices
+        self.to_file_indices[drawing_indices] = file_indices
+        self.palette_length = new_length
+
+
+    def write_tile(self, tile_key: TileKey, tile: np.ndarray | None = None) -> None:
+        tile = self.cached_tiles[tile_key] if tile is None else tile
+        tile_colors: np.ndarray = np.unique(tile)
+        missing_colors: np.ndarray = tile_colors[(self.to_file_indices[tile_colors] == BACKGROUND_FILE_INDEX)
+                                                 & (tile_colors != BACKGROUND_INDEX)]
+        if len(missing_colors) > 0:
+            self.add_file_colors(missing_colors)
+
+        offset: int = self.tile_offset(tile_key)
+        self.memory_map[offset:offset + TILE_SIZE] = self.to_file_indices[tile].tobytes()
+
+        page_offset: int = offset - offset % mmap.PAGESIZE
+        self.memory_map.flush(page_offset, offset + TILE_SIZE - page_offset)
+        self.dirty_tiles.discard(tile_key)
+
+
+    def flush(self) -> None:
+        for tile_key in list(self.dirty_tiles):
+            self.write_tile(tile_key)
+
+
+    def close(self) -> None:
+        self.flush()
+        self.cached_tiles.clear()
+        self.memory_map.close()
+        self.file.close()
+
+
+    def get_region_tiles(self, top: int, left: int,
+                         height: int, width: int) -> Iterator[tuple[TileKey, slice, slice]]:
+        bottom: int = min(top + height, self.height)
+        right: int = min(left + width, self.width)
+
+        for tile_row in range(top // TILE_SIDELENGTH, -(-bottom // TILE_SIDELENGTH)):
+            for tile_column in range(left // TILE_SIDELENGTH, -(-right // TILE_SIDELENGTH)):
+                tile_top: int = tile_row * TILE_SIDELENGTH
+                tile_left: int = tile_column * TILE_SIDELENGTH
+                rows = slice(max(top, tile_top) - tile_top,
+                             min(bottom, tile_top + TILE_SIDELENGTH) - tile_top)
+                columns = slice(max(left, tile_left) - tile_left,
+                                min(right, tile_left + TILE_SIDELENGTH) - tile_left)
+
+                yield (tile_row, tile_column), rows, columns
+
+
+    def read_region(self, top: int, left: int, height: int, width: int) -> np.ndarray:
+        height = min(height, self.height - top)
+        width = min(width, self.width - left)
+        region: np.ndarray = np.empty((height, width), dtype=np.uint8)
+
+        for tile_key, rows, columns in self.get_region_tiles(top, left, height, width):
+            region_top: int = tile_key[0] * TILE_SIDELENGTH + rows.start - top
+            region_left: int = tile_key[1] * TILE_SIDELENGTH + columns.start - left
+            region[region_top:region_top + rows.stop - rows.start,
+                   region_left:region_left + columns.stop - columns.start] =\
+                    self.read_tile(tile_key)[rows, columns]
+
+        return region
+
+
+    def write_region(self, top: int, left: int, pixels: np.ndarray) -> None:
+        for tile_key, rows, columns in self.get_region_tiles(top, left, *pixels.shape):
+            region_top: int = tile_key[0] * TILE_SIDELENGTH + rows.start - top
+            region_left: int = tile_key[1] * TILE_SIDELENGTH + columns.start - left
+            new_pixels: np.ndarray = pixels[region_top:region_top + rows.stop - rows.start,
+                                            region_left:region_left + columns.stop - columns.start]
+
+            if np.array_equal(self.read_tile(tile_key)[rows, columns], new_pixels):
+                continue
+            self.get_tile(tile_key)[rows, columns] = new_pixels
+            self.dirty_tiles.add(tile_key)
+
+
+    def get_region_drawing(self, top: int, left: int, height: int, width: int) -> Drawing:
+        region: np.ndarray = self.read_region(top, left, height, width)
+        return Drawing(region.shape[1], region.shape[0], region)
+
+
+    def iter_row_bands(self) -> Iterator[np.ndarray]:
+        for top in range(0, self.height, TILE_SIDELENGTH):
+            yield self.read_region(top, 0, TILE_SIDELENGTH, self.width)
+
+
+    def get_checksum(self) -> int:
+        checksum: int = 0
+        for band in self.iter_row_bands():
+            checksum = zlib.crc32(band.tobytes(), checksum)
+
+        return checksum
+
+
+    def get_pixel_indices(self, rows: np.ndarray, columns: np.ndarray) -> np.ndarray:
+        # pixels are grouped by tile so every tile is read once and indexed with arrays
+        indices: np.ndarray = np.empty(len(rows), dtype=np.uint8)
+        tile_numbers: np.ndarray = rows // TILE_SIDELENGTH * self.tiles_x + columns // TILE_SIDELENGTH
+
+        tile_order: np.ndarray = np.argsort(tile_numbers, kind="stable")
+        tile_starts: np.ndarray = np.flatnonzero(np.diff(tile_numbers[tile_order], prepend=-1))
+        for positions in np.split(tile_order, tile_starts[1:]):
+            if len(positions) == 0:
+                continue
+
+            tile: np.ndarray = self.read_tile(divmod(int(tile_numbers[positions[0]]), self.tiles_x))
+            indices[positions] = tile[rows[positions] % TILE_SIDELENGTH, columns[positions] % TILE_SIDELENGTH]
+
+        return indices
+
+
+    def get_nonbackground_coordinates(self) -> tuple[np.ndarray, np.ndarray]:
+        band_rows: list[np.ndarray] = []
+        band_columns: list[np.ndarray] = []
+
+        for band_index, band in enumerate(self.iter_row_bands()):
+            rows, columns = np.nonzero(band != BACKGROUND_INDEX)
+            band_rows.append(rows + band_index * TILE_SIDELENGTH)
+            band_columns.append(columns)
+
+        return np.concatenate(band_rows), np.concatenate(band_columns)
+
+
+    def num_nonbackground_pixels(self) -> int:
+        return sum(int(np.count_nonzero(band != BACKGROUND_INDEX)) for band in self.iter_row_bands())
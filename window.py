@@ -1,13 +1,37 @@
+import queue
+import threading
 import tkinter as tk
-from tkinter import filedialog
+from tkinter import filedialog, messagebox, ttk
+from collections.abc import Callable
 from PIL import Image, ImageTk
 from math import floor
 from files import *
-from drawing import Drawing, Color, AVAILABLE_COLORS, BACKGROUND_PIXEL
-from macro import execute_drawing_macro
+from pathlib import Path
+from typing import Literal
+import numpy as np
+from palette import PALETTE
+from drawing import Drawing, Color, AVAILABLE_COLORS, BACKGROUND_PIXEL, COLOR_INDICES, get_drawing_from_canvas_image
+from tiled_drawing import TiledDrawing
+from macro import RunCheckpoint, RunControl, RunProgress, execute_drawing_macro, dry_run_drawing_macro,\
+                  get_run_checksum
+from library import LibraryEntry, format_seconds
+from thumbnails import ThumbnailWorker, THUMBNAIL_SIDELENGTH, THUMBNAIL_BACKGROUND, get_thumbnail_path,\
+                       delete_thumbnails
+from edit_history import EditHistory, HISTORY_MEMORY_BYTES
+from macro_utils import read_timing_profiles, get_timing_profile_names, use_timing_profile
 
 WINDOW_WIDTH: int = 1300
 WINDOW_HEIGHT: int = 750
+EDITOR_REGION_SIDELENGTH: int = 256  # tiled drawings are edited one region at a time
+GRID_COLOR: Color = (0, 0, 0)
+DITHER_OPTIONS: dict[str, Image.Dither] = {"Floyd-Steinberg": Image.Dither.FLOYDSTEINBERG,
+                                          "Ordered": Image.Dither.ORDERED,
+                                          "None": Image.Dither.NONE}
+SMALL_REPAINT_PIXELS: int = 64  # larger changes are re-rendered as one image block
+DRAWINGS_PER_PAGE: int = 12
+THUMBNAIL_POLL_MILLISECONDS: int = 100
+PROGRESS_POLL_MILLISECONDS: int = 250
+PROGRESS_WINDOW_POSITION: tuple[int, int] = (1290, 740)  # screen corner clear of the macro's clicks and drags
 
 
 class App(tk.Tk):
@@ -16,13 +40,17 @@ class App(tk.Tk):
         self.title("Wplace Macro Bot")
         self.geometry(f"{WINDOW_WIDTH}x{WINDOW_HEIGHT}")
         self.iconbitmap("images/wplace_logo.ico")
+        delete_unsaved_drawings()
 
         self.current_drawing: Drawing = Drawing(0, 0)
+        self.current_tiled_drawing: TiledDrawing | None = None
+        self.current_region_origin: tuple[int, int] = (0, 0)
 
         container: tk.Frame = tk.Frame(self)
         container.pack(fill="both", expand=True)
 
         self.frames: dict[type[tk.Frame], tk.Frame] = {}
+        self.current_screen: tk.Frame | None = None
         screen_classes: tuple[type[tk.Frame], ...] = (StartScreen, DrawingScreen,
                                                       CompletedDrawingsScreen)
 
@@ -39,9 +67,30 @@ class App(tk.Tk):
     
     def set_screen(self, screen_class: type[tk.Frame]) -> None:
         screen: tk.Frame = self.frames[screen_class]
+        self.current_screen = screen
         screen.tkraise()
 
 
+    def open_drawing(self, drawing: Drawing) -> None:
+        self.close_tiled_drawing()
+        self.current_drawing = drawing
+
+
+    def open_tiled_drawing(self, tiled_drawing: TiledDrawing, origin: tuple[int, int] = (0, 0)) -> None:
+        if tiled_drawing is not self.current_tiled_drawing:
+            self.close_tiled_drawing()
+        self.current_tiled_drawing = tiled_drawing
+        self.current_region_origin = origin
+        self.current_drawing = tiled_drawing.get_region_drawing(
+                origin[0], origin[1], EDITOR_REGION_SIDELENGTH, EDITOR_REGION_SIDELENGTH)
+
+
+    def close_tiled_drawing(self) -> None:
+        if self.current_tiled_drawing is not None:
+            self.current_tiled_drawing.close()
+        self.current_tiled_drawing = None
+
+
 class StartScreen(tk.Frame):
     def __init__(self, parent: tk.Frame, controller: App):
         super().__init__(parent)
@@ -62,6 +111,10 @@ class StartScreen(tk.Frame):
         
         tk.Button(self, text="Start From Image File",
                   command=lambda: self.start_drawing_image(controller)).pack(pady=10)
+
+        tk.Label(self, text="image dithering").pack()
+        self.dither: tk.StringVar = tk.StringVar(self, "Floyd-Steinberg")
+        tk.OptionMenu(self, self.dither, *DITHER_OPTIONS).pack()
         
 
     def start_drawing_image(self, controller: App) -> None:
@@ -72,15 +125,24 @@ class StartScreen(tk.Frame):
             title="Select an Image to Start From",
             filetypes=[("Image Files", "*.png;*.jpg;*.jpeg")]
         )
-        controller.current_drawing = Drawing(drawing_width, drawing_height,
-                                             image_path=image_path)
+        drawing: Drawing = Drawing(drawing_width, drawing_height)
+        drawing.dither = DITHER_OPTIONS[self.dither.get()]
+        drawing.set_pixels_from_image(image_path)
+
+        if drawing_width * drawing_height >= TILED_DRAWING_MIN_PIXELS:
+            controller.open_tiled_drawing(create_unsaved_tiled_drawing(drawing))
+            name_entry: tk.Entry = controller.frames[DrawingScreen].name_entry
+            name_entry.delete(0, tk.END)
+            name_entry.insert(0, Path(image_path).stem)
+        else:
+            controller.open_drawing(drawing)
         controller.set_screen(DrawingScreen)
 
 
     def start_drawing_blank(self, controller: App) -> None:
         drawing_width = int(self.width_entry.get())
         drawing_height = int(self.height_entry.get())
-        controller.current_drawing = Drawing(drawing_width, drawing_height)
+        controller.open_drawing(Drawing(drawing_width, drawing_height))
         controller.set_screen(DrawingScreen)
 
 
@@ -94,12 +156,23 @@ class DrawingScreen(tk.Frame):
         self.holding_right_click: bool = False
         self.grid_drawn: bool = True
         self.brush_size: int = 1
+        self.pixel_sidelength: int = 1
+        self.canvas_image: ImageTk.PhotoImage | None = None
+        self.history: EditHistory = EditHistory(self.drawing.width)
+        # tiled drawings keep a history per region origin, least recently edited region first
+        self.region_histories: dict[tuple[int, int], EditHistory] = {}
+        self.history_owner: Drawing | TiledDrawing | None = None
+
+        # brush stamps (top, bottom, left, right, color index) waiting for the next redraw
+        self.brush_stamps: list[tuple[int, int, int, int, int]] = []
+        self.brush_redraw_id: str | None = None
+        self.last_brush_position: tuple[int, int] | None = None
 
         top_row_frame: tk.Frame = tk.Frame(self)
         top_row_frame.pack(side="top", fill="x")
 
         tk.Button(top_row_frame, text="Exit Without Saving",
-                command=lambda: controller.set_screen(StartScreen)).pack(
+                command=self.exit_without_saving).pack(
                 side="left", padx=(0, 20))
         tk.Label(top_row_frame, text="drawing name:").pack(side="left")
         self.name_entry: tk.Entry = tk.Entry(top_row_frame)
@@ -109,6 +182,10 @@ class DrawingScreen(tk.Frame):
         
         tk.Button(top_row_frame, text="Toggle Grid",
                 command=self.toggle_grid).pack(side="left", padx=20)
+        tk.Button(top_row_frame, text="Undo",
+                command=self.undo).pack(side="left")
+        tk.Button(top_row_frame, text="Redo",
+                command=self.redo).pack(side="left", padx=(0, 20))
         
         tk.Label(top_row_frame, text="brush size:").pack(side="left")
         self.brushshize_scale: tk.Scale = tk.Scale(top_row_frame, from_=1, to=20, orient=tk.HORIZONTAL,
@@ -118,6 +195,15 @@ class DrawingScreen(tk.Frame):
         self.paint_mode: tk.BooleanVar = tk.BooleanVar(value=False)
         tk.Label(top_row_frame, text="paint bucket mode:").pack(side="left",padx=(10,0))
         tk.Checkbutton(top_row_frame, variable=self.paint_mode).pack(side="left")
+
+        self.region_frame: tk.Frame = tk.Frame(top_row_frame)
+        tk.Label(self.region_frame, text="region:").pack(side="left", padx=(20, 0))
+        for text, row_change, column_change in (("<", 0, -1), ("^", -1, 0), ("v", 1, 0), (">", 0, 1)):
+            tk.Button(self.region_frame, text=text,
+                    command=lambda rows=row_change, columns=column_change:
+                    self.move_region(rows, columns)).pack(side="left")
+        self.region_label: tk.Label = tk.Label(self.region_frame)
+        self.region_label.pack(side="left", padx=5)
         
         self.color_row_frame: tk.Frame = self.create_color_row_frame()
         
@@ -133,10 +219,13 @@ class DrawingScreen(tk.Frame):
         self.canvas.bind("<ButtonRelease-3>",
                 lambda event: self.update_mouse_state(False, False, event))
         self.canvas.bind("<Button-2>", self.pick_color)
+        for sequence, command in (("<Control-z>", self.undo), ("<Control-y>", self.redo)):
+            controller.bind(sequence, lambda event, command=command: self.on_history_key(command))
         
     
     def tkraise(self, aboveThis=None) -> None:
         self.create_pixels()
+        self.update_region_frame()
         self.update_selected_color(self.color_row_frame.winfo_children()[0])
         self.brush_size = 1
         self.brushshize_scale.set(self.brush_size)
@@ -145,22 +234,14 @@ class DrawingScreen(tk.Frame):
     
 
     def pick_color(self, event: tk.Event) -> None:
-        picked_pixel_ids: tuple[int, ...] = self.canvas.find_overlapping(
-                event.x, event.y, event.x, event.y)
+        picked_pixel: tuple[int, int] | None = self.get_pixel_at(event.x, event.y)
         
-        if picked_pixel_ids == ():
+        if picked_pixel is None:
             return
         
-        picked_pixel_id: int = picked_pixel_ids[0]
-        picked_color_string: str = self.canvas.itemcget(picked_pixel_id, "fill")
-        
-        for button in self.color_row_frame.winfo_children():
-            if button.cget("bg") == picked_color_string:
-                self.update_selected_color(button)
-                return
-        
-        # select eraser button if no colors match
-        self.update_selected_color(button)  # type: ignore
+        # color buttons are in palette order, ending with the eraser
+        picked_color_index: int = self.drawing.pixels[picked_pixel]
+        self.update_selected_color(self.color_row_frame.winfo_children()[picked_color_index])
         
 
     def toggle_grid(self) -> None:
@@ -175,8 +256,56 @@ class DrawingScreen(tk.Frame):
         else:
             self.holding_right_click = press
 
+        self.last_brush_position = None  # strokes do not connect across presses
         self.update_clicked_pixel(event)
 
+        if not press:  # everything painted while the button was held is undone together
+            self.apply_brush_stamps()
+            self.history.finish_edit()
+
+
+    def select_history(self) -> None:
+        tiled_drawing: TiledDrawing | None = self.controller.current_tiled_drawing
+        owner: Drawing | TiledDrawing = self.controller.current_drawing if tiled_drawing is None else tiled_drawing
+        if owner is not self.history_owner:
+            self.history_owner = owner
+            self.region_histories = {}
+
+        origin: tuple[int, int] = (0, 0) if tiled_drawing is None else self.controller.current_region_origin
+        history: EditHistory = self.region_histories.pop(origin, None)\
+                or EditHistory(self.controller.current_drawing.width)
+        self.region_histories[origin] = history
+
+        # all regions share one memory budget, the histories of the least recently edited regions go first
+        while len(self.region_histories) > 1 and \
+                sum(region_history.used_bytes for region_history in self.region_histories.values())\
+                > HISTORY_MEMORY_BYTES:
+            self.region_histories.pop(next(iter(self.region_histories)))
+
+        self.history = history
+
+
+    def on_history_key(self, command: Callable[[], None]) -> None:
+        # the shortcuts are bound on the whole window, so only act while editing
+        if self.controller.current_screen is self:
+            command()
+
+
+    def undo(self) -> None:
+        self.apply_brush_stamps()
+        self.repaint_history_change(self.history.undo(self.drawing.pixels))
+
+
+    def redo(self) -> None:
+        self.apply_brush_stamps()
+        self.repaint_history_change(self.history.redo(self.drawing.pixels))
+
+
+    def repaint_history_change(self, change: tuple[np.ndarray, int, int] | None) -> None:
+        if change is not None:
+            changed_mask, top, left = change
+            self.repaint_pixels(changed_mask, top, left)
+
     
     def create_color_row_frame(self) -> tk.Frame:
         color_row_frame: tk.Frame = tk.Frame(self)
@@ -216,11 +345,7 @@ class DrawingScreen(tk.Frame):
     def update_selected_color(self, button: tk.Widget) -> None:
         if not isinstance(button, tk.Button):
             return
-        color_red: int = int(button["bg"][1:3], base=16)
-        color_green: int = int(button["bg"][3:5], base=16)
-        color_blue: int = int(button["bg"][5:7], base=16)
-
-        color: Color = (color_red, color_green, color_blue)
+        color: Color = AVAILABLE_COLORS[PALETTE.get_index_from_hex(button["bg"])]
 
         color_buttons: list[tk.Widget] = self.color_row_frame.winfo_children()
         eraser_button: tk.Widget = color_buttons[-1]
@@ -241,11 +366,72 @@ class DrawingScreen(tk.Frame):
 
 
     def finish_drawing(self) -> None:
-        save_new_drawing(self.drawing, self.name_entry.get())
+        self.apply_brush_stamps()
+        tiled_drawing: TiledDrawing | None = self.controller.current_tiled_drawing
+
+        if tiled_drawing is None:
+            save_new_drawing(self.drawing, self.name_entry.get())
+        else:
+            # imports and loaded drawings alike are edited as unsaved copies, saved as a new drawing
+            self.save_region()
+            self.controller.close_tiled_drawing()
+            save_unsaved_tiled_drawing(tiled_drawing.path, self.name_entry.get())
+
         self.name_entry.delete(0, tk.END)
         self.controller.set_screen(CompletedDrawingsScreen)
 
 
+    def exit_without_saving(self) -> None:
+        tiled_drawing: TiledDrawing | None = self.controller.current_tiled_drawing
+        self.controller.close_tiled_drawing()
+        if tiled_drawing is not None and is_unsaved_drawing(tiled_drawing.path):
+            tiled_drawing.path.unlink(missing_ok=True)
+
+        self.name_entry.delete(0, tk.END)
+        self.controller.set_screen(StartScreen)
+
+
+    def save_region(self) -> None:
+        tiled_drawing: TiledDrawing | None = self.controller.current_tiled_drawing
+        if tiled_drawing is None:
+            return
+
+        self.apply_brush_stamps()
+        top, left = self.controller.current_region_origin
+        tiled_drawing.write_region(top, left, self.drawing.pixels)
+        tiled_drawing.flush()  # only writes tiles touched by the region
+
+
+    def move_region(self, row_change: int, column_change: int) -> None:
+        tiled_drawing: TiledDrawing | None = self.controller.current_tiled_drawing
+        if tiled_drawing is None:
+            return
+
+        top, left = self.controller.current_region_origin
+        top = min(max(top + row_change * EDITOR_REGION_SIDELENGTH, 0),
+                  (tiled_drawing.height - 1) // EDITOR_REGION_SIDELENGTH * EDITOR_REGION_SIDELENGTH)
+        left = min(max(left + column_change * EDITOR_REGION_SIDELENGTH, 0),
+                   (tiled_drawing.width - 1) // EDITOR_REGION_SIDELENGTH * EDITOR_REGION_SIDELENGTH)
+
+        self.save_region()
+        self.controller.open_tiled_drawing(tiled_drawing, (top, left))
+        self.create_pixels()
+        self.update_region_frame()
+
+
+    def update_region_frame(self) -> None:
+        tiled_drawing: TiledDrawing | None = self.controller.current_tiled_drawing
+        if tiled_drawing is None:
+            self.region_frame.pack_forget()
+            return
+
+        top, left = self.controller.current_region_origin
+        self.region_label.config(text=f"rows {top}-{top + self.drawing.height - 1}, "
+                                      f"columns {left}-{left + self.drawing.width - 1} "
+                                      f"of {tiled_drawing.height}x{tiled_drawing.width}")
+        self.region_frame.pack(side="left")
+
+
     def get_pixel_sidelength(self) -> int:
         available_width: int = self.canvas.winfo_width()
         available_height: int = self.canvas.winfo_height()
@@ -256,54 +442,152 @@ class DrawingScreen(tk.Frame):
         return min(maximum_pixel_width, maximum_pixel_height)
 
     
+    def get_pixel_at(self, x: int, y: int) -> tuple[int, int] | None:
+        row: int = y // self.pixel_sidelength
+        column: int = x // self.pixel_sidelength
+
+        if not (0 <= row < self.drawing.height and 0 <= column < self.drawing.width):
+            return None
+        return (row, column)
+
+
+    def render_pixels(self, pixels: np.ndarray) -> Image.Image:
+        pixel_sidelength: int = self.pixel_sidelength
+        image_pixels: np.ndarray = self.drawing.get_render_palette()[pixels]
+        image_pixels = image_pixels.repeat(pixel_sidelength, axis=0).repeat(pixel_sidelength, axis=1)
+
+        if self.grid_width() != 0:
+            image_pixels[::pixel_sidelength, :] = GRID_COLOR
+            image_pixels[:, ::pixel_sidelength] = GRID_COLOR
+
+        return Image.fromarray(image_pixels)
+
+
+    def grid_width(self) -> int:
+        return int(self.grid_drawn and self.pixel_sidelength > 2)
+
+    
     def create_pixels(self) -> None:
+        if self.drawing is not self.controller.current_drawing:
+            self.select_history()
         self.drawing = self.controller.current_drawing
         self.canvas.delete("all")
+        self.brush_stamps = []
 
-        pixel_sidelength: int = self.get_pixel_sidelength()
+        self.pixel_sidelength = max(self.get_pixel_sidelength(), 1)
 
-        current_x: int = 0
-        current_y: int = 0
+        image: Image.Image = self.render_pixels(self.drawing.pixels)
+        if self.grid_width() != 0:  # close off the grid along the bottom and right edges
+            grid_image: Image.Image = Image.new("RGB", (image.width + 1, image.height + 1), GRID_COLOR)
+            grid_image.paste(image)
+            image = grid_image
 
-        for row_index, pixel_row in enumerate(self.drawing.pixel_rows):
-            for column_index, pixel in enumerate(pixel_row):
-                color_as_string = self.drawing.get_color_as_string(pixel)
-                self.canvas.create_rectangle(current_x, current_y,
-                        current_x+pixel_sidelength, current_y+pixel_sidelength,
-                        fill=color_as_string, tags=f"{row_index},{column_index}",
-                        width=int(self.grid_drawn))
-                
-                current_x += pixel_sidelength
-            current_x = 0
-            current_y += pixel_sidelength
+        self.canvas_image = ImageTk.PhotoImage(image)
+        self.canvas.create_image(0, 0, anchor="nw", image=self.canvas_image)
 
 
     def update_pixels_normal(self, event: tk.Event, new_color: Color) -> None:
-        pixel_size: int = self.get_pixel_sidelength()
+        position: tuple[int, int] = (event.x, event.y)
+        last_position: tuple[int, int] = position if self.last_brush_position is None\
+                else self.last_brush_position
+        self.last_brush_position = position
+
+        # stamp at least once per pixel crossed so fast drags do not leave gaps
+        x_distance: int = position[0] - last_position[0]
+        y_distance: int = position[1] - last_position[1]
+        num_steps: int = max(abs(x_distance), abs(y_distance)) // self.pixel_sidelength + 1
+
+        new_color_index: int = COLOR_INDICES[new_color]
+        for step in range(1, num_steps + 1):
+            self.queue_brush_stamp(last_position[0] + x_distance * step / num_steps,
+                                   last_position[1] + y_distance * step / num_steps, new_color_index)
+
+        if self.brush_redraw_id is None:
+            self.brush_redraw_id = self.after_idle(self.apply_brush_stamps)
+
+
+    def queue_brush_stamp(self, x: float, y: float, color_index: int) -> None:
+        pixel_size: int = self.pixel_sidelength
         brush_size_pixels: float = ((self.brush_size - 1) * pixel_size) / 2
-        new_color_as_string: str = self.drawing.get_color_as_string(new_color)
 
-        affected_pixel_ids: tuple[int, ...] = self.canvas.find_overlapping(
-                event.x - brush_size_pixels, event.y - brush_size_pixels,
-                event.x + brush_size_pixels, event.y + brush_size_pixels)
-            
-        for pixel_id in affected_pixel_ids:
-            self.canvas.itemconfig(pixel_id, fill=new_color_as_string)
-            pixel_row, pixel_column = map(int, self.canvas.gettags(pixel_id)[0].split(","))
-            self.drawing.pixel_rows[pixel_row][pixel_column] = new_color
+        top: int = max(floor((y - brush_size_pixels) / pixel_size), 0)
+        bottom: int = min(floor((y + brush_size_pixels) / pixel_size) + 1, self.drawing.height)
+        left: int = max(floor((x - brush_size_pixels) / pixel_size), 0)
+        right: int = min(floor((x + brush_size_pixels) / pixel_size) + 1, self.drawing.width)
+
+        if top < bottom and left < right:
+            self.brush_stamps.append((top, bottom, left, right, color_index))
+
+
+    def apply_brush_stamps(self) -> None:
+        if self.brush_redraw_id is not None:
+            self.after_cancel(self.brush_redraw_id)
+            self.brush_redraw_id = None
+
+        brush_stamps: list[tuple[int, int, int, int, int]] = self.brush_stamps
+        self.brush_stamps = []
+        if brush_stamps == []:
+            return
+
+        top: int = min(stamp[0] for stamp in brush_stamps)
+        bottom: int = max(stamp[1] for stamp in brush_stamps)
+        left: int = min(stamp[2] for stamp in brush_stamps)
+        right: int = max(stamp[3] for stamp in brush_stamps)
+
+        region: np.ndarray = self.drawing.pixels[top:bottom, left:right]
+        old_region: np.ndarray = region.copy()
+        changed_mask: np.ndarray = np.zeros(region.shape, dtype=bool)
+
+        for stamp_top, stamp_bottom, stamp_left, stamp_right, color_index in brush_stamps:
+            rows = slice(stamp_top - top, stamp_bottom - top)
+            columns = slice(stamp_left - left, stamp_right - left)
+            changed_mask[rows, columns] |= region[rows, columns] != color_index
+            region[rows, columns] = color_index
+
+        self.history.record(changed_mask, old_region, region, top, left)
+        self.repaint_pixels(changed_mask, top, left)
 
 
     def update_pixels_paint_mode(self, event: tk.Event, new_color: Color) -> None:
-        clicked_pixel_ids: tuple[int, ...] = self.canvas.find_overlapping(
-                event.x, event.y, event.x, event.y)
+        clicked_pixel: tuple[int, int] | None = self.get_pixel_at(event.x, event.y)
         
-        if clicked_pixel_ids == ():
+        if clicked_pixel is None:
             return
         
-        clicked_pixel_id = clicked_pixel_ids[0]
-        pixel_row, pixel_column = map(int, self.canvas.gettags(clicked_pixel_id)[0].split(","))
-        self.drawing.paint_fill(pixel_row, pixel_column, new_color)
-        self.create_pixels()
+        old_color_index: int = int(self.drawing.pixels[clicked_pixel])
+        filled_mask: np.ndarray = self.drawing.paint_fill(clicked_pixel[0], clicked_pixel[1], new_color)
+        self.history.record(filled_mask, old_color_index, COLOR_INDICES[new_color])
+        self.repaint_pixels(filled_mask)
+
+
+    def repaint_pixels(self, changed_mask: np.ndarray, mask_top: int = 0, mask_left: int = 0) -> None:
+        changed_rows, changed_columns = np.nonzero(changed_mask)
+        if self.canvas_image is None or len(changed_rows) == 0:
+            return
+
+        changed_rows += mask_top
+        changed_columns += mask_left
+
+        pixel_sidelength: int = self.pixel_sidelength
+        image_name: str = str(self.canvas_image)
+
+        if len(changed_rows) <= SMALL_REPAINT_PIXELS:
+            color_strings: list[str] = self.drawing.get_color_strings()
+            grid_width: int = self.grid_width()
+
+            for row, column in zip(changed_rows.tolist(), changed_columns.tolist()):
+                color_index: int = self.drawing.pixels[row, column]
+                self.canvas.tk.call(image_name, "put", color_strings[color_index], "-to",
+                        column * pixel_sidelength + grid_width, row * pixel_sidelength + grid_width,
+                        (column + 1) * pixel_sidelength, (row + 1) * pixel_sidelength)
+            return
+
+        # re-render the changed bounding box and copy it into the canvas image in one call
+        top, bottom = int(changed_rows.min()), int(changed_rows.max()) + 1
+        left, right = int(changed_columns.min()), int(changed_columns.max()) + 1
+        region_image = ImageTk.PhotoImage(self.render_pixels(self.drawing.pixels[top:bottom, left:right]))
+        self.canvas.tk.call(image_name, "copy", str(region_image), "-to",
+                            left * pixel_sidelength, top * pixel_sidelength)
             
     
     def update_clicked_pixel(self, event: tk.Event) -> None:
@@ -332,19 +616,75 @@ class CompletedDrawingsScreen(tk.Frame):
         tk.Label(self, text="starting charges: ").grid(row=0, column=1, padx=(7,3))
         self.starting_charges_entry = tk.Entry(self, width=6)
         self.starting_charges_entry.grid(row=0, column=2)
+
+        tk.Label(self, text="max charges: ").grid(row=0, column=3, padx=(7,3))
+        self.max_charges_entry = tk.Entry(self, width=6)  # left empty when the cap is unknown
+        self.max_charges_entry.grid(row=0, column=4)
+
+        self.color_passes: tk.BooleanVar = tk.BooleanVar(value=False)
+        tk.Checkbutton(self, text="one color at a time",
+                       variable=self.color_passes).grid(row=0, column=5, padx=(7,0))
+
+        tk.Label(self, text="timing: ").grid(row=0, column=6, padx=(7,3))
+        self.timing_profile: tk.StringVar = tk.StringVar(value=read_timing_profiles()["active_profile"])
+        self.timing_profile_menu: tk.OptionMenu = tk.OptionMenu(self, self.timing_profile, "")
+        self.timing_profile_menu.grid(row=0, column=7)
+
+        tk.Button(self, text="Rebuild Library",
+                  command=self.rebuild_library).grid(row=0, column=8, padx=(7,0))
+
+        self.active_run: RunProgressWindow | None = None
+        self.page: int = 0
+        self.thumbnail_worker: ThumbnailWorker = ThumbnailWorker()
+        self.thumbnail_labels: dict[str, tk.Label] = {}  # by drawing name, for the rows on this page
+        self.thumbnail_images: dict[str, ImageTk.PhotoImage] = {}
+        self.blank_thumbnail: ImageTk.PhotoImage = ImageTk.PhotoImage(
+                Image.new("RGB", (THUMBNAIL_SIDELENGTH, THUMBNAIL_SIDELENGTH), THUMBNAIL_BACKGROUND))
+        self.after(THUMBNAIL_POLL_MILLISECONDS, self.show_finished_thumbnails)
     
 
     def tkraise(self, aboveThis=None) -> None:
         self.create_options()
+        self.update_timing_profile_menu()
         return super().tkraise(aboveThis)
 
+
+    def update_timing_profile_menu(self) -> None:
+        menu: tk.Menu = self.timing_profile_menu["menu"]
+        menu.delete(0, tk.END)
+
+        for profile_name in get_timing_profile_names():
+            menu.add_command(label=profile_name,
+                             command=lambda name=profile_name: self.select_timing_profile(name))
+
+
+    def get_max_charges(self) -> int | None:
+        max_charges: str = self.max_charges_entry.get().strip()
+        return None if max_charges == "" else int(max_charges)
+
+
+    def select_timing_profile(self, profile_name: str) -> None:
+        self.timing_profile.set(profile_name)
+        use_timing_profile(profile_name, save=True)
+
         
     def create_options(self) -> None:
         self.remove_options()
 
-        drawing_names: list[str] = get_list_drawing_names()
-        for drawing_index, drawing_name in enumerate(drawing_names, start=1):
-            tk.Label(self, text=drawing_name).grid(row=drawing_index, column=0)
+        num_pages: int = max(1, -(-get_library().count() // DRAWINGS_PER_PAGE))
+        self.page = min(self.page, num_pages - 1)
+
+        self.thumbnail_worker.clear_requests()
+        self.thumbnail_labels.clear()
+        self.thumbnail_images.clear()
+
+        library_entries: list[LibraryEntry] = get_library().get_entries(self.page * DRAWINGS_PER_PAGE,
+                                                                        DRAWINGS_PER_PAGE)
+        for drawing_index, entry in enumerate(library_entries, start=1):
+            drawing_name: str = entry.name
+            name_label: tk.Label = tk.Label(self, text=drawing_name, image=self.blank_thumbnail, compound="left")
+            name_label.grid(row=drawing_index, column=0, sticky="w")
+            self.show_thumbnail(name_label, entry)
             tk.Button(self, text="Run Macro",
                       command=lambda name=drawing_name:
                       self.run_drawing_macro(name, int(self.starting_charges_entry.get()))).grid(
@@ -355,21 +695,196 @@ class CompletedDrawingsScreen(tk.Frame):
             tk.Button(self, text="Delete",
                       command=lambda name=drawing_name: self.remove_drawing(name)).grid(
                           row=drawing_index, column=3, padx=5, pady=5)
-            
+            tk.Button(self, text="Dry Run",
+                      command=lambda name=drawing_name:
+                      self.dry_run_drawing_macro(name, int(self.starting_charges_entry.get()))).grid(
+                          row=drawing_index, column=4, padx=5, pady=5)
+            tk.Button(self, text="Run Changes",
+                      command=lambda name=drawing_name:
+                      self.run_drawing_macro(name, int(self.starting_charges_entry.get()),
+                                             with_baseline=True)).grid(
+                          row=drawing_index, column=5, padx=5, pady=5)
+            tk.Label(self, text=f"{entry.width}x{entry.height}, {entry.pixels} pixels, "
+                               f"about {format_seconds(entry.estimated_seconds)}").grid(
+                          row=drawing_index, column=6, padx=5)
+
+        page_row: int = DRAWINGS_PER_PAGE + 1
+        tk.Button(self, text="Previous Page", state=tk.NORMAL if self.page > 0 else tk.DISABLED,
+                  command=lambda: self.change_page(-1)).grid(row=page_row, column=1, pady=5)
+        tk.Label(self, text=f"page {self.page + 1} of {num_pages}").grid(row=page_row, column=2)
+        tk.Button(self, text="Next Page", state=tk.NORMAL if self.page < num_pages - 1 else tk.DISABLED,
+                  command=lambda: self.change_page(1)).grid(row=page_row, column=3, pady=5)
+
+
+    def change_page(self, page_change: int) -> None:
+        self.page += page_change
+        self.create_options()
+
+
+    def show_thumbnail(self, label: tk.Label, entry: LibraryEntry) -> None:
+        # cached thumbnails are shown right away, the rest are made in the background
+        thumbnail_path: Path = get_thumbnail_path(entry.name, entry.modified_time)
+        self.thumbnail_labels[entry.name] = label
+
+        if thumbnail_path.exists():
+            self.set_thumbnail(entry.name, thumbnail_path)
+        else:
+            self.thumbnail_worker.request(entry.name, entry.modified_time)
+
+
+    def set_thumbnail(self, drawing_name: str, thumbnail_path: Path) -> None:
+        label: tk.Label | None = self.thumbnail_labels.get(drawing_name)
+        if label is None or not label.winfo_exists():
+            return
+
+        self.thumbnail_images[drawing_name] = ImageTk.PhotoImage(Image.open(thumbnail_path))
+        label.config(image=self.thumbnail_images[drawing_name])
+
+
+    def show_finished_thumbnails(self) -> None:
+        for drawing_name, thumbnail_path in self.thumbnail_worker.get_finished():
+            self.set_thumbnail(drawing_name, thumbnail_path)
+
+        self.after(THUMBNAIL_POLL_MILLISECONDS, self.show_finished_thumbnails)
+
+
+    def rebuild_library(self) -> None:
+        num_indexed: int = rebuild_library()
+        self.create_options()
+        messagebox.showinfo("Rebuild Library", f"re-indexed {num_indexed} changed drawings")
+
+
+    def run_drawing_macro(self, drawing_name: str, starting_charges: int, with_baseline: bool = False) -> None:
+        if self.is_run_active():
+            self.show_run_in_progress()
+            return
+
+        drawing: Drawing | TiledDrawing = load_drawing_from_name(drawing_name)
+        baseline: Drawing | TiledDrawing | None = None
+
+        if with_baseline:
+            baseline = self.ask_baseline(drawing)
+            if baseline is None:
+                if isinstance(drawing, TiledDrawing):
+                    drawing.close()
+                return
+
+        resume_from: RunCheckpoint | None = self.ask_resume(drawing_name, drawing, baseline)
+        if resume_from is False:
+            self.close_run_drawings(drawing, baseline)
+            return
+
+        control: RunControl = RunControl()
+        run_thread: threading.Thread = threading.Thread(target=execute_drawing_macro, daemon=True,
+                args=(drawing, starting_charges, self.color_passes.get(), self.get_max_charges()),
+                kwargs={"drawing_name": drawing_name, "resume_from": resume_from, "baseline": baseline,
+                        "control": control})
 
-    def run_drawing_macro(self, drawing_name: str, starting_charges: int) -> None:
         self.controller.iconify()
-        drawing: Drawing = load_drawing_from_name(drawing_name)
-        execute_drawing_macro(drawing, starting_charges)
+        run_thread.start()
+        self.active_run = RunProgressWindow(self.controller, drawing_name, control, run_thread,
+                                            lambda: self.finish_run(drawing, baseline))
+
+
+    def finish_run(self, drawing: Drawing | TiledDrawing, baseline: Drawing | TiledDrawing | None) -> None:
+        self.active_run = None
+        self.close_run_drawings(drawing, baseline)
+        self.controller.deiconify()
+        self.create_options()
+
+
+    def close_run_drawings(self, drawing: Drawing | TiledDrawing, baseline: Drawing | TiledDrawing | None) -> None:
+        for opened_drawing in (drawing, baseline):
+            if isinstance(opened_drawing, TiledDrawing):
+                opened_drawing.close()
+
+
+    def is_run_active(self) -> bool:
+        # runs and dry runs share the input backend, and a drawing being run cannot be deleted
+        return self.active_run is not None
+
+
+    def show_run_in_progress(self) -> None:
+        messagebox.showinfo("Run In Progress", "Stop the current run first.")
+
+
+    def ask_baseline(self, drawing: Drawing | TiledDrawing) -> Drawing | TiledDrawing | None:
+        # what is already on the canvas: a saved drawing, or a screenshot of the canvas area
+        baseline_path: str = filedialog.askopenfilename(title="Choose what is already on the canvas",
+                initialdir=SAVED_DRAWINGS_PATH,
+                filetypes=[("Drawings and images", " ".join(f"*{suffix}" for suffix in DRAWING_SUFFIXES)
+                            + " *.png *.jpg *.jpeg *.bmp"), ("All files", "*.*")])
+        if baseline_path == "":
+            return None
+
+        baseline: Drawing | TiledDrawing
+        if Path(baseline_path).suffix in DRAWING_SUFFIXES:
+            baseline = load_drawing_from_path(Path(baseline_path))
+        else:
+            baseline = get_drawing_from_canvas_image(baseline_path, drawing.width, drawing.height)
+
+        if (baseline.width, baseline.height) != (drawing.width, drawing.height):
+            messagebox.showerror("Run Changes", f"The baseline is {baseline.width}x{baseline.height} "
+                                 f"but the drawing is {drawing.width}x{drawing.height}.")
+            if isinstance(baseline, TiledDrawing):
+                baseline.close()
+            return None
+
+        return baseline
+
+
+    def ask_resume(self, drawing_name: str, drawing: Drawing | TiledDrawing,
+                   baseline: Drawing | TiledDrawing | None = None) -> RunCheckpoint | None | Literal[False]:
+        # returns the checkpoint to resume from, None to start over or False to cancel
+        checkpoint: RunCheckpoint | None = read_run_checkpoint(drawing_name)
+        if checkpoint is None:
+            return None
+
+        # a different drawing or baseline means a different plan
+        if checkpoint.drawing_checksum != get_run_checksum(drawing, baseline):
+            delete_run_checkpoint(drawing_name)
+            return None
+
+        resume: bool | None = messagebox.askyesnocancel("Resume Run",
+                f"{drawing_name} was stopped after {checkpoint.completed_pixels} pixels "
+                f"({checkpoint.timestamp}). Resume from there? Choosing no starts over.")
+        if resume is None:
+            return False
+        if not resume:
+            delete_run_checkpoint(drawing_name)
+            return None
+        return checkpoint
+
+
+    def dry_run_drawing_macro(self, drawing_name: str, starting_charges: int) -> None:
+        if self.is_run_active():
+            self.show_run_in_progress()
+            return
+
+        drawing: Drawing | TiledDrawing = load_drawing_from_name(drawing_name)
+        summary: str = dry_run_drawing_macro(drawing, starting_charges, self.color_passes.get(),
+                                             self.get_max_charges()).get_summary()
+
+        if isinstance(drawing, TiledDrawing):
+            drawing.close()
+        messagebox.showinfo("Dry Run", f"{drawing_name}: {summary}")
 
 
     def load_drawing(self, drawing_name: str) -> None:
-        self.controller.current_drawing = load_drawing_from_name(drawing_name)
+        if get_drawing_path(drawing_name).suffix == TILED_DRAWING_SUFFIX:
+            self.controller.open_tiled_drawing(open_tiled_working_copy(drawing_name))
+        else:
+            self.controller.open_drawing(load_drawing_from_name(drawing_name))
         self.controller.set_screen(DrawingScreen)
 
 
     def remove_drawing(self, drawing_name) -> None:
+        if self.is_run_active():
+            self.show_run_in_progress()
+            return
+
         delete_drawing(drawing_name)
+        delete_thumbnails(drawing_name)
         self.create_options()
 
 
@@ -384,6 +899,79 @@ class CompletedDrawingsScreen(tk.Frame):
         self.controller.set_screen(StartScreen)
 
 
+class RunProgressWindow(tk.Toplevel):
+    # small always on top view of a run happening on another thread
+    def __init__(self, controller: App, drawing_name: str, control: RunControl,
+                 run_thread: threading.Thread, on_finish: Callable[[], None]):
+        super().__init__(controller)
+        self.control: RunControl = control
+        self.run_thread: threading.Thread = run_thread
+        self.on_finish: Callable[[], None] = on_finish
+        self.last_phase: str = "planning"
+
+        self.title(drawing_name)
+        self.attributes("-topmost", True)
+        self.resizable(False, False)
+        self.geometry(f"+{PROGRESS_WINDOW_POSITION[0]}+{PROGRESS_WINDOW_POSITION[1]}")
+        self.protocol("WM_DELETE_WINDOW", self.control.stop)
+
+        self.phase_label: tk.Label = tk.Label(self, text="planning")
+        self.phase_label.grid(row=0, column=0, columnspan=2, sticky="w")
+        self.progress_bar: ttk.Progressbar = ttk.Progressbar(self, length=200, maximum=1)
+        self.progress_bar.grid(row=1, column=0, columnspan=2, padx=5)
+        self.details_label: tk.Label = tk.Label(self, text="", justify="left")
+        self.details_label.grid(row=2, column=0, columnspan=2, sticky="w")
+
+        self.pause_button: tk.Button = tk.Button(self, text="Pause", width=8, command=self.toggle_pause)
+        self.pause_button.grid(row=3, column=0, pady=5)
+        self.stop_button: tk.Button = tk.Button(self, text="Stop", width=8, command=self.control.stop)
+        self.stop_button.grid(row=3, column=1, pady=5)
+
+        self.after(PROGRESS_POLL_MILLISECONDS, self.show_progress)
+
+
+    def show_progress(self) -> None:
+        latest_progress: RunProgress | None = None
+        while True:
+            try:
+                latest_progress = self.control.progress.get_nowait()
+            except queue.Empty:
+                break
+
+        if latest_progress is not None:
+            self.update_labels(latest_progress)
+
+        if self.run_thread.is_alive():
+            self.after(PROGRESS_POLL_MILLISECONDS, self.show_progress)
+            return
+
+        if self.last_phase not in ("finished", "stopped"):
+            self.phase_label.config(text="ended with an error, see the console")
+        self.pause_button.config(state=tk.DISABLED)
+        self.stop_button.config(text="Close", command=self.destroy)
+        self.protocol("WM_DELETE_WINDOW", self.destroy)
+        self.on_finish()
+
+
+    def update_labels(self, progress: RunProgress) -> None:
+        self.last_phase = progress.phase
+        self.phase_label.config(text=progress.phase)
+        self.progress_bar.config(value=progress.pixels_done / max(progress.total_pixels, 1))
+
+        completion: str = "" if progress.completion is None else f", done about {progress.completion:%H:%M}"
+        self.details_label.config(text=f"{progress.pixels_done} of {progress.total_pixels} pixels{completion}\n"
+                                       f"{progress.charges_used} charges used, {progress.available_charges} left")
+
+
+    def toggle_pause(self) -> None:
+        if self.control.is_paused():
+            self.control.resume()
+            self.pause_button.config(text="Pause")
+        else:
+            self.control.pause()
+            self.pause_button.config(text="Resume")
+
+
 if __name__ == "__main__":
     app: App = App()
     app.mainloop()
\ No newline at end of file